@@ -0,0 +1,345 @@
+"""
+    Accuracy versus compute of every estimator over a library of encounter geometries and noise levels.
+
+    python benchmarks/pareto.py -o pareto.json --plot pareto.png
+
+    Each estimator is run through every scenario while its CPU time per tick and its errors
+    (target position, velocity, heading, time to collision and the time it takes to converge)
+    are recorded. The estimators that no other estimator beats on both CPU time and position
+    error are the Pareto front, that's where a choice for a given CPU budget should come from.
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from benchmarks.scenarios import Encounter2D, Encounter3D
+from benchmarks.timing import save_results
+from estimators.target_ekf import TargetEKF
+from estimators.inverse_depth_ekf import InverseDepthEKF
+from estimators.position_ekf import PositionEKF
+from estimators.ttc_unscented_ekf import TTCUnscentedEKF
+from estimators.pseudolinear_kf import PseudoLinearKF
+from estimators.plkf_3d import PseudoLinearKF as PseudoLinearKF3D
+from estimators.ttc_particle_filter import TTCParticleFilter
+from estimators.improved_particle_filter import TTCParticleFilter as ImprovedTTCParticleFilter
+from estimators.inverse_depth_particle_filter import InverseDepthParticleFilter
+
+# name -> (dimension, function that builds the Encounter)
+GEOMETRIES = {
+    "head-on": (2, lambda **kwargs: Encounter2D(**kwargs)),
+    "crossing": (2, lambda **kwargs: Encounter2D(targetyaw=np.pi/2, **kwargs)),
+    "crossing+50": (2, lambda **kwargs: Encounter2D(targetyaw=np.pi/2, offset=50., **kwargs)),
+    "helical-3d": (3, lambda **kwargs: Encounter3D(**kwargs)),
+}
+DEFAULT_NOISE = [0., 0.001, 0.005]
+DEFAULT_PARTICLES = [100, 1000]
+# runs without an estimate for more than this fraction of the ticks count as failed
+DIVERGED_LIMIT = 0.1
+
+def bearing_state_estimate(xhat, own, inverse_depth=False):
+    """
+        target position and velocity from a [bearing, tau or rho, vi, yawi, yaw] state,
+        tau is the range over the ownship speed and rho the inverse range
+    """
+    distance = 1/xhat.item(1) if inverse_depth else xhat.item(1)*own[3]
+    theta = xhat.item(0) + xhat.item(4)
+    position = own[0:2] + distance*np.array([np.sin(theta), np.cos(theta)])
+    velocity = xhat.item(2)*np.array([np.sin(xhat.item(3)), np.cos(xhat.item(3))])
+    return position, velocity
+
+def ekf_adapter(cls, inverse_depth=False, state="xhat"):
+    def make(encounter):
+        measurement, own_state, _ = encounter.tick(0)
+        estimator = cls(measurement.bearing, own_state.yaw, encounter.ts)
+        step = lambda k: estimator.update(*encounter.tick(k))
+        estimate = lambda k: bearing_state_estimate(getattr(estimator, state), encounter.ownship[k], inverse_depth)
+        return step, estimate
+    return make
+
+def position_ekf_adapter(encounter):
+    estimator = PositionEKF(encounter.ts)
+    step = lambda k: estimator.update(*encounter.tick(k)[0:2])
+    def estimate(k):
+        xhat = estimator.xhat[:,0]
+        return xhat[0:2], xhat[2]*np.array([np.sin(xhat[3]), np.cos(xhat[3])])
+    return step, estimate
+
+def plkf_adapter(encounter):
+    """
+        the pseudolinear filters estimate the target state relative to the ownship
+    """
+    if encounter.ownship.shape[1] == 6:
+        own = encounter.ownship
+        estimator = PseudoLinearKF3D(encounter.ts, own[0][:,np.newaxis], encounter.unit_vectors[0][:,np.newaxis])
+    else:
+        own = encounter.cartesian
+        estimator = PseudoLinearKF(encounter.ts, own[0][:,np.newaxis], encounter.unit_vectors[0][:,np.newaxis])
+    d = encounter.unit_vectors.shape[1]
+    step = lambda k: estimator.update(own[k][:,np.newaxis], encounter.unit_vectors[k][:,np.newaxis])
+    def estimate(k):
+        absolute = estimator.xhat[:,0] + own[k]
+        return absolute[0:d], absolute[d:]
+    return step, estimate
+
+def particle_filter_adapter(cls, num_particles, seed=0):
+    def make(encounter):
+        measurement, own_state, _ = encounter.tick(0)
+        # a fresh generator for every run, so every scenario sees the same particle draws
+        estimator = cls(measurement.bearing, own_state.yaw, encounter.ts, num_particles=num_particles,
+                        rng=np.random.default_rng(seed))
+        def step(k):
+            measurement, own_state, input = encounter.tick(k)
+            estimator.propagate_model(own_state, input)
+            estimator.measurement_update(measurement)
+            estimator.resample(measurement)
+        def estimate(k):
+            # weighted mean of the particles
+            positions, headings, speeds, weights = estimator.particle_positions(encounter.ownship_states[k])
+            weights = weights/np.sum(weights)
+            velocities = speeds[:,np.newaxis]*np.stack([np.sin(headings), np.cos(headings)], axis=1)
+            return weights @ positions, weights @ velocities
+        return step, estimate
+    return make
+
+def build_estimators(particle_counts, seed=0):
+    """
+        list of (name, dimensions it works in, adapter), the adapter builds the estimator for an
+        encounter and returns step(k) and estimate(k) -> (target position, target velocity)
+    """
+    estimators = [
+        ("TargetEKF", (2,), ekf_adapter(TargetEKF)),
+        ("InverseDepthEKF", (2,), ekf_adapter(InverseDepthEKF, inverse_depth=True)),
+        ("PositionEKF", (2,), position_ekf_adapter),
+        ("TTCUnscentedEKF", (2,), ekf_adapter(TTCUnscentedEKF, state="mean")),
+        ("PseudoLinearKF", (2, 3), plkf_adapter),
+    ]
+    for cls, name in ((TTCParticleFilter, "TTCParticleFilter"), (ImprovedTTCParticleFilter, "ImprovedTTCParticleFilter"),
+                      (InverseDepthParticleFilter, "InverseDepthParticleFilter")):
+        for n in particle_counts:
+            estimators.append((f"{name}[{n}]", (2,), particle_filter_adapter(cls, n, seed)))
+    return estimators
+
+def run_estimator(adapter, encounter):
+    """
+        runs the estimator through the whole encounter, returns the CPU time of every tick
+        and the estimated target positions and velocities (nan where there is no estimate)
+    """
+    d = encounter.target.shape[1]//2
+    step, estimate = adapter(encounter)
+    cpu = np.zeros(encounter.num_ticks-1)
+    positions = np.full((encounter.num_ticks, d), np.nan)
+    velocities = np.full((encounter.num_ticks, d), np.nan)
+    for k in range(1, encounter.num_ticks):
+        start = time.process_time()
+        step(k)
+        cpu[k-1] = time.process_time() - start
+        positions[k], velocities[k] = estimate(k)
+    return cpu, positions, velocities
+
+def truth(encounter):
+    """
+        true target positions and velocities and the ownship speed of every tick
+    """
+    if encounter.target.shape[1] == 6:
+        return encounter.target[:,0:3], encounter.target[:,3:6], np.linalg.norm(encounter.ownship[:,3:6], axis=1)
+    return encounter.target[:,0:2], encounter.target_velocities(), encounter.ownship[:,3]
+
+def error_metrics(encounter, positions, velocities, converge_fraction=0.1):
+    """
+        RMS errors over the ticks with an estimate. tau is the time to collision the same way
+        the estimators define it (range over ownship speed) and the estimate is converged once
+        the position error stays under converge_fraction of the true range.
+    """
+    true_positions, true_velocities, own_speed = truth(encounter)
+    own_positions = encounter.ownship[:, 0:true_positions.shape[1]]
+    estimated = ~np.any(np.isnan(positions) | np.isnan(velocities), axis=1)
+    estimated[0] = False
+    true_range = np.linalg.norm(true_positions - own_positions, axis=1)
+    position_error = np.linalg.norm(positions - true_positions, axis=1)
+    velocity_error = np.linalg.norm(velocities - true_velocities, axis=1)
+    tau_error = (np.linalg.norm(positions - own_positions, axis=1) - true_range)/own_speed
+    rms = lambda e: float(np.sqrt(np.mean(np.square(e[estimated])))) if np.any(estimated) else float("nan")
+    metrics = {
+        "position_rmse": rms(position_error),
+        "velocity_rmse": rms(velocity_error),
+        "tau_rmse": rms(tau_error),
+        "heading_rmse": float("nan"),
+        "diverged_fraction": float(1 - np.sum(estimated)/(encounter.num_ticks-1)),
+    }
+    if true_positions.shape[1] == 2:
+        heading_error = np.arctan2(velocities[:,0], velocities[:,1]) - np.arctan2(true_velocities[:,0], true_velocities[:,1])
+        metrics["heading_rmse"] = rms(np.mod(heading_error + np.pi, 2*np.pi) - np.pi)
+
+    # converged from the first tick after the last one that was outside the bound (or had no estimate)
+    outside = ~estimated[1:] | ~(position_error[1:] <= converge_fraction*true_range[1:])
+    if not outside[-1]:
+        last = np.flatnonzero(outside)
+        first = last[-1] + 2 if last.size > 0 else 1
+        metrics["time_to_converge"] = float(encounter.t[first])
+    else:
+        metrics["time_to_converge"] = float("nan")
+    return metrics
+
+def usable_error(result):
+    """
+        position RMSE of a run, nan if it failed or diverged
+    """
+    if "position_rmse" not in result or result["diverged_fraction"] > DIVERGED_LIMIT:
+        return float("nan")
+    return result["position_rmse"]
+
+def pareto_front(costs, errors):
+    """
+        mask of the points no other point beats on both cost and error (nan errors are never on it)
+    """
+    costs = np.asarray(costs, dtype=float)
+    errors = np.asarray(errors, dtype=float)
+    valid = ~np.isnan(errors)
+    front = np.zeros(costs.shape[0], dtype=bool)
+    for i in np.flatnonzero(valid):
+        dominated = valid & (costs <= costs[i]) & (errors <= errors[i]) & ((costs < costs[i]) | (errors < errors[i]))
+        front[i] = not np.any(dominated)
+    return front
+
+def overall_table(results):
+    """
+        per estimator mean CPU time per tick and median position RMSE over the scenarios it ran on
+        (nan if it failed on any of them),
+        with the Pareto front of those two
+    """
+    names = list(dict.fromkeys(r["estimator"] for r in results if "position_rmse" in r))
+    rows = []
+    for name in names:
+        runs = [r for r in results if r["estimator"] == name]
+        rmse = np.array([usable_error(r) for r in runs])
+        rows.append({"estimator": name,
+                     "scenarios": len(runs),
+                     "cpu_per_tick": float(np.mean([r["cpu_per_tick"] for r in runs if "cpu_per_tick" in r])),
+                     "median_position_rmse": float(np.median(rmse)) if not np.any(np.isnan(rmse)) else float("nan"),
+                     "failed_scenarios": int(np.sum(np.isnan(rmse)))})
+    front = pareto_front([r["cpu_per_tick"] for r in rows], [r["median_position_rmse"] for r in rows])
+    for row, on_front in zip(rows, front):
+        row["pareto"] = bool(on_front)
+    return sorted(rows, key=lambda row: row["cpu_per_tick"])
+
+def format_table(rows, columns):
+    """
+        columns are (title, width, function that formats a row)
+    """
+    lines = ["  ".join(f"{title:>{width}s}" for title, width, _ in columns)]
+    for row in rows:
+        lines.append("  ".join(f"{cell(row):>{width}s}" for _, width, cell in columns))
+    return "\n".join(lines)
+
+SCENARIO_COLUMNS = [
+    ("estimator", 32, lambda r: r["estimator"]),
+    ("cpu ms", 9, lambda r: f"{1e3*r['cpu_per_tick']:.3f}"),
+    ("pos m", 10, lambda r: f"{r['position_rmse']:.3g}"),
+    ("vel m/s", 10, lambda r: f"{r['velocity_rmse']:.3g}"),
+    ("heading", 9, lambda r: f"{r['heading_rmse']:.3g}"),
+    ("tau s", 9, lambda r: f"{r['tau_rmse']:.3g}"),
+    ("converge s", 10, lambda r: f"{r['time_to_converge']:.3g}"),
+    ("diverged", 9, lambda r: f"{r['diverged_fraction']:.2f}"),
+    ("pareto", 7, lambda r: "*" if r["pareto"] else ""),
+]
+OVERALL_COLUMNS = [
+    ("estimator", 32, lambda r: r["estimator"]),
+    ("cpu ms", 9, lambda r: f"{1e3*r['cpu_per_tick']:.3f}"),
+    ("median pos m", 12, lambda r: f"{r['median_position_rmse']:.3g}"),
+    ("scenarios", 9, lambda r: str(r["scenarios"])),
+    ("failed", 7, lambda r: str(r["failed_scenarios"])),
+    ("pareto", 7, lambda r: "*" if r["pareto"] else ""),
+]
+
+def plot_pareto(results, path):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    scenarios = list(dict.fromkeys((r["geometry"], r["noise_std"]) for r in results))
+    geometries = list(dict.fromkeys(g for g, _ in scenarios))
+    noises = list(dict.fromkeys(n for _, n in scenarios))
+    estimators = list(dict.fromkeys(r["estimator"] for r in results))
+    markers = dict(zip(estimators, ["o", "s", "^", "v", "D", "P", "X", "*", "<", ">", "h", "p"]*4))
+    colors = {name: f"C{i % 10}" for i, name in enumerate(estimators)}
+    fig, axes = plt.subplots(len(geometries), len(noises), figsize=(4*len(noises), 3.5*len(geometries)), squeeze=False)
+    for (geometry, noise) in scenarios:
+        ax = axes[geometries.index(geometry), noises.index(noise)]
+        runs = [r for r in results if r["geometry"] == geometry and r["noise_std"] == noise and "position_rmse" in r]
+        for r in runs:
+            if not np.isnan(usable_error(r)):
+                ax.plot(1e3*r["cpu_per_tick"], r["position_rmse"], ls="", marker=markers[r["estimator"]], c=colors[r["estimator"]],
+                        mfc=colors[r["estimator"]] if r["pareto"] else "none", label=r["estimator"])
+        front = sorted((r for r in runs if r["pareto"]), key=lambda r: r["cpu_per_tick"])
+        if front:
+            ax.step([1e3*r["cpu_per_tick"] for r in front], [r["position_rmse"] for r in front], where="post", c="k", lw=0.8)
+        ax.set_xscale("log")
+        ax.set_yscale("log")
+        ax.set_title(f"{geometry}, noise {noise:g}")
+        ax.set_xlabel("CPU per tick (ms)")
+        ax.set_ylabel("position RMSE (m)")
+    handles, labels = [], []
+    for ax in axes.flat:
+        for handle, label in zip(*ax.get_legend_handles_labels()):
+            if label not in labels:
+                handles.append(handle)
+                labels.append(label)
+    fig.legend(handles, labels, loc="lower center", ncol=min(len(labels), 4))
+    fig.tight_layout(rect=(0, 0.08, 1, 1))
+    fig.savefig(path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-o", "--output", default="pareto_results.json")
+    parser.add_argument("--plot", default=None, help="save the Pareto plot to this file")
+    parser.add_argument("-k", "--filter", default=None, help="only run the estimators whose name matches this regex")
+    parser.add_argument("--geometries", nargs="+", default=list(GEOMETRIES), choices=list(GEOMETRIES))
+    parser.add_argument("--noise", type=float, nargs="+", default=DEFAULT_NOISE, help="bearing/unit vector noise standard deviations")
+    parser.add_argument("--particles", type=int, nargs="+", default=DEFAULT_PARTICLES)
+    parser.add_argument("--duration", type=float, default=15., help="length of each encounter (s)")
+    parser.add_argument("--converge-fraction", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    estimators = [e for e in build_estimators(args.particles, args.seed) if args.filter is None or re.search(args.filter, e[0])]
+    results = []
+    for geometry in args.geometries:
+        dimension, make_encounter = GEOMETRIES[geometry]
+        for noise in args.noise:
+            encounter = make_encounter(noise_std=noise, duration=args.duration, seed=args.seed)
+            scenario = []
+            for name, dimensions, adapter in estimators:
+                if dimension not in dimensions:
+                    continue
+                result = {"estimator": name, "geometry": geometry, "noise_std": noise}
+                try:
+                    with np.errstate(all="ignore"):
+                        cpu, positions, velocities = run_estimator(adapter, encounter)
+                        result.update(error_metrics(encounter, positions, velocities, args.converge_fraction))
+                    result["cpu_per_tick"] = float(np.mean(cpu))
+                    result["cpu_per_tick_p95"] = float(np.percentile(cpu, 95))
+                except Exception as e:
+                    # a broken estimator shouldn't stop the rest of the runs
+                    result["error"] = f"{type(e).__name__}: {e}"
+                    print(f"{geometry} noise {noise:g}: {name} failed: {result['error']}")
+                scenario.append(result)
+            ran = [r for r in scenario if "position_rmse" in r]
+            front = pareto_front([r["cpu_per_tick"] for r in ran], [usable_error(r) for r in ran])
+            for r, on_front in zip(ran, front):
+                r["pareto"] = bool(on_front)
+            print(f"\n{geometry}, noise {noise:g}")
+            print(format_table(sorted(ran, key=lambda r: r["cpu_per_tick"]), SCENARIO_COLUMNS))
+            results += scenario
+
+    overall = overall_table(results)
+    print("\nall scenarios")
+    print(format_table(overall, OVERALL_COLUMNS))
+
+    save_results(args.output, results, overall=overall, geometries=args.geometries, noise=args.noise,
+                 particles=args.particles, duration=args.duration, seed=args.seed, converge_fraction=args.converge_fraction)
+    if args.plot is not None:
+        plot_pareto(results, args.plot)
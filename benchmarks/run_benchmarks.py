@@ -0,0 +1,260 @@
+"""
+    Per tick latency of the estimators and of the planner hot paths on canned, deterministic inputs.
+
+    python benchmarks/run_benchmarks.py -o results.json
+    python benchmarks/run_benchmarks.py -o new.json --compare results.json
+
+    The results are written as JSON so runs on different commits can be compared, and every
+    case is checked against the per tick budget (10 ms by default).
+"""
+
+import argparse
+import itertools
+import os
+import re
+import sys
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'other'))
+from benchmarks.scenarios import Encounter2D, Encounter3D
+from benchmarks.timing import time_ticks, summarize, save_results, load_results
+from tools.rng import spawn_generators
+from estimators.target_ekf import TargetEKF
+from estimators.inverse_depth_ekf import InverseDepthEKF
+from estimators.position_ekf import PositionEKF
+from estimators.ttc_unscented_ekf import TTCUnscentedEKF
+from estimators.pseudolinear_kf import PseudoLinearKF
+from estimators.plkf_3d import PseudoLinearKF as PseudoLinearKF3D
+from estimators.ttc_particle_filter import TTCParticleFilter
+from estimators.improved_particle_filter import TTCParticleFilter as ImprovedTTCParticleFilter
+from estimators.inverse_depth_particle_filter import InverseDepthParticleFilter
+from controllers.collision_cone import CollisionConeController
+from tools.fisher_information import constant_turn_trajectories, score_trajectories
+from tools.out_of_sequence import OutOfSequenceFilter
+
+DEFAULT_PARTICLES = [100, 1000, 10000, 100000]
+
+def cycle_ticks(num_ticks, step):
+    """
+        tick function that calls step(k) with k going through 1..num_ticks-1 over and over
+        (tick 0 is used to initialize the estimators)
+    """
+    ks = itertools.cycle(range(1, num_ticks))
+    return lambda: step(next(ks))
+
+def ekf_case(cls, encounter):
+    measurement, state, _ = encounter.tick(0)
+    estimator = cls(measurement.bearing, state.yaw, encounter.ts)
+    return cycle_ticks(encounter.num_ticks, lambda k: estimator.update(*encounter.tick(k)))
+
+def position_ekf_case(encounter):
+    estimator = PositionEKF(encounter.ts)
+    return cycle_ticks(encounter.num_ticks, lambda k: estimator.update(*encounter.tick(k)[0:2]))
+
+def out_of_sequence_case(encounter, max_delay_ticks=5, window=50, seed=0):
+    """
+        TargetEKF fed the encounter with every measurement up to max_delay_ticks late, in
+        arrival order, the late ones reprocess the corrections after them
+    """
+    measurement, state, _ = encounter.tick(0)
+    estimator = OutOfSequenceFilter(TargetEKF(measurement.bearing, state.yaw, encounter.ts), window)
+    n = encounter.num_ticks - 1
+    order = np.argsort(np.arange(n) + np.random.default_rng(seed).uniform(0, max_delay_ticks, n)) + 1
+    ticks = itertools.count()
+    def step():
+        # the time keeps going up when the encounter starts over
+        lap, i = divmod(next(ticks), n)
+        measurement, state, input = encounter.tick(order[i])
+        estimator.correct((lap*n + order[i])*encounter.ts, measurement, state, input=input)
+    return step
+
+def plkf_case(encounter):
+    estimator = PseudoLinearKF(encounter.ts, encounter.cartesian[0][:,np.newaxis], encounter.unit_vectors[0][:,np.newaxis])
+    return cycle_ticks(encounter.num_ticks, lambda k: estimator.update(encounter.cartesian[k][:,np.newaxis], encounter.unit_vectors[k][:,np.newaxis]))
+
+def plkf_3d_case(encounter):
+    estimator = PseudoLinearKF3D(encounter.ts, encounter.ownship[0][:,np.newaxis], encounter.unit_vectors[0][:,np.newaxis])
+    return cycle_ticks(encounter.num_ticks, lambda k: estimator.update(encounter.ownship[k][:,np.newaxis], encounter.unit_vectors[k][:,np.newaxis]))
+
+def particle_filter_case(cls, encounter, num_particles, seed=0):
+    measurement, state, _ = encounter.tick(0)
+    estimator = cls(measurement.bearing, state.yaw, encounter.ts, num_particles=num_particles, rng=seed)
+    def step(k):
+        # the same sequence as twodcollisionsimparticlefilter.py
+        measurement, state, input = encounter.tick(k)
+        estimator.propagate_model(state, input)
+        estimator.measurement_update(measurement)
+        estimator.resample(measurement)
+    return cycle_ticks(encounter.num_ticks, step)
+
+class BearingOnlyPlanning:
+    def __init__(self, num_particles=1000, warmup_steps=6, seed=0) -> None:
+        """
+            The two intruder encounter of other/particle_filter_improved.py, run for
+            warmup_steps so the filters, the pdfs and the planner all have something to work on.
+            The measurement noise and every filter draw from their own stream spawned from seed.
+        """
+        import particle_filter_improved as pfi
+        from particle_filter import Particle_Filter
+        from path_planner import PathPlanner
+        self.pfi = pfi
+        self.ts = 0.2
+        self.num_intruders = len(pfi.actual_pis)
+        self.noise_rng, *filter_rngs = spawn_generators(seed, self.num_intruders+1)
+        self.step = 0
+        self.filters = []
+        lms = [[] for i in range(self.num_intruders)]
+        for step in range(2):
+            for i in range(self.num_intruders):
+                lms[i].append(self.measurement(i, step)[0])
+        for i in range(self.num_intruders):
+            tau = self.measurement(i, 1)[1]
+            self.filters.append(Particle_Filter(num_particles, lms[i][0], lms[i][1], tau, pfi.po, pfi.po+pfi.vo*self.ts, pfi.ec,
+                                                pfi.r_min, pfi.r_max, pfi.v_max, self.ts, rng=filter_rngs[i]))
+        self.step = 2
+        for _ in range(warmup_steps):
+            self.update_filters()
+        self.planner = PathPlanner((0,200))
+        self.kdes = self.calculate_pdfs()
+        self.collision_model = self.calculate_collision_model()
+        self.reactive = CollisionConeController(-np.pi/4, np.pi/4)
+        self.maneuvers = constant_turn_trajectories(np.zeros(2), 0., np.linalg.norm(pfi.vo), self.reactive.candidates, self.reactive.times)
+
+    def own_position(self, step):
+        return self.pfi.po + self.pfi.vo*self.ts*step
+
+    def measurement(self, i, step):
+        """
+            noisy line of sight and time to collision of intruder i at a timestep
+        """
+        pi = self.pfi.actual_pis[i] + self.pfi.actual_vis[i]*self.ts*step
+        po = self.own_position(step)
+        lm = pi - po
+        lm /= lm.item(1)
+        lm[0,0] += self.noise_rng.normal(0,0.0005)
+        lm /= np.linalg.norm(lm)
+        tau = ((po-pi).T @ self.pfi.ec)/((self.pfi.actual_vis[i]-self.pfi.vo).T @ self.pfi.ec)
+        return lm, tau
+
+    def update_filters(self):
+        for i in range(self.num_intruders):
+            lm, tau = self.measurement(i, self.step)
+            self.filters[i].update(lm, self.own_position(self.step), tau, False)
+        self.step += 1
+
+    def calculate_pdfs(self):
+        kdes, _, _ = self.pfi.calculate_problematic_and_pdfs(self.step*self.ts, self.ts, self.filters, self.own_position(self.step), self.pfi.vo, self.pfi.vo_max)
+        return kdes
+
+    def calculate_collision_model(self):
+        return self.pfi.calculate_collision_model(self.ts, self.filters)
+
+    def plan(self):
+        return self.planner.update(self.own_position(self.step), self.kdes)
+
+    def plan_particles(self):
+        return self.planner.update(self.own_position(self.step), self.collision_model)
+
+    def collision_probabilities(self):
+        # post-hoc risk of the last planned control points
+        return self.collision_model.probabilities(np.reshape(self.planner.old_path, (-1, 2)))
+
+    def score_maneuvers(self):
+        particles = [f.get_particle_arrays() for f in self.filters]
+        own = self.maneuvers + np.reshape(self.own_position(self.step), (1,1,2))
+        return score_trajectories(own, self.reactive.times, np.stack([p for p, v in particles]), np.stack([v for p, v in particles]),
+                                  np.stack([f.weights for f in self.filters]), num_samples=100)
+
+    def react(self):
+        particles = [f.get_particle_arrays() for f in self.filters]
+        vo = self.pfi.vo
+        return self.reactive.update(self.own_position(self.step), np.arctan2(vo.item(0), vo.item(1)), np.linalg.norm(vo),
+                                    [p for p, v in particles], [v for p, v in particles], [f.weights for f in self.filters])
+
+def build_cases(particle_counts, planning_particles, seed=0):
+    """
+        list of (name, group, params, setup) where setup() returns the function to time
+    """
+    encounter = lambda: Encounter2D(seed=seed)
+    cases = [
+        ("TargetEKF", "ekf", {}, lambda: ekf_case(TargetEKF, encounter())),
+        ("InverseDepthEKF", "ekf", {}, lambda: ekf_case(InverseDepthEKF, encounter())),
+        ("PositionEKF", "ekf", {}, lambda: position_ekf_case(encounter())),
+        ("TTCUnscentedEKF", "ukf", {}, lambda: ekf_case(TTCUnscentedEKF, encounter())),
+        ("OutOfSequenceFilter[TargetEKF]", "ekf", {"max_delay_ticks": 5}, lambda: out_of_sequence_case(encounter(), seed=seed)),
+        ("PseudoLinearKF", "plkf", {}, lambda: plkf_case(Encounter2D(targetyaw=np.pi/2, offset=50.))),
+        ("PseudoLinearKF3D", "plkf", {}, lambda: plkf_3d_case(Encounter3D())),
+    ]
+    for cls, name in ((TTCParticleFilter, "TTCParticleFilter"), (ImprovedTTCParticleFilter, "ImprovedTTCParticleFilter"),
+                      (InverseDepthParticleFilter, "InverseDepthParticleFilter")):
+        for n in particle_counts:
+            cases.append((f"{name}[{n}]", "particle_filter", {"num_particles": n},
+                          lambda cls=cls, n=n: particle_filter_case(cls, encounter(), n, seed)))
+
+    planning = []
+    def get_planning():
+        # the setup is shared by the planner cases, it is slow
+        if not planning:
+            planning.append(BearingOnlyPlanning(planning_particles, seed=seed))
+        return planning[0]
+    params = {"num_particles": planning_particles}
+    cases += [
+        ("Particle_Filter.update", "planning", params, lambda: get_planning().update_filters),
+        ("calculate_problematic_and_pdfs", "planning", params, lambda: get_planning().calculate_pdfs),
+        ("PathPlanner.update", "planning", params, lambda: get_planning().plan),
+        ("calculate_collision_model", "planning", params, lambda: get_planning().calculate_collision_model),
+        ("PathPlanner.update[particles]", "planning", params, lambda: get_planning().plan_particles),
+        ("ParticleCollisionModel.probabilities", "planning", params, lambda: get_planning().collision_probabilities),
+        ("CollisionConeController.update", "planning", params, lambda: get_planning().react),
+        ("score_trajectories", "planning", params, lambda: get_planning().score_maneuvers),
+    ]
+    return cases
+
+def compare(results, baseline):
+    """
+        prints the change of the median tick time of every case that is in both runs
+    """
+    old = {r["name"]: r for r in baseline["results"] if "median" in r}
+    print(f"\n{'case':45s} {'old (ms)':>10s} {'new (ms)':>10s} {'ratio':>7s}")
+    for r in results:
+        if "median" in r and r["name"] in old:
+            before = old[r["name"]]["median"]
+            print(f"{r['name']:45s} {1e3*before:10.3f} {1e3*r['median']:10.3f} {r['median']/before:7.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-o", "--output", required=True, help="JSON file the results are written to")
+    parser.add_argument("-k", "--filter", default=None, help="only run the cases whose name matches this regex")
+    parser.add_argument("--particles", type=int, nargs="+", default=DEFAULT_PARTICLES)
+    parser.add_argument("--planning-particles", type=int, default=1000)
+    parser.add_argument("--budget", type=float, default=0.01, help="per tick budget (s)")
+    parser.add_argument("--min-ticks", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.5, help="minimum time spent timing each case (s)")
+    parser.add_argument("--max-ticks", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--compare", default=None, help="results of an earlier run to compare against")
+    args = parser.parse_args()
+
+    results = []
+    for name, group, params, setup in build_cases(args.particles, args.planning_particles, args.seed):
+        if args.filter is not None and re.search(args.filter, name) is None:
+            continue
+        result = {"name": name, "group": group, "params": params}
+        try:
+            # diverging filters (nan/inf states) are still timed, their warnings are just noise here
+            with np.errstate(all="ignore"):
+                times = time_ticks(setup(), args.min_ticks, args.min_time, args.max_ticks)
+            result.update(summarize(times, args.budget))
+            flag = "" if result["within_budget"] else "  over budget"
+            print(f"{name:45s} median {1e3*result['median']:10.3f} ms  p95 {1e3*result['p95']:10.3f} ms{flag}")
+        except Exception as e:
+            # a broken estimator shouldn't stop the rest of the suite
+            result["error"] = f"{type(e).__name__}: {e}"
+            print(f"{name:45s} failed: {result['error']}")
+        results.append(result)
+
+    save_results(args.output, results, budget=args.budget, seed=args.seed, particles=args.particles,
+                 planning_particles=args.planning_particles)
+    if args.compare is not None:
+        compare(results, load_results(args.compare))
@@ -0,0 +1,103 @@
+"""
+    Canned, deterministic encounters used as inputs by the benchmarks. Everything the
+    estimators consume (ownship states, measurements, inputs) is computed up front so
+    the benchmarks only time the estimators themselves.
+"""
+
+import numpy as np
+from dynamics.constantVelocity import ConstantVelocity
+from dynamics.constant_velocity3D import ConstantVelocity as ConstantVelocity3D
+from sensors.bearingSensor import BearingSensor
+from sensors.unitVectorSensor import UnitVectorSensor
+from controllers.helical_navigation_law import HelicalNavigationLaw
+from msg.twoDYawState import TwoDYawState
+from msg.bearing_msg import BearingMsg
+from tools.rng import spawn_generators
+
+class Encounter2D:
+    def __init__(self, tc=30., targetvel=15., targetyaw=-np.pi, offset=0., v0=20., yaw_rate=-0.01,
+                 noise_std=0., ts=0.01, duration=20., seed=0) -> None:
+        """
+            UAV flying north at v0 and a target that would collide with it after tc seconds
+            (the geometry of twodcollisionsimekf.py), offset moves the target sideways
+            (e.g. the +50 case of twodcol_plkf.py). noise_std is the standard deviation of
+            the bearing and unit vector noise, seed makes the noise repeatable.
+        """
+        self.ts = ts
+        self.num_ticks = int(round(duration/ts))
+        self.targetvel = targetvel
+        self.targetyaw = targetyaw
+        bearing_rng, unit_vector_rng = spawn_generators(seed, 2)
+
+        initial_pos = np.array([[0.,0.]]).T
+        uav = ConstantVelocity(ts, initial_pos, 0., v0)
+        xi = -tc*targetvel*np.sin(targetyaw) + offset
+        yi = tc*v0 - tc*targetvel*np.cos(targetyaw)
+        target = ConstantVelocity(ts, np.array([[xi,yi]]).T, targetyaw, targetvel)
+        bearing_sensor = BearingSensor(noise_std, rng=bearing_rng)
+        unit_vector_sensor = UnitVectorSensor(noise_std, rng=unit_vector_rng)
+
+        # rows of [xpos, ypos, yaw, vel] for every tick
+        self.ownship = np.zeros((self.num_ticks, 4))
+        self.target = np.zeros((self.num_ticks, 4))
+        # ownship [x, y, vx, vy] used by the pseudolinear filter
+        self.cartesian = np.zeros((self.num_ticks, 4))
+        self.bearings = np.zeros(self.num_ticks)
+        self.unit_vectors = np.zeros((self.num_ticks, 2))
+        self.inputs = np.full(self.num_ticks, yaw_rate)
+        self.t = np.arange(self.num_ticks)*ts
+        for k in range(self.num_ticks):
+            self.ownship[k] = uav.true_state.toArray()[:,0]
+            self.target[k] = target.true_state.toArray()[:,0]
+            self.cartesian[k] = uav.true_state.toCartesianArray()[:,0]
+            target_pos = np.reshape(target.true_state.getPos(), (1,2))
+            self.bearings[k] = bearing_sensor.update_batch(uav.true_state.getPos(), uav.true_state.yaw, target_pos)[0][0]
+            self.unit_vectors[k] = unit_vector_sensor.update_batch(uav.true_state.getPos(), target_pos)[0][0]
+            uav.update(yaw_rate)
+            target.update()
+
+        self.ownship_states = [TwoDYawState.fromBuffer(row) for row in self.ownship]
+        self.measurements = [BearingMsg(self.bearings[k], self.ownship[k,2]) for k in range(self.num_ticks)]
+
+    def tick(self, k):
+        """
+            measurement, ownship state and input of tick k
+        """
+        return self.measurements[k], self.ownship_states[k], self.inputs[k]
+
+    def target_velocities(self):
+        """
+            (num_ticks, 2) true target velocities
+        """
+        return self.target[:,3:4]*np.stack([np.sin(self.target[:,2]), np.cos(self.target[:,2])], axis=1)
+
+class Encounter3D:
+    def __init__(self, tc=30., radius=20., omega=2*np.pi/5, v0=(20.,0.,0.), targetvel=(-15.,0.,0.),
+                 noise_std=0., ts=0.01, duration=20., seed=0) -> None:
+        """
+            UAV flying a helix about the x axis toward a target that would collide with
+            the helix center after tc seconds (the geometry of threedcol_plkf.py)
+        """
+        self.ts = ts
+        self.num_ticks = int(round(duration/ts))
+
+        v0 = np.array([v0], dtype=float).T
+        targetvel = np.array([targetvel], dtype=float).T
+        initial_pos = np.zeros((3,1))
+        uav = ConstantVelocity3D(ts, initial_pos + np.array([[0., radius, 0.]]).T, v0+np.array([[0., 0., radius*omega]]).T)
+        target = ConstantVelocity3D(ts, initial_pos + (v0 - targetvel)*tc, targetvel)
+        controller = HelicalNavigationLaw(ts, radius, omega)
+        sensor = UnitVectorSensor(noise_std, rng=seed)
+
+        # rows of [x, y, z, vx, vy, vz] for every tick
+        self.ownship = np.zeros((self.num_ticks, 6))
+        self.target = np.zeros((self.num_ticks, 6))
+        self.unit_vectors = np.zeros((self.num_ticks, 3))
+        self.t = np.arange(self.num_ticks)*ts
+        for k in range(self.num_ticks):
+            self.ownship[k] = uav.true_state.toArray()[:,0]
+            self.target[k] = target.true_state.toArray()[:,0]
+            self.unit_vectors[k] = sensor.update_batch(uav.true_state.getPos(), np.reshape(target.true_state.getPos(), (1,3)))[0][0]
+            accel = controller.update(np.array([[1., 0., 0.]]).T, uav.true_state.toArray()[3:])
+            uav.update(accel)
+            target.update()
@@ -0,0 +1,69 @@
+"""
+    Helpers to time estimator ticks and save the results as JSON
+"""
+
+import json
+import platform
+import subprocess
+import time
+import os
+import numpy as np
+
+def time_ticks(tick, min_ticks=5, min_time=0.5, max_ticks=1000, warmup=1):
+    """
+        Calls tick() warmup times, then times it until both min_ticks calls and min_time
+        seconds have gone by (or max_ticks calls). Returns the array of per call times (s).
+    """
+    for _ in range(warmup):
+        tick()
+    times = []
+    start = time.perf_counter()
+    while len(times) < max_ticks and (len(times) < min_ticks or time.perf_counter() - start < min_time):
+        t0 = time.perf_counter()
+        tick()
+        times.append(time.perf_counter() - t0)
+    return np.array(times)
+
+def summarize(times, budget=None):
+    """
+        Statistics of an array of per tick times, all in seconds
+    """
+    summary = {
+        "ticks": int(times.shape[0]),
+        "mean": float(np.mean(times)),
+        "median": float(np.median(times)),
+        "p95": float(np.percentile(times, 95)),
+        "min": float(np.min(times)),
+        "max": float(np.max(times)),
+        "std": float(np.std(times)),
+    }
+    if budget is not None:
+        summary["within_budget"] = bool(summary["p95"] <= budget)
+    return summary
+
+def environment_info():
+    """
+        Where the results came from, so files from different commits or machines can be told apart
+    """
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=root, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "system": platform.system(),
+    }
+
+def save_results(path, results, **metadata):
+    with open(path, "w") as f:
+        json.dump({"environment": environment_info(), "metadata": metadata, "results": results}, f, indent=2)
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
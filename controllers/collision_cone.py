@@ -0,0 +1,83 @@
+"""
+    Reactive collision cone controller that checks a fan of candidate yaw rates against every
+    particle of every intruder at once. Meant as a low latency fallback for when the path
+    planner misses its deadline.
+"""
+
+import numpy as np
+from tools.fisher_information import constant_turn_trajectories
+
+class CollisionConeController:
+    def __init__(self, lower_bound, upper_bound, num_candidates=21, horizon=5., num_steps=25,
+                 safe_radius=10., nominal_yaw_rate=0.) -> None:
+        """
+            Each candidate yaw rate in [lower_bound, upper_bound] is held for horizon seconds and
+            the ownship arc is sampled at num_steps times. A particle closer than safe_radius
+            at any of those times counts as a conflict. Among the safest candidates the one
+            closest to nominal_yaw_rate is picked. collision_probabilities and min_distances
+            hold the score of every candidate after each update.
+        """
+        self.lower_bound = lower_bound
+        self.upper_bound = upper_bound
+        self.candidates = np.linspace(lower_bound, upper_bound, num_candidates)
+        self.times = np.linspace(0., horizon, num_steps)
+        self.safe_radius = safe_radius
+        self.nominal_yaw_rate = nominal_yaw_rate
+        self.collision_probabilities = np.zeros(num_candidates)
+        self.min_distances = np.full(num_candidates, np.inf)
+
+    def own_trajectories(self, own_position, own_yaw, own_speed):
+        """
+            (C,K,2) positions of the ownship flying each candidate yaw rate
+        """
+        return constant_turn_trajectories(own_position, own_yaw, own_speed, self.candidates, self.times)
+
+    def update(self, own_position, own_yaw, own_speed, particle_positions, particle_velocities, weights=None):
+        """
+            particle_positions and particle_velocities are (M,N,2) arrays (or lists of (N,2)
+            arrays) of the particles of M intruders, weights is (M,N) and defaults to uniform.
+            Returns the commanded yaw rate.
+        """
+        positions = np.asarray(particle_positions, dtype=float)
+        velocities = np.asarray(particle_velocities, dtype=float)
+        if positions.ndim == 2:
+            positions = positions[np.newaxis]
+            velocities = velocities[np.newaxis]
+        num_intruders, num_particles, _ = positions.shape
+        if weights is None:
+            weights = np.ones((num_intruders, num_particles))
+        weights = np.reshape(np.asarray(weights, dtype=float), (num_intruders, num_particles))
+        weights = weights/np.sum(weights, axis=1, keepdims=True)
+
+        own = self.own_trajectories(own_position, own_yaw, own_speed)
+        positions = np.reshape(positions, (-1, 2))
+        velocities = np.reshape(velocities, (-1, 2))
+        # particles that can't get within the safe radius of anywhere the ownship can reach are skipped
+        reach = self.safe_radius + (own_speed + np.linalg.norm(velocities, axis=1))*self.times[-1]
+        near = np.flatnonzero(np.linalg.norm(positions - np.reshape(own_position, (1,2)), axis=1) <= reach)
+
+        # closest approach of every (candidate, nearby particle), one time step at a time so the
+        # (C,n) working arrays stay in cache instead of building the whole (C,n,K) array
+        closest = np.full((len(self.candidates), len(near)), np.inf)
+        futures_x = positions[near,0] + velocities[near,0]*self.times[:,np.newaxis]
+        futures_y = positions[near,1] + velocities[near,1]*self.times[:,np.newaxis]
+        for k in range(len(self.times)):
+            dist2 = (futures_x[k] - own[:,k,0:1])**2 + (futures_y[k] - own[:,k,1:2])**2
+            np.minimum(closest, dist2, out=closest)
+        closest = np.sqrt(closest)
+
+        # probability that at least one intruder comes within the safe radius, intruders are independent
+        hits = np.zeros((len(self.candidates), num_intruders*num_particles))
+        hits[:,near] = closest < self.safe_radius
+        conflict = np.einsum('cmn,mn->cm', np.reshape(hits, (-1, num_intruders, num_particles)), weights)
+        self.collision_probabilities = 1. - np.prod(1. - conflict, axis=1)
+        # only the nearby particles count, min_distances is inf when there are none
+        self.min_distances = np.min(closest, axis=1, initial=np.inf)
+
+        safest = self.collision_probabilities <= np.min(self.collision_probabilities) + 1e-12
+        if np.all(self.collision_probabilities > 0.):
+            # every command is risky, only keep the ones that pass the particles the furthest
+            safest &= self.min_distances >= np.max(self.min_distances[safest])
+        options = np.flatnonzero(safest)
+        best = options[np.argmin(np.abs(self.candidates[options] - self.nominal_yaw_rate))]
+        return self.candidates[best]
@@ -10,24 +10,30 @@ from msg.bearing_msg import BearingMsg
 class TwoDBearingNonzeroer:
     def __init__(self, Ts, num_targets, lower_bound, upper_bound) -> None:
         self.Ts = Ts
+        self.num_targets = num_targets
         self.lower_bound = lower_bound
         self.upper_bound = upper_bound
         self.yaw_derivative = DirtyDerivative(Ts, 5*Ts)
-        self.bearing_derivatives = []
-        for i in range(num_targets):
-            bearing_derivative = DirtyDerivative(Ts, 5*Ts)
-            self.bearing_derivatives.append(bearing_derivative)
+        # one channel per target
+        self.bearing_derivatives = DirtyDerivative(Ts, 5*Ts)
 
 
     def update(self, measurements:List[BearingMsg]):
-        yawd = self.yaw_derivative.update(measurements[0].yaw)
-        smallestbd = float('inf')
-        indexsmallest = -1
-        for i, measurement in enumerate(measurements):
-            bd = self.bearing_derivatives[i].update(measurement.bearing)# + yawd
-            if np.abs(bd) < smallestbd:
-                smallestbd = bd
-                indexsmallest = i
+        bearings = np.full(self.num_targets, np.nan)
+        bearings[:len(measurements)] = [measurement.bearing for measurement in measurements]
+        return self.update_batch(bearings, measurements[0].yaw)
+
+    def update_batch(self, bearings:np.ndarray, yaw:float):
+        """
+            bearings is the (num_targets,) array of BearingSensor.update_batch, targets that
+            aren't seen (nan) are left out and their derivative restarts when they reappear
+        """
+        yawd = self.yaw_derivative.update(yaw)
+        bds = self.bearing_derivatives.update(bearings)# + yawd
+        visible = np.flatnonzero(np.isfinite(bds))
+        if len(visible) == 0:
+            return self.saturate(0.)
+        smallestbd = bds[visible[np.argmin(np.abs(bds[visible]))]]
         gain = 10e-4
         if smallestbd == 0.0:
             return self.saturate(-gain/(smallestbd+0.001))
@@ -39,4 +45,4 @@ class TwoDBearingNonzeroer:
         elif input < self.lower_bound:
             return self.lower_bound
         return input
-        
+
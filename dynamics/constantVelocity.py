@@ -10,10 +10,10 @@ class ConstantVelocity:
     def __init__(self, Ts, initialPosition:np.ndarray, initial_yaw:float, velocity:float) -> None:
         self._ts = Ts
 
-        self._state = deepcopy(initialPosition)
+        self._state = deepcopy(initialPosition).astype(float)
         self._state = np.append(self._state, np.array([[initial_yaw, velocity]]).T, axis=0)
-        self.true_state = TwoDYawState()
-        self.true_state.fromArray(self._state)
+        # true_state is a view of _state, so it never has to be copied back
+        self.true_state = TwoDYawState.fromBuffer(self._state[:,0])
     
     def update(self, psid=0.):
         """
@@ -26,6 +26,55 @@ class ConstantVelocity:
         psi = self._state.item(2)
         vel = self._state.item(3)
 
-        self._state[0:3] += np.array([[vel*np.sin(psi), vel*np.cos(psi), psid]]).T*self._ts
-        self.true_state.fromArray(self._state)
-        
\ No newline at end of file
+        self._state[0,0] += vel*np.sin(psi)*self._ts
+        self._state[1,0] += vel*np.cos(psi)*self._ts
+        self._state[2,0] += psid*self._ts
+
+class Fleet:
+    """
+        N agents moving at constant velocity in the 2D plane, integrated together.
+        The states are stored in one (N,4) array with rows [xpos, ypos, yaw, vel].
+    """
+    def __init__(self, Ts, initial_positions:np.ndarray, initial_yaws, velocities) -> None:
+        self._ts = Ts
+        initial_positions = np.asarray(initial_positions, dtype=float)
+        num_agents = initial_positions.shape[0]
+        self._states = np.empty((num_agents, 4))
+        self._states[:,0:2] = initial_positions
+        self._states[:,2] = initial_yaws
+        self._states[:,3] = velocities
+
+    @property
+    def num_agents(self):
+        return self._states.shape[0]
+
+    @property
+    def states(self):
+        """
+            (N,4) view of the states
+        """
+        return self._states
+
+    @property
+    def positions(self):
+        """
+            (N,2) view of the positions
+        """
+        return self._states[:,0:2]
+
+    def true_state(self, i) -> TwoDYawState:
+        """
+            TwoDYawState that is a view of the state of agent i
+        """
+        return TwoDYawState.fromBuffer(self._states[i])
+
+    def update(self, psid=0.):
+        """
+            Integrate all of the agents one time step. psid is a yaw rate command that
+            is either shared by all agents or an (N,) array of per-agent commands.
+        """
+        psi = self._states[:,2]
+        vel = self._states[:,3]
+        self._states[:,0] += vel*np.sin(psi)*self._ts
+        self._states[:,1] += vel*np.cos(psi)*self._ts
+        self._states[:,2] += np.asarray(psid)*self._ts
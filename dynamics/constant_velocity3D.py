@@ -10,9 +10,9 @@ class ConstantVelocity:
     def __init__(self, Ts, initialPosition:np.ndarray, velocity:np.ndarray) -> None:
         self._ts = Ts
 
-        self._state = np.concatenate((initialPosition, velocity), axis=0)
-        self.true_state = ThreeDState()
-        self.true_state.fromArray(self._state)
+        self._state = np.concatenate((initialPosition, velocity), axis=0).astype(float)
+        # true_state is a view of _state, so it never has to be copied back
+        self.true_state = ThreeDState.fromBuffer(self._state[:,0])
     
     def update(self, accel=np.array([[0.,0.,0.]]).T):
         """
@@ -24,5 +24,51 @@ class ConstantVelocity:
         # just use Newton's method
         self._state[0:3] += self._state[3:]*self._ts
         self._state[3:] += accel*self._ts
-        self.true_state.fromArray(self._state)
-        
\ No newline at end of file
+
+class Fleet:
+    """
+        N agents moving at constant velocity in 3D, integrated together.
+        The states are stored in one (N,6) array with rows [xpos, ypos, zpos, xvel, yvel, zvel].
+    """
+    def __init__(self, Ts, initial_positions:np.ndarray, velocities:np.ndarray) -> None:
+        self._ts = Ts
+        self._states = np.concatenate((np.asarray(initial_positions, dtype=float), np.asarray(velocities, dtype=float)), axis=1)
+
+    @property
+    def num_agents(self):
+        return self._states.shape[0]
+
+    @property
+    def states(self):
+        """
+            (N,6) view of the states
+        """
+        return self._states
+
+    @property
+    def positions(self):
+        """
+            (N,3) view of the positions
+        """
+        return self._states[:,0:3]
+
+    @property
+    def velocities(self):
+        """
+            (N,3) view of the velocities
+        """
+        return self._states[:,3:6]
+
+    def true_state(self, i) -> ThreeDState:
+        """
+            ThreeDState that is a view of the state of agent i
+        """
+        return ThreeDState.fromBuffer(self._states[i])
+
+    def update(self, accel=0.):
+        """
+            Integrate all of the agents one time step. accel is either an acceleration
+            shared by all agents ((3,) array) or an (N,3) array of per-agent commands.
+        """
+        self._states[:,0:3] += self._states[:,3:6]*self._ts
+        self._states[:,3:6] += np.asarray(accel)*self._ts
@@ -1,55 +1,21 @@
-
-
 import numpy as np
 from scipy.stats import norm
 from numpy import sin, cos
 from copy import deepcopy
-from msg.twoDYawState import TwoDYawState
+from msg.twoDYawState import TwoDYawState, make_state_array, state_matrix
 from msg.bearing_msg import BearingMsg
-
-class Particle:
-    def __init__(self, eta, rho, vi, yawi, yawo, ts) -> None:
-        self.xhat = np.array([[eta, rho, vi, yawi, yawo]]).T
-        self.ts = ts
-        self.weight = 1
-
-    def update(self, state:TwoDYawState, input):
-        x1 = self._f(self.xhat, state, input)
-        x2 = self._f(self.xhat + self.ts/2.*x1, state, input)
-        x3 = self._f(self.xhat + self.ts/2*x2, state, input)
-        x4 = self._f(self.xhat + self.ts*x3, state, input)
-
-        self.xhat += self.ts/6.*(x1+2*x2+2*x3+x4)
-
-
-    def _f(self, x, state, input):
-        # get values needed for the calculation
-        eta = x.item(0)
-        rho = x.item(1)
-        vi = x.item(2)
-        psii = x.item(3)
-        psi = x.item(4)
-        vo = state.vel 
-        psid = input
-        # calculate xdot
-        xdot = np.array([[vo*rho*sin(eta)-vi*rho*sin(eta+psi-psii)-psid, (vo*cos(eta)-vi*cos(eta+psi-psii))*rho**2, 0., 0., psid]]).T
-        return xdot
-    
-    def get_state(self, uav_state:TwoDYawState):
-        theta = self.xhat.item(4)+self.xhat.item(0)
-        d = 1/self.xhat.item(1)
-        xpos = d*np.sin(theta) + uav_state.getPos().item(0)
-        ypos = d*np.cos(theta) + uav_state.getPos().item(1)
-
-        state = TwoDYawState(xpos, ypos, self.xhat.item(3),self.xhat.item(2))
-        state.weight = self.weight
-        return state
+from tools.instrumentation import timed, count, record, is_enabled
+from tools.rng import as_generator
+from tools.discretization import DiscretizationCache, substeps
 
 class InverseDepthParticleFilter:
-    def __init__(self, initial_bearing, initial_yaw, ts) -> None:
+    def __init__(self, initial_bearing, initial_yaw, ts, num_particles=500, rng=None) -> None:
+        """
+            rng is the numpy Generator (or seed) all of the random draws come from
+        """
+        self.rng = as_generator(rng)
         self.ts = ts
-        self.num_particles = 500
-        self.particles = []
+        self.num_particles = num_particles
         self.bearing_std = 0.01
         self.yaw_std = 0.01
         self.Rinv = np.diag([1/self.bearing_std**2, 1/self.yaw_std**2])
@@ -60,73 +26,124 @@ class InverseDepthParticleFilter:
         rho_max = 0.5
         vi_max = 50
         vi_min = 2
-        for i in range(self.num_particles):
-            particle = Particle(initial_bearing,#np.random.normal(initial_bearing, self.bearing_std),
-                                (rho_max - rho_min)*np.random.rand()+rho_min,
-                                (vi_max-vi_min)*np.random.rand()+vi_min,
-                                2*np.pi*np.random.rand(),
-                                initial_yaw,#np.random.normal(initial_yaw, self.yaw_std), 
-                                ts)
-            self.particles.append(particle)
+        # each column is the state [eta, rho, vi, yawi, yawo] of a particle
+        self.xhats = np.zeros((5, self.num_particles))
+        self.xhats[0] = initial_bearing #np.random.normal(initial_bearing, self.bearing_std)
+        self.xhats[1] = (rho_max - rho_min)*self.rng.random(self.num_particles)+rho_min
+        self.xhats[2] = (vi_max-vi_min)*self.rng.random(self.num_particles)+vi_min
+        self.xhats[3] = 2*np.pi*self.rng.random(self.num_particles)
+        self.xhats[4] = initial_yaw #np.random.normal(initial_yaw, self.yaw_std)
+        self.weights = np.ones(self.num_particles)
+        # time of the particles, predict moves it forward
+        self.t = 0.
+        self.discretizations = DiscretizationCache(self._discretize)
 
     def update(self, measurement:BearingMsg, state:TwoDYawState, input:float):
         self.propagate_model(state, input)
         # self.measurement_update(measurement)
         # self.resample(measurement)
 
-    def propagate_model(self, state:TwoDYawState, input:float):
-        for particle in self.particles:
-            particle.update(state, input)
+    def predict(self, dt, state:TwoDYawState, input:float):
+        """
+            propagates the particles dt seconds ahead, in RK4 steps no longer than ts
+        """
+        self.propagate_model(state, input, dt)
+
+    def correct(self, measurement:BearingMsg, state:TwoDYawState, t=None, input=0.):
+        """
+            weights and resamples the particles with a measurement taken at time t, they are
+            predicted up to t first so a camera that skips ticks only needs to call correct
+        """
+        if t is not None and t > self.t:
+            self.predict(t - self.t, state, input)
+        self.measurement_update(measurement)
+        self.resample(measurement)
+
+    def _discretize(self, dt):
+        return substeps(dt, self.ts)
+
+    @timed()
+    def propagate_model(self, state:TwoDYawState, input:float, dt=None):
+        steps, h = self.discretizations(self.ts if dt is None else dt)
+        for k in range(steps):
+            # RK4 on all of the particles at once
+            x1 = self._f(self.xhats, state, input)
+            x2 = self._f(self.xhats + h/2.*x1, state, input)
+            x3 = self._f(self.xhats + h/2*x2, state, input)
+            x4 = self._f(self.xhats + h*x3, state, input)
+
+            self.xhats += h/6.*(x1+2*x2+2*x3+x4)
+        self.t += self.ts if dt is None else dt
     
+    @timed()
     def measurement_update(self, measurement:BearingMsg):
-        for particle in self.particles:
-            y = np.array([[measurement.bearing, measurement.yaw]]).T
-            h = np.array([[particle.xhat.item(0), particle.xhat.item(4)]]).T
-            particle.weight = np.exp(-1/2. * (y-h).T @ self.Rinv @ (y-h)).item(0)
-
-
+        y = np.array([[measurement.bearing, measurement.yaw]]).T
+        dif = y - self.xhats[[0,4]]
+        self.weights = np.exp(-1/2. * np.einsum('in,ij,jn->n', dif, self.Rinv, dif))
+        if is_enabled():
+            # effective sample size, it works with unnormalized weights too
+            record("InverseDepthParticleFilter.ess", np.sum(self.weights)**2/np.sum(self.weights**2))
+
+    @timed()
     def resample(self, measurement:BearingMsg):
-        sum_of_weights = 0
-        weights = []
-        for particle in self.particles:
-            sum_of_weights += particle.weight
-            weights.append(particle.weight)
-        
-        weights = np.array(weights)
-        norm_weights = weights/sum_of_weights
+        count("InverseDepthParticleFilter.resamples")
+        norm_weights = self.weights/np.sum(self.weights)
         norm_weights[-1] = 1.
-        for i in range(1,self.num_particles):
-            norm_weights[i] += norm_weights[i-1]
+        norm_weights = np.cumsum(norm_weights)
         rand = np.linspace(0, 1, self.num_particles)#np.random.rand(self.num_particles)
         # rand = np.sort(rand)
 
-        old_particles = deepcopy(self.particles)
-        self.particles.clear()
+        # index of the particle sampled by each random number
+        j = np.searchsorted(norm_weights, rand, side='left')
+        old_particles = self.xhats[:, j]
+        self.xhats = np.empty_like(old_particles)
+        self.xhats[0] = measurement.bearing #np.random.normal(old_particles[0], self.bearing_std)
+        self.xhats[1] = self.rng.normal(old_particles[1], self.rho_resample_std)
+        self.xhats[2] = self.rng.normal(old_particles[2], self.vi_resample_std)
+        self.xhats[3] = self.rng.normal(old_particles[3], self.yaw_resample_std)
+        self.xhats[4] = measurement.yaw #np.random.normal(old_particles[4], self.yaw_std)
+        self.weights = np.ones(self.num_particles)
+
+    def _f(self, x, state, input):
+        # get values needed for the calculation, each row holds one state for every particle
+        eta = x[0]
+        rho = x[1]
+        vi = x[2]
+        psii = x[3]
+        psi = x[4]
+        vo = state.vel 
+        psid = input
+        # calculate xdot
+        xdot = np.zeros_like(x)
+        xdot[0] = vo*rho*sin(eta)-vi*rho*sin(eta+psi-psii)-psid
+        xdot[1] = (vo*cos(eta)-vi*cos(eta+psi-psii))*rho**2
+        xdot[4] = psid
+        return xdot
 
-        i = 0 # random number
-        j = 0 # particle to be sampled
-        while i < self.num_particles:
-            while rand[i] > norm_weights[j]:
-                j += 1
-            old_particle = old_particles[j]
-            particle = Particle(measurement.bearing,#np.random.normal(old_particle.xhat.item(0), self.bearing_std),#measurement.bearing,#
-                                np.random.normal(old_particle.xhat.item(1), self.rho_resample_std),
-                                np.random.normal(old_particle.xhat.item(2), self.vi_resample_std),
-                                np.random.normal(old_particle.xhat.item(3), self.yaw_resample_std),
-                                measurement.yaw,#np.random.normal(old_particle.xhat.item(4), self.yaw_std),#measurement.yaw,#
-                                self.ts)
-            self.particles.append(particle)
-            i += 1
+    def particle_positions(self, uav_state:TwoDYawState):
+        """
+            Returns the (N,2) positions, (N,) headings, (N,) speeds and (N,) weights of the particles
+        """
+        theta = self.xhats[4]+self.xhats[0]
+        d = 1/self.xhats[1]
+        positions = np.empty((self.num_particles, 2))
+        positions[:,0] = d*np.sin(theta) + uav_state.xpos
+        positions[:,1] = d*np.cos(theta) + uav_state.ypos
+        return positions, self.xhats[3], self.xhats[2], self.weights
 
     def get_particle_states(self, uav_state:TwoDYawState):
-        states = []
-        for particle in self.particles:
-            states.append(particle.get_state(uav_state))
-        return states
+        positions, headings, speeds, weights = self.particle_positions(uav_state)
+        states = state_matrix(make_state_array(self.num_particles))
+        states[:,0:2] = positions
+        states[:,2] = headings
+        states[:,3] = speeds
+        states[:,4] = weights
+        return [TwoDYawState.fromBuffer(row) for row in states]
 
 def wrap(diff):
     while diff > np.pi:
         diff -= 2*np.pi
     while diff < -np.pi:
         diff += 2*np.pi
-    return diff
\ No newline at end of file
+    return diff
+
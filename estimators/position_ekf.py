@@ -6,6 +6,8 @@ import numpy as np
 from numpy import sin, cos
 from msg.twoDYawState import TwoDYawState
 from msg.bearing_msg import BearingMsg
+from tools.instrumentation import timed
+from tools.discretization import DiscretizationCache, substeps
 
 class PositionEKF:
     def __init__(self, ts) -> None:
@@ -16,15 +18,39 @@ class PositionEKF:
         self.N = 10
         self.Ts = ts
         self.Tp = ts/self.N
+        # time of the estimate, predict moves it forward
+        self.t = 0.
+        self.discretizations = DiscretizationCache(self._discretize)
 
     def update(self, measurement:BearingMsg, state:TwoDYawState):
         self.propagate_model(measurement, state)
         self.measurement_update(measurement, state)
 
-    def propagate_model(self, measurement, state):
-        for i in range(self.N):
+    def predict(self, dt, state):
+        """
+            propagates the estimate dt seconds ahead, in substeps no longer than Tp
+        """
+        self.propagate_model(None, state, dt)
+
+    def correct(self, measurement, state, t=None):
+        """
+            measurement update with a measurement taken at time t, the estimate is predicted up
+            to t first so a camera that skips ticks only needs to call correct
+        """
+        if t is not None and t > self.t:
+            self.predict(t - self.t, state)
+        self.measurement_update(measurement, state)
+
+    def _discretize(self, dt):
+        steps, Tp = substeps(dt, self.Tp)
+        return steps, Tp, Tp**2 * self.Q
+
+    @timed()
+    def propagate_model(self, measurement, state, dt=None):
+        steps, Tp, Qd = self.discretizations(self.Ts if dt is None else dt)
+        for i in range(steps):
             # propagate model
-            self.xhat += self.Tp*self._f(self.xhat, measurement, state)
+            self.xhat += Tp*self._f(self.xhat, measurement, state)
             self.xhat[3,0]=wrap(self.xhat[3,0])
             # get values for computing jacobian
             uavpos = state.getPos()
@@ -36,10 +62,12 @@ class PositionEKF:
                           [0.,0.,0.,0.],
                           [0.,0.,0.,0.]])
             # convert to discrete time model
-            A_d = np.identity(4) + A*self.Tp + A@A*self.Tp**2
+            A_d = np.identity(4) + A*Tp + A@A*Tp**2
             # update P with discrete time model
-            self.P = A_d @self.P @ A_d.T + self.Tp**2 * self.Q
+            self.P = A_d @self.P @ A_d.T + Qd
+        self.t += self.Ts if dt is None else dt
 
+    @timed()
     def measurement_update(self, measurement, state):
         xi = self.xhat.item(0)
         yi = self.xhat.item(1)
@@ -3,6 +3,8 @@ This observer is based on the work of Li, Jianan et al. in their 2023 paper on T
 """
 
 import numpy as np
+from tools.instrumentation import timed
+from tools.discretization import DiscretizationCache
 
 class PseudoLinearKF:
     def __init__(self, ts, xi, first_measurement) -> None:
@@ -13,23 +15,56 @@ class PseudoLinearKF:
                                range_guess*first_measurement.item(1), 
                                -velocity_guess*first_measurement.item(0), 
                                -velocity_guess*first_measurement.item(1)]]).T
-        self.A = np.eye(4)
-        self.A[0:2, 2:] = ts * np.eye(2)
-        self.B = np.zeros((4, 2))
-        self.B[0:2] = 1/2. * ts * np.eye(2)
-        self.B[2:] = ts * np.eye(2)
+        self.ts = ts
+        self.A, self.B = self._transition(ts)
 
         self.Q = np.diag([0.01, 0.01])
         self.R = np.diag([0.001, 0.001])
 
-        self.xi_prev = xi
+        self.xi_prev = np.copy(xi)
+        # time of the estimate, predict moves it forward
+        self.t = 0.
+        self.discretizations = DiscretizationCache(self._discretize)
 
+    def _transition(self, dt):
+        A = np.eye(4)
+        A[0:2, 2:] = dt * np.eye(2)
+        B = np.zeros((4, 2))
+        B[0:2] = 1/2. * dt * np.eye(2)
+        B[2:] = dt * np.eye(2)
+        return A, B
+
+    def _discretize(self, dt):
+        A, B = self._transition(dt)
+        return A, B @ self.Q @ B.T
+
+    @timed()
     def update(self, xi, unit_vec):
-        self.xhat = self.A @ (self.xhat + self.xi_prev) - xi
-        self.P = self.A @ self.P @ self.A.T + self.B @ self.Q @ self.B.T
-        self.xi_prev = xi
+        self.predict(self.ts, xi)
+        self.correct(unit_vec)
+
+    @timed("PseudoLinearKF.predict")
+    def predict(self, dt, xi):
+        """
+            propagates the relative state dt seconds ahead, xi is the ownship position at the new time
+        """
+        A, BQB = self.discretizations(dt)
+        self.xhat = A @ (self.xhat + self.xi_prev) - xi
+        self.P = A @ self.P @ A.T + BQB
+        self.xi_prev = np.copy(xi)
+        self.t += dt
 
-        # measurement update
+    @timed("PseudoLinearKF.correct")
+    def correct(self, unit_vec, t=None, xi=None):
+        """
+            measurement update with a unit vector measured at time t from the ownship position xi,
+            the estimate is predicted up to t first so a camera that skips ticks only needs to call correct.
+            xi is needed whenever t is given, the prediction moves the relative state with the ownship.
+        """
+        if t is not None and xi is None:
+            raise ValueError("correct needs the ownship position xi at the measurement time t")
+        if t is not None and t > self.t:
+            self.predict(t - self.t, xi)
         H  = np.zeros((2,4))
         Proj = np.eye(2) - unit_vec @ unit_vec.T
         H[:, 0:2]= Proj
@@ -6,6 +6,8 @@ import numpy as np
 from numpy import sin, cos
 from msg.twoDYawState import TwoDYawState
 from msg.bearing_msg import BearingMsg
+from tools.instrumentation import timed
+from tools.discretization import DiscretizationCache, substeps
 
 class TargetEKF:
     def __init__(self, initial_bearing, initial_yaw, ts) -> None:
@@ -16,15 +18,39 @@ class TargetEKF:
         self.N = 10
         self.Ts = ts
         self.Tp = ts/self.N
+        # time of the estimate, predict moves it forward
+        self.t = 0.
+        self.discretizations = DiscretizationCache(self._discretize)
 
     def update(self, measurement:BearingMsg, state:TwoDYawState, input):
         self.propagate_model(measurement, state, input)
         self.measurement_update(measurement, state)
 
-    def propagate_model(self, measurement, state, input):
-        for i in range(self.N):
+    def predict(self, dt, state, input):
+        """
+            propagates the estimate dt seconds ahead, in substeps no longer than Tp
+        """
+        self.propagate_model(None, state, input, dt)
+
+    def correct(self, measurement, state, t=None, input=0.):
+        """
+            measurement update with a measurement taken at time t, the estimate is predicted up
+            to t first so a camera that skips ticks only needs to call correct
+        """
+        if t is not None and t > self.t:
+            self.predict(t - self.t, state, input)
+        self.measurement_update(measurement, state)
+
+    def _discretize(self, dt):
+        steps, Tp = substeps(dt, self.Tp)
+        return steps, Tp, Tp**2 * self.Q
+
+    @timed()
+    def propagate_model(self, measurement, state, input, dt=None):
+        steps, Tp, Qd = self.discretizations(self.Ts if dt is None else dt)
+        for i in range(steps):
             # propagate model
-            self.xhat += self.Tp*self._f(self.xhat, measurement, state, input)
+            self.xhat += Tp*self._f(self.xhat, measurement, state, input)
             self.xhat[1,0] = saturate(self.xhat[1,0], 0.01, 100000)
             self.xhat[2,0] = saturate(self.xhat[2,0], 0., 1000.)
             self.xhat[3,0] = wrap(self.xhat[3,0])
@@ -43,10 +69,12 @@ class TargetEKF:
                           [0.,0.,0.,0.,0.],
                           [0.,0.,0.,0.,0.]])
             # convert to discrete time model
-            A_d = np.identity(5) + A*self.Tp + A@A*self.Tp**2
+            A_d = np.identity(5) + A*Tp + A@A*Tp**2
             # update P with discrete time model
-            self.P = A_d @self.P @ A_d.T + self.Tp**2 * self.Q
+            self.P = A_d @self.P @ A_d.T + Qd
+        self.t += self.Ts if dt is None else dt
 
+    @timed()
     def measurement_update(self, measurement, state):
         h = np.array([[self.xhat.item(0), self.xhat.item(4)]]).T
         C = np.array([[1., 0., 0., 0., 0.],
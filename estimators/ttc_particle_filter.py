@@ -4,13 +4,20 @@ import numpy as np
 from scipy.stats import norm
 from numpy import sin, cos
 from copy import deepcopy
-from msg.twoDYawState import TwoDYawState
+from msg.twoDYawState import TwoDYawState, make_state_array, state_matrix
 from msg.bearing_msg import BearingMsg
+from tools.instrumentation import timed, count, record, is_enabled
+from tools.rng import as_generator
+from tools.discretization import DiscretizationCache, substeps
 
 class TTCParticleFilter:
-    def __init__(self, initial_bearing, initial_yaw, ts) -> None:
+    def __init__(self, initial_bearing, initial_yaw, ts, num_particles=1000, rng=None) -> None:
+        """
+            rng is the numpy Generator (or seed) all of the random draws come from
+        """
+        self.rng = as_generator(rng)
         self.ts = ts
-        self.num_particles = 1000
+        self.num_particles = num_particles
         self.bearing_std = 0.01
         self.yaw_std = 0.01
         self.Rinv = np.diag([1/self.bearing_std**2, 1/self.yaw_std**2])
@@ -31,91 +38,118 @@ class TTCParticleFilter:
         tau_max = 100
         vi_max = 50
         vi_min = 2
+        # each column is the state [eta, tau, vi, yawi, yawo] of a particle
         self.xhats = np.zeros((5, self.num_particles))
+        self.xhats[0] = initial_bearing #np.random.normal(initial_bearing, self.bearing_std)
+        self.xhats[1] = (tau_max - tau_min)*self.rng.random(self.num_particles)+tau_min
+        self.xhats[2] = (vi_max-vi_min)*self.rng.random(self.num_particles)+vi_min
+        self.xhats[3] = 2*np.pi*self.rng.random(self.num_particles)
+        self.xhats[4] = initial_yaw #np.random.normal(initial_yaw, self.yaw_std)
         self.weights = np.zeros((self.num_particles))
-        for i in range(self.num_particles):
-            self.xhats[:,i] = np.array([initial_bearing,#np.random.normal(initial_bearing, self.bearing_std),
-                                (tau_max - tau_min)*np.random.rand()+tau_min,
-                                (vi_max-vi_min)*np.random.rand()+vi_min,
-                                2*np.pi*np.random.rand(),
-                                initial_yaw,#np.random.normal(initial_yaw, self.yaw_std)
-                                ])
+        # time of the particles, predict moves it forward
+        self.t = 0.
+        self.discretizations = DiscretizationCache(self._discretize)
 
     def update(self, measurement:BearingMsg, state:TwoDYawState, input:float):
         self.propagate_model(state, input)
         # self.measurement_update(measurement)
         # self.resample(measurement)
 
-    def propagate_model(self, state:TwoDYawState, input:float):
-        for i in range(self.num_particles):
-            self.xhats[:,i] = self.update_particle(self.xhats[:,i], state, input)
-
-    def update_particle(self, xhat, state:TwoDYawState, input):
-        x1 = self._f(xhat, state, input)
-        x2 = self._f(xhat + self.ts/2.*x1, state, input)
-        x3 = self._f(xhat + self.ts/2*x2, state, input)
-        x4 = self._f(xhat + self.ts*x3, state, input)
-
-        xhat += np.reshape(self.ts/6.*(x1+2*x2+2*x3+x4) + self.L @ np.array([[np.sqrt(self.vi_pr_noise)*np.random.rand(), np.sqrt(self.yaw_pr_noise)*np.random.rand()]]).T, xhat.shape) 
-        return xhat
+    def predict(self, dt, state:TwoDYawState, input:float):
+        """
+            propagates the particles dt seconds ahead, in RK4 steps no longer than ts
+        """
+        self.propagate_model(state, input, dt)
+
+    def correct(self, measurement:BearingMsg, state:TwoDYawState, t=None, input=0.):
+        """
+            weights and resamples the particles with a measurement taken at time t, they are
+            predicted up to t first so a camera that skips ticks only needs to call correct
+        """
+        if t is not None and t > self.t:
+            self.predict(t - self.t, state, input)
+        self.measurement_update(measurement)
+        self.resample(measurement)
+
+    def _discretize(self, dt):
+        # the process noise gain L is for a step of ts
+        steps, h = substeps(dt, self.ts)
+        return steps, h, self.L*np.sqrt(h/self.ts)
+
+    @timed()
+    def propagate_model(self, state:TwoDYawState, input:float, dt=None):
+        steps, h, L = self.discretizations(self.ts if dt is None else dt)
+        for k in range(steps):
+            # RK4 on all of the particles at once
+            x1 = self._f(self.xhats, state, input)
+            x2 = self._f(self.xhats + h/2.*x1, state, input)
+            x3 = self._f(self.xhats + h/2*x2, state, input)
+            x4 = self._f(self.xhats + h*x3, state, input)
+
+            # the process noise of every particle is drawn in one block
+            noise = np.array([[np.sqrt(self.vi_pr_noise), np.sqrt(self.yaw_pr_noise)]]).T * self.rng.random((2, self.num_particles))
+            self.xhats += h/6.*(x1+2*x2+2*x3+x4) + L @ noise
+        self.t += self.ts if dt is None else dt
     
+    @timed()
     def measurement_update(self, measurement:BearingMsg):
-        for i in range(self.num_particles):
-            y = np.array([[measurement.bearing, measurement.yaw]]).T
-            h = np.array([[self.xhats[:,i].item(0), self.xhats[:,i].item(4)]]).T
-            self.weights[i] = np.exp(-1/2. * (y-h).T @ self.Rinv @ (y-h)).item(0)
+        y = np.array([[measurement.bearing, measurement.yaw]]).T
+        dif = y - self.xhats[[0,4]]
+        self.weights = np.exp(-1/2. * np.einsum('in,ij,jn->n', dif, self.Rinv, dif))
         # normalize the weights
         self.weights /= np.sum(self.weights)
+        if is_enabled():
+            # effective sample size, it works with unnormalized weights too
+            record("TTCParticleFilter.ess", np.sum(self.weights)**2/np.sum(self.weights**2))
 
-
+    @timed()
     def resample(self, measurement:BearingMsg):
-        old_particles = deepcopy(self.xhats)
-        old_weights = deepcopy(self.weights)
-
-        rr = np.random.rand()/self.num_particles
-        i = 0 # particle to be sampled
-        cc = old_weights[i]
-        for mm in range(self.num_particles):
-            u = rr + (mm-1)/self.num_particles
-            while u > cc:
-                i += 1
-                cc += old_weights[i]
-            self.xhats[:,mm] = old_particles[:,i]# + np.array([0., np.random.normal(0, self.tau_res_std), np.random.normal(0,self.vi_res_std), np.random.normal(0,self.yaw_res_std), 0.])
-            self.xhats[0,mm] = measurement.bearing
-            self.xhats[4,mm] = measurement.yaw
-            self.weights[mm] = 1#old_weights[i]
-
-        # renormalize after sampling
-        #self.weights /= np.sum(self.weights)
+        count("TTCParticleFilter.resamples")
+        # systematic resampling, particle j is sampled by every u with cdf[j-1] < u <= cdf[j]
+        rr = self.rng.random()/self.num_particles
+        u = rr + (np.arange(self.num_particles)-1)/self.num_particles
+        cdf = np.cumsum(self.weights)
+        j = np.minimum(np.searchsorted(cdf, u, side='left'), self.num_particles-1)
+        self.xhats = self.xhats[:, j]# + np.array([0., np.random.normal(0, self.tau_res_std), np.random.normal(0,self.vi_res_std), np.random.normal(0,self.yaw_res_std), 0.])
+        self.xhats[0] = measurement.bearing
+        self.xhats[4] = measurement.yaw
+        self.weights = np.ones(self.num_particles)#old_weights[j]
 
     def _f(self, x, state, input):
-        # get values needed for the calculation
-        eta = x.item(0)
-        tau = x.item(1)
-        vi = x.item(2)
-        psii = x.item(3)
-        psi = x.item(4)
+        # get values needed for the calculation, each row holds one state for every particle
+        eta = x[0]
+        tau = x[1]
+        vi = x[2]
+        psii = x[3]
+        psi = x[4]
         vo = state.vel 
         psid = input
         # calculate xdot
-        xdot = np.array([[sin(eta)/tau-vi*sin(eta+psi-psii)/(vo*tau)-psid,-cos(eta)+vi/vo*cos(eta+psi-psii), 0., 0., psid]]).T
+        xdot = np.zeros_like(x)
+        xdot[0] = sin(eta)/tau-vi*sin(eta+psi-psii)/(vo*tau)-psid
+        xdot[1] = -cos(eta)+vi/vo*cos(eta+psi-psii)
+        xdot[4] = psid
         return xdot
 
+    def particle_positions(self, uav_state:TwoDYawState):
+        """
+            Returns the (N,2) positions, (N,) headings, (N,) speeds and (N,) weights of the particles
+        """
+        theta = self.xhats[4]+self.xhats[0]
+        d = self.xhats[1]*uav_state.vel
+        positions = np.empty((self.num_particles, 2))
+        positions[:,0] = d*np.sin(theta) + uav_state.xpos
+        positions[:,1] = d*np.cos(theta) + uav_state.ypos
+        return positions, self.xhats[3], self.xhats[2], self.weights
+
     def get_particle_states(self, uav_state:TwoDYawState):
-        states = []
-        for i in range(self.num_particles):
-            states.append(self.get_particle_state(self.xhats[:,i], self.weights[i], uav_state))
-        return states
-    
-    def get_particle_state(self, xhat, weight, uav_state:TwoDYawState):
-        theta = xhat.item(4)+xhat.item(0)
-        vo = uav_state.vel
-        d = xhat.item(1)*vo
-        xpos = d*np.sin(theta) + uav_state.getPos().item(0)
-        ypos = d*np.cos(theta) + uav_state.getPos().item(1)
-        state = TwoDYawState(xpos, ypos, xhat.item(3), xhat.item(2))
-        state.weight = weight
-        return state
+        positions, headings, speeds, weights = self.particle_positions(uav_state)
+        states = state_matrix(make_state_array(self.num_particles))
+        states[:,0:2] = positions
+        states[:,2] = headings
+        states[:,3] = speeds
+        states[:,4] = weights
+        return [TwoDYawState.fromBuffer(row) for row in states]
 
 def wrap(diff):
     while diff > np.pi:
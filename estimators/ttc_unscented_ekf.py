@@ -6,6 +6,8 @@ import numpy as np
 from numpy import sin, cos
 from msg.twoDYawState import TwoDYawState
 from msg.bearing_msg import BearingMsg
+from tools.instrumentation import timed
+from tools.discretization import DiscretizationCache, substeps
 
 class TTCUnscentedEKF:
     def __init__(self, initial_bearing, initial_yaw, ts) -> None:
@@ -19,21 +21,47 @@ class TTCUnscentedEKF:
         self.w0 = ll/(self.n+ll)
         self.wi = 1/(2*(self.n+ll))
         self.c = np.sqrt(self.n + ll)
+        # time of the estimate, predict moves it forward
+        self.t = 0.
+        self.discretizations = DiscretizationCache(self._discretize)
 
     def update(self, measurement:BearingMsg, state:TwoDYawState, input):
         self.propagate_model(state, input)
         self.measurement_update(measurement, state)
 
-    def update_point(self, xhat, state:TwoDYawState, input):
+    def predict(self, dt, state, input):
+        """
+            propagates the estimate dt seconds ahead, in RK4 steps no longer than Ts
+        """
+        self.propagate_model(state, input, dt)
+
+    def correct(self, measurement, state, t=None, input=0.):
+        """
+            measurement update with a measurement taken at time t, the estimate is predicted up
+            to t first so a camera that skips ticks only needs to call correct
+        """
+        if t is not None and t > self.t:
+            self.predict(t - self.t, state, input)
+        self.measurement_update(measurement, state)
+
+    def _discretize(self, dt):
+        # Q is the process noise of a step of Ts
+        steps, h = substeps(dt, self.Ts)
+        return steps, h, self.Q*(dt/self.Ts)
+
+    def update_point(self, xhat, state:TwoDYawState, input, h=None):
+        h = self.Ts if h is None else h
         x1 = self._f(xhat, state, input)
-        x2 = self._f(xhat + self.Ts/2.*x1, state, input)
-        x3 = self._f(xhat + self.Ts/2*x2, state, input)
-        x4 = self._f(xhat + self.Ts*x3, state, input)
+        x2 = self._f(xhat + h/2.*x1, state, input)
+        x3 = self._f(xhat + h/2*x2, state, input)
+        x4 = self._f(xhat + h*x3, state, input)
 
-        xhat += self.Ts/6.*(x1+2*x2+2*x3+x4)
+        xhat += h/6.*(x1+2*x2+2*x3+x4)
         return xhat
 
-    def propagate_model(self, state, input):
+    @timed()
+    def propagate_model(self, state, input, dt=None):
+        steps, h, Qd = self.discretizations(self.Ts if dt is None else dt)
 
         # generate sigma points
         self.sigma_points = [np.zeros((5,1)),np.zeros((5,1)),np.zeros((5,1)),np.zeros((5,1)),np.zeros((5,1)),np.zeros((5,1)),np.zeros((5,1)),np.zeros((5,1)),np.zeros((5,1)),np.zeros((5,1)),np.zeros((5,1))]
@@ -45,7 +73,8 @@ class TTCUnscentedEKF:
             self.sigma_points[i+self.n] = self.mean - self.c * np.reshape(sqrtP[:,i-1],(self.n,1))
         # propogate each point through the dynamics
         for i in range(len(self.sigma_points)):
-            self.sigma_points[i] = self.update_point(self.sigma_points[i], state, input)
+            for k in range(steps):
+                self.sigma_points[i] = self.update_point(self.sigma_points[i], state, input, h)
             # points[i][1,0] = saturate(points[i][1,0], 0.01, 100000)
             # points[i][2,0] = saturate(points[i][2,0], 0., 1000.)
 
@@ -58,10 +87,12 @@ class TTCUnscentedEKF:
         self.P = self.w0 * (self.sigma_points[0]-self.mean)@(self.sigma_points[0]-self.mean).T
         for i in range(1, len(self.sigma_points)):
             self.P += self.wi*(self.sigma_points[i]-self.mean)@(self.sigma_points[i]-self.mean).T
-        self.P += self.Q #TODO: Q is a function of mean?
+        self.P += Qd #TODO: Q is a function of mean?
+        self.t += self.Ts if dt is None else dt
 
         
 
+    @timed()
     def measurement_update(self, measurement:BearingMsg, state):
         ys = []
         # push the sigma points through the measurement function
@@ -1,7 +1,11 @@
-
 import numpy as np
 
+# layout of a collection of bearing measurements stored in one contiguous buffer
+BEARING_MSG_DTYPE = np.dtype([('bearing', np.float64), ('yaw', np.float64)])
+
 class BearingMsg:
+    __slots__ = ('bearing', 'yaw')
+
     def __init__(self, bearing=0., yaw=0.) -> None:
         self.bearing = bearing
-        self.yaw = yaw
\ No newline at end of file
+        self.yaw = yaw
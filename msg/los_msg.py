@@ -0,0 +1,28 @@
+import numpy as np
+
+# layout of a line of sight measurement on the wire, one float64 per field
+LOS_MSG_FIELDS = ('t', 'track', 'losx', 'losy', 'ownx', 'owny', 'tau')
+LOS_MSG_SIZE = 8*len(LOS_MSG_FIELDS)
+
+class LosMsg:
+    """
+        A timestamped 2D line of sight measurement of one track with the ownship position it
+        was taken from and the time to collision (nan if the camera has none)
+    """
+    __slots__ = ('t', 'track', 'los', 'own_position', 'tau')
+
+    def __init__(self, t=0., track=0, los=None, own_position=None, tau=np.nan) -> None:
+        self.t = t
+        self.track = track
+        self.los = np.array([[0., 1.]]).T if los is None else los
+        self.own_position = np.zeros((2,1)) if own_position is None else own_position
+        self.tau = tau
+
+    def toBytes(self) -> bytes:
+        return np.array([self.t, self.track, self.los.item(0), self.los.item(1),
+                         self.own_position.item(0), self.own_position.item(1), self.tau], dtype=np.float64).tobytes()
+
+    @classmethod
+    def fromBytes(cls, data:bytes):
+        values = np.frombuffer(data, dtype=np.float64, count=len(LOS_MSG_FIELDS))
+        return cls(values.item(0), int(values.item(1)), values[2:4, np.newaxis].copy(), values[4:6, np.newaxis].copy(), values.item(6))
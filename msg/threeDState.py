@@ -1,25 +1,96 @@
-
 import numpy as np
 
+# layout of a collection of states stored in one contiguous buffer
+THREE_D_STATE_DTYPE = np.dtype([('xpos', np.float64), ('ypos', np.float64), ('zpos', np.float64), ('xvel', np.float64), ('yvel', np.float64), ('zvel', np.float64)])
+
+def make_state_array(num_states):
+    """
+        Allocates a structured array of num_states states
+    """
+    return np.zeros(num_states, dtype=THREE_D_STATE_DTYPE)
+
+def state_matrix(states:np.ndarray):
+    """
+        (N,6) float view of a structured state array with columns [xpos, ypos, zpos, xvel, yvel, zvel]
+    """
+    return states.view(np.float64).reshape(states.shape[0], len(THREE_D_STATE_DTYPE.names))
+
 class ThreeDState:
+    """
+        The state is stored in a single array. toArray, getPos and getVel return views
+        of that array, so copy them if you need a snapshot that doesn't change with the state.
+    """
+    __slots__ = ('_data',)
+
     def __init__(self, xpos=0., ypos=0., zpos=0., xvel=0., yvel=0., zvel=0.) -> None:
-        self.xpos = xpos
-        self.ypos = ypos
-        self.zpos = zpos
-        self.xvel = xvel
-        self.yvel = yvel
-        self.zvel = zvel
+        self._data = np.array([[xpos, ypos, zpos, xvel, yvel, zvel]], dtype=float).T
+
+    @classmethod
+    def fromBuffer(cls, row:np.ndarray):
+        """
+            Creates a state that is a view of row, a 1D array [xpos, ypos, zpos, xvel, yvel, zvel],
+            such as a row of an (N,6) state array or of state_matrix(states)
+        """
+        state = cls.__new__(cls)
+        state._data = row[0:6, np.newaxis]
+        return state
+
+    @property
+    def xpos(self):
+        return self._data.item(0)
+
+    @xpos.setter
+    def xpos(self, value):
+        self._data[0,0] = value
+
+    @property
+    def ypos(self):
+        return self._data.item(1)
+
+    @ypos.setter
+    def ypos(self, value):
+        self._data[1,0] = value
+
+    @property
+    def zpos(self):
+        return self._data.item(2)
+
+    @zpos.setter
+    def zpos(self, value):
+        self._data[2,0] = value
+
+    @property
+    def xvel(self):
+        return self._data.item(3)
+
+    @xvel.setter
+    def xvel(self, value):
+        self._data[3,0] = value
+
+    @property
+    def yvel(self):
+        return self._data.item(4)
+
+    @yvel.setter
+    def yvel(self, value):
+        self._data[4,0] = value
+
+    @property
+    def zvel(self):
+        return self._data.item(5)
+
+    @zvel.setter
+    def zvel(self, value):
+        self._data[5,0] = value
     
     def toArray(self):
-        return np.array([[self.xpos, self.ypos, self.zpos, self.xvel, self.yvel, self.zvel]]).T
+        return self._data
     
     def fromArray(self, array:np.ndarray):
-        self.xpos = array.item(0)
-        self.ypos = array.item(1)
-        self.zpos = array.item(2)
-        self.xvel = array.item(3)
-        self.yvel = array.item(4)
-        self.zvel = array.item(5)
+        self._data[:,0] = np.reshape(array, -1)[0:6]
     
     def getPos(self):
-        return np.array([[self.xpos, self.ypos, self.zpos]]).T
\ No newline at end of file
+        return self._data[0:3]
+
+    def getVel(self):
+        return self._data[3:6]
@@ -1,24 +1,97 @@
-
 import numpy as np
 
+# layout of a collection of states, e.g. a particle population, stored in one contiguous buffer
+TWO_D_YAW_STATE_DTYPE = np.dtype([('xpos', np.float64), ('ypos', np.float64), ('yaw', np.float64), ('vel', np.float64), ('weight', np.float64)])
+
+def make_state_array(num_states):
+    """
+        Allocates a structured array of num_states states (weights initialized to 1)
+    """
+    states = np.zeros(num_states, dtype=TWO_D_YAW_STATE_DTYPE)
+    states['weight'] = 1.
+    return states
+
+def state_matrix(states:np.ndarray):
+    """
+        (N,5) float view of a structured state array with columns [xpos, ypos, yaw, vel, weight]
+    """
+    return states.view(np.float64).reshape(states.shape[0], len(TWO_D_YAW_STATE_DTYPE.names))
+
 class TwoDYawState:
+    """
+        The state is stored in a single array. toArray and getPos return views of that
+        array, so copy them if you need a snapshot that doesn't change with the state.
+    """
+    __slots__ = ('_data', '_weight')
+
     def __init__(self, xpos=0., ypos=0., yaw=0., vel=0.) -> None:
-        self.xpos = xpos
-        self.ypos = ypos
-        self.yaw = yaw
-        self.vel = vel
+        self._data = np.array([[xpos, ypos, yaw, vel]], dtype=float).T
+        self._weight = np.ones(1)
+
+    @classmethod
+    def fromBuffer(cls, row:np.ndarray):
+        """
+            Creates a state that is a view of row, a 1D array [xpos, ypos, yaw, vel(, weight)],
+            such as a row of an (N,4) state array or of state_matrix(states)
+        """
+        state = cls.__new__(cls)
+        state._data = row[0:4, np.newaxis]
+        state._weight = row[4:5] if row.shape[0] > 4 else np.ones(1)
+        return state
+
+    @property
+    def xpos(self):
+        return self._data.item(0)
+
+    @xpos.setter
+    def xpos(self, value):
+        self._data[0,0] = value
+
+    @property
+    def ypos(self):
+        return self._data.item(1)
+
+    @ypos.setter
+    def ypos(self, value):
+        self._data[1,0] = value
+
+    @property
+    def yaw(self):
+        return self._data.item(2)
+
+    @yaw.setter
+    def yaw(self, value):
+        self._data[2,0] = value
+
+    @property
+    def vel(self):
+        return self._data.item(3)
+
+    @vel.setter
+    def vel(self, value):
+        self._data[3,0] = value
+
+    @property
+    def weight(self):
+        return self._weight.item(0)
+
+    @weight.setter
+    def weight(self, value):
+        self._weight[0] = value
     
     def toArray(self):
-        return np.array([[self.xpos, self.ypos, self.yaw, self.vel]]).T
+        return self._data
     
     def fromArray(self, array:np.ndarray):
-        self.xpos = array.item(0)
-        self.ypos = array.item(1)
-        self.yaw = array.item(2)
-        self.vel = array.item(3)
+        self._data[:,0] = np.reshape(array, -1)[0:4]
     
     def getPos(self):
-        return np.array([[self.xpos, self.ypos]]).T
+        return self._data[0:2]
     
-    def toCartesianArray(self):
-        return np.array([[self.xpos, self.ypos, self.vel*np.sin(self.yaw), self.vel*np.cos(self.yaw)]]).T
\ No newline at end of file
+    def toCartesianArray(self, out=None):
+        if out is None:
+            out = np.empty((4,1))
+        out[0:2] = self._data[0:2]
+        out[2,0] = self.vel*np.sin(self.yaw)
+        out[3,0] = self.vel*np.cos(self.yaw)
+        return out
@@ -0,0 +1,115 @@
+"""
+Headless version of the pseudo-force optimization of optimization_approaching.py that works on
+whole batches of configurations at once. The n unit vectors of each configuration are rows of
+a (B,n,3) array, the first one stays fixed and the rest are pushed by the information, spring
+and plane repulsion pseudo-forces until they stop moving.
+"""
+import itertools
+import os
+import sys
+import warnings
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from tools.rng import as_generator
+
+# the repulsive planes and constants of optimization_approaching.py
+DEFAULT_PLANE_POINTS = np.array([[-1., 0., 0.], [0., -1., 0.]])
+DEFAULT_PLANE_NORMALS = np.array([[1., 0., 0.], [0., 1., 0.]])
+DEFAULT_K_B = np.array([5., 2.])
+
+def initial_unit_vectors(batch, n, rng=None):
+    """
+        (batch,n,3) random initial guesses, the first vector of each is [1,0,0] and the rest
+        are drawn in the positive x half-space as in optimization_approaching.py
+    """
+    rng = as_generator(rng)
+    lams = rng.random((batch, n, 3))*np.array([1., 2., 2.]) - np.array([0., 1., 1.])
+    lams[:, 0] = [1., 0., 0.]
+    return lams/np.linalg.norm(lams, axis=2, keepdims=True)
+
+def information_matrix(lams, rad, sigma):
+    """
+        (B,3,3) sum over the points of lam lam^T/(sigma*rad)^2 for (B,n,3) lams and (B,n) radii
+    """
+    weights = 1./(sigma*np.asarray(rad))**2
+    return np.einsum('bn,bni,bnj->bij', np.broadcast_to(weights, lams.shape[:2]), lams, lams)
+
+def _planes(batch, k_b, plane_points, plane_normals):
+    """
+        the plane constants broadcast to (B,P), (B,P,3) and (B,P,3)
+    """
+    num_planes = np.shape(plane_normals)[-2]
+    return (np.broadcast_to(np.asarray(k_b, dtype=float), (batch, num_planes)),
+            np.broadcast_to(np.asarray(plane_points, dtype=float), (batch, num_planes, 3)),
+            np.broadcast_to(np.asarray(plane_normals, dtype=float), (batch, num_planes, 3)))
+
+def pseudo_forces(lams, rad, sigma, k_m, k_g, k_b, plane_points, plane_normals):
+    """
+        (B,n,3) pseudo-forces on every unit vector (zero on the first one). plane_points and
+        plane_normals are (B,P,3) (or (P,3) shared by the batch) and k_b is (B,P) or (P,).
+    """
+    k_b, plane_points, plane_normals = _planes(lams.shape[0], k_b, plane_points, plane_normals)
+    G = information_matrix(lams, rad, sigma)
+    force = -k_g*np.einsum('bij,bnj->bni', G, lams)
+    force[:, 1:] += k_m*(lams[:, :-1] - lams[:, 1:])
+    # distance of every point to every plane, (B,n,P)
+    distances = np.abs(np.einsum('bpi,bni->bnp', plane_normals, lams) - np.sum(plane_normals*plane_points, axis=2)[:, np.newaxis, :])
+    force += np.einsum('bnp,bpi->bni', k_b[:, np.newaxis, :]/distances, plane_normals)
+    # project the forces onto the tangent planes of the unit vectors, P = I - lam lam^T
+    force -= np.sum(force*lams, axis=2, keepdims=True)*lams
+    force[:, 0] = 0.
+    return force
+
+def optimize(lams, rad, sigma=0.01, k_m=5., k_g=0.1, k_b=DEFAULT_K_B, plane_points=DEFAULT_PLANE_POINTS,
+             plane_normals=DEFAULT_PLANE_NORMALS, gain=0.001, tol=1e-7, max_iterations=10000):
+    """
+        Moves the (B,n,3) unit vectors until no vector moves more than tol in an iteration, with
+        max_iterations as the cap. The spring only pulls each vector toward the one before it,
+        so the forces aren't a gradient. When the information term dominates (k_g=1 of
+        optimization_approaching.py) the vectors circle the sphere forever instead of settling,
+        k_g=0.1 keeps it on par with the planes and settles in a few thousand iterations.
+        Configurations that hit the cap are reported as not converged, the ones that converged
+        are frozen while the rest keep going.
+        Returns the unit vectors, the (B,) iterations each took and the (B,) converged mask.
+    """
+    lams = np.array(lams, dtype=float)
+    batch = lams.shape[0]
+    rad = np.broadcast_to(np.asarray(rad, dtype=float), lams.shape[:2])
+    k_b, plane_points, plane_normals = _planes(batch, k_b, plane_points, plane_normals)
+    active = np.arange(batch)
+    iterations = np.full(batch, max_iterations)
+    converged = np.zeros(batch, dtype=bool)
+    for iteration in range(max_iterations):
+        current = lams[active]
+        force = pseudo_forces(current, rad[active], sigma, k_m, k_g, k_b[active], plane_points[active], plane_normals[active])
+        moved = current + gain*force
+        moved /= np.linalg.norm(moved, axis=2, keepdims=True)
+        lams[active] = moved
+        done = np.max(np.linalg.norm(moved - current, axis=2), axis=1) < tol
+        iterations[active[done]] = iteration + 1
+        converged[active[done]] = True
+        active = active[~done]
+        if len(active) == 0:
+            break
+    return lams, iterations, converged
+
+def lookup_table(n, start_rads, end_rads, plane_sets, rng=None, **kwargs):
+    """
+        Optimizes every combination of start radius, end radius and plane set in one batch.
+        plane_sets is a list of (plane_points (P,3), plane_normals (P,3), k_b (P,)) with the same
+        number of planes P (pad with k_b = 0). Returns the list of (start_rad, end_rad, plane set
+        index) keys and the (B,n,3) unit vectors, iterations and converged mask of optimize.
+        Warns when entries didn't converge, their vectors are wherever the cap left them.
+    """
+    keys = list(itertools.product(start_rads, end_rads, range(len(plane_sets))))
+    rad = np.array([np.linspace(start, end, n) for start, end, _ in keys])
+    plane_points = np.array([plane_sets[j][0] for _, _, j in keys], dtype=float)
+    plane_normals = np.array([plane_sets[j][1] for _, _, j in keys], dtype=float)
+    k_b = np.array([plane_sets[j][2] for _, _, j in keys], dtype=float)
+    lams = initial_unit_vectors(len(keys), n, rng)
+    lams, iterations, converged = optimize(lams, rad, k_b=k_b, plane_points=plane_points, plane_normals=plane_normals, **kwargs)
+    if not np.all(converged):
+        missed = [keys[b] for b in np.flatnonzero(~converged)]
+        warnings.warn(f"{len(missed)} of {len(keys)} lookup table entries didn't converge: {missed}", RuntimeWarning)
+    return keys, lams, iterations, converged
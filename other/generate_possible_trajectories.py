@@ -1,10 +1,17 @@
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.widgets import Slider
+from matplotlib.collections import LineCollection
 import time
-from scipy.optimize import minimize
+import os
+import sys
 
-# define constraints for the optimizer to use later on
+# the shared tools live in the root of the repo
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from tools.ring_buffer import RingBuffer, stride_decimate
+from trajectory_bounds import two_los_ttc_bounds
+
+# define constraints on the trajectory family
 # minimum and maximum ranges of detection
 r_min = 10
 r_max = 1000
@@ -33,64 +40,12 @@ ec=vo/np.linalg.norm(vo)
 tau = ((po-pi).T @ ec)/((vi-vo).T @ ec)
 
 def calculate_positions_and_velocities(l1, l2, ec, tau):
-
-    # get the unit vector perpendicular to the camera normal vector
-    ecp = np.array([[0, -1],[1,0]]) @ ec
-
-    # solve the min-norm problem
-    A1 = np.concatenate([l1,-l2,np.zeros((2,1)),np.eye(2)*ts],axis=1)
-    A2 = np.concatenate([l1,np.zeros((2,1)),-ecp,np.eye(2)*tau], axis=1)
-    A = np.concatenate([A1,A2],axis=0)
-
-    b = np.concatenate([vo*ts,vo*tau],axis=0)
-
-    x = np.linalg.pinv(A)@b
-
-    # set the result up as a possible trajectory to plot along 
-    # with the original example
-    vi2 = x[3:]
-    a1 = x.item(0)
-    pi2 = l1*a1+po
-
-    # run an optimizer to get the closest and furthest starting 
-    # points possible while respecting the constraints above
-
-    # function to minimize alpha
-    def f_min(x):
-        return x
-    # function to maximize alpha
-    def f_max(x):
-        return -x
-    # function for maximum velocity constraint
-    def max_vel(x):
-        vel = x*(vi2-vo)+vo
-        return v_max - np.linalg.norm(vel)
-    # function for maximum range constraint
-    r0 = np.linalg.norm((pi2-po))
-    def max_range(x):
-        return r_max - x*r0
-    # function for minimum range constraint
-    def min_range(x):
-        return x*r0 - r_min
-
-    cons = ({'type':'ineq', 'fun':max_vel}, 
-            {'type':'ineq', 'fun':max_range},
-            {'type':'ineq', 'fun':min_range})
-
-    x0=1.
-
-    # do the optimization to minimize alpha
-    result = minimize(f_min,x0, constraints=cons)
-    p_min = result.x.item(0)*(pi2-po)+po
-    pi2t = result.x.item(0)*((pi2+vi2*tau)-(po+vo*tau))+(po+vo*tau)
-    vt_min = (pi2t-p_min)/tau
-
-    # do the optimization to maximize alpha
-    result = minimize(f_max, x0, constraints=cons)
-    p_max = result.x.item(0)*(pi2-po)+po
-    pi2t = result.x.item(0)*((pi2+vi2*tau)-(po+vo*tau))+(po+vo*tau)
-    vt_max = (pi2t-p_max)/tau
-    return (p_min, vt_min, p_max,vt_max)
+    """
+        closest and furthest (p_min, vt_min, p_max, vt_max) of the trajectories that fit the
+        measurements, see trajectory_bounds.py (the arguments can also be batches)
+    """
+    p_min, vt_min, p_max, vt_max, _ = two_los_ttc_bounds(l1, l2, ec, tau, po, vo, ts, r_min, r_max, v_max)
+    return (p_min.T, vt_min.T, p_max.T, vt_max.T)
 
 pairs = []
 labels = []
@@ -158,7 +113,7 @@ class Trajectories:
         return self.poss[1:]
 
 class Plotter:
-    def __init__(self, num_intruders, limits, num_pairs, pair_labels) -> None:
+    def __init__(self, num_intruders, limits, num_pairs, pair_labels, window=10000, max_points=2000) -> None:
         plt.ion()
         self.fig = plt.figure()
         self.ax = self.fig.add_subplot()
@@ -166,58 +121,67 @@ class Plotter:
         self.limits=limits
         self.num_pairs = num_pairs
         self.pair_labels = pair_labels
-        self.pox = []
-        self.poy = []
-        self.pix = []
-        self.piy = []
+        self.max_points = max_points
+        # rows of [own x, own y, intruder 1 x, intruder 1 y, ...] for the last window timesteps
+        self.history = RingBuffer(window, 2*(num_intruders+1))
         self.colors=["b", "orange", "g","yellow", "lime", "darkorange", "darkslategray", "olive", "orchid", "lawngreen", "aquamarine"]
-        for i in range(num_intruders):
-            self.pix.append([])
-            self.piy.append([])
-
-    def update_plot(self, own_pos, i_poses):
-        head_width = 10
-        self.ax.clear()
-        # add the points to the respective lists
-        self.pox.append(own_pos.item(0))
-        self.poy.append(own_pos.item(1))
-        for i in range(self.num_intruders):
-            self.pix[i].append(i_poses[i].item(0))
-            self.piy[i].append(i_poses[i].item(1))
-
-        # draw the rectangle of possible positions by connecting the points
-        for j in range(-self.num_pairs+1, 1):
-            for i in range(len(self.pix[0])):
-                self.ax.plot([self.pix[2*j-2][i],self.pix[2*j-1][i]],[self.piy[2*j-2][i],self.piy[2*j-1][i]],c='pink',zorder=-20)
+        self.head_width = 10
 
-        # plot each of the actual intruders
-        color_i = 0
+        # the artists are created once and only their data changes each timestep
+        # the rectangle of possible positions connects the min and max intruders of each pair
+        self.rectangles = self.ax.add_collection(LineCollection([], colors='pink', zorder=-20))
+        self.intruder_lines = []
         for i in range(self.num_intruders-2*self.num_pairs):
-            lines=self.ax.plot(self.pix[i],self.piy[i],label=f"Intruder {i+1}")
-            if len(self.pix[i]) >= 2:
-                self.ax.arrow(self.pix[i][0], self.piy[i][0], self.pix[i][1]-self.pix[i][0], self.piy[i][1]-self.piy[i][0], head_width=head_width, color=lines[0].get_color())
-            color_i+=1
-
-        # plot the min and max-range intruders
-        for i in range(1-self.num_pairs, 1):
-            lmin = self.ax.plot(self.pix[2*i-2],self.piy[2*i-2],label=self.pair_labels[i+self.num_pairs-1]+" Min")
-            lmax = self.ax.plot(self.pix[2*i-1],self.piy[2*i-1],label=self.pair_labels[i+self.num_pairs-1]+" Max")
-            if len(self.pix[2*i-2])>=2:
-                self.ax.arrow(self.pix[2*i-2][0],self.piy[2*i-2][0], self.pix[2*i-2][1]-self.pix[2*i-2][0],self.piy[2*i-2][1]-self.piy[2*i-2][0], head_width=head_width, color=lmin[0].get_color())
-                self.ax.arrow(self.pix[2*i-1][0],self.piy[2*i-1][0], self.pix[2*i-1][1]-self.pix[2*i-1][0],self.piy[2*i-1][1]-self.piy[2*i-1][0], head_width=head_width, color=lmax[0].get_color())
-            color_i += 2
-        # plot the own-ship path
-        self.ax.plot(self.pox,self.poy,label='Own',c='r')
-        if len(self.pox)>=2:
-            self.ax.arrow(self.pox[0], self.poy[0], self.pox[1]-self.pox[0], self.poy[1]-self.poy[0], color='r', head_width=head_width)
-
-        # for i in range(self.num_intruders):
-        #     self.ax.plot([self.pox[-1],self.pix[i][-1]],[self.poy[-1],self.piy[i][-1]],label=f"Bearing {i+1}")
+            self.intruder_lines.append(self.ax.plot([], [], label=f"Intruder {i+1}")[0])
+        for i in range(self.num_pairs):
+            self.intruder_lines.append(self.ax.plot([], [], label=self.pair_labels[i]+" Min")[0])
+            self.intruder_lines.append(self.ax.plot([], [], label=self.pair_labels[i]+" Max")[0])
+        self.own_line, = self.ax.plot([], [], label='Own', c='r')
 
         self.ax.set_title("Positions of Own-ship and Intruders")
         self.ax.set_xlabel("x (m)")
         self.ax.set_ylabel("y (m)")
         self.ax.legend()
+
+    def pair_columns(self, j):
+        """
+            x columns of the history for the min and max intruders of pair j
+        """
+        first = 2 + 2*(self.num_intruders - 2*self.num_pairs + 2*j)
+        return first, first + 2
+
+    def update_plot(self, own_pos, i_poses):
+        # add the points to the history
+        row = np.empty(2*(self.num_intruders+1))
+        row[0:2] = own_pos[:,0]
+        for i in range(self.num_intruders):
+            row[2+2*i:4+2*i] = i_poses[i][:,0]
+        self.history.append(row)
+        history = self.history.view()
+        drawn = stride_decimate(history, self.max_points)
+
+        # draw the rectangle of possible positions by connecting the points
+        segments = []
+        for j in range(self.num_pairs):
+            cmin, cmax = self.pair_columns(j)
+            segments.append(np.stack([drawn[:,cmin:cmin+2], drawn[:,cmax:cmax+2]], axis=1))
+        segments = np.concatenate(segments, axis=0) if segments else np.zeros((0,2,2))
+        self.rectangles.set_segments(segments)
+
+        # plot each of the intruders and the own-ship path
+        for i, line in enumerate(self.intruder_lines):
+            line.set_data(drawn[:,2+2*i], drawn[:,3+2*i])
+        self.own_line.set_data(drawn[:,0], drawn[:,1])
+
+        # the arrows show the initial direction of travel, so they only need to be drawn once
+        if len(self.history) == 2:
+            for i, line in enumerate(self.intruder_lines):
+                self.ax.arrow(history[0,2+2*i], history[0,3+2*i], history[1,2+2*i]-history[0,2+2*i], history[1,3+2*i]-history[0,3+2*i], head_width=self.head_width, color=line.get_color())
+            self.ax.arrow(history[0,0], history[0,1], history[1,0]-history[0,0], history[1,1]-history[0,1], color='r', head_width=self.head_width)
+
+        self.ax.relim()
+        self.ax.update_datalim(segments.reshape(-1,2))
+        self.ax.autoscale_view()
         # self.ax.set_xlim(self.limits[0])
         # self.ax.set_ylim(self.limits[1])
 
@@ -225,18 +189,15 @@ class Plotter:
         self.fig.canvas.flush_events()
     
     def plot_interactive(self):
-        TWOPI = 2*np.pi
-
         fig, ax = plt.subplots()
 
-        t = np.arange(0.0, TWOPI, 0.001)
+        history = self.history.view()
         initial_i = 0
         plots = []
-        b=0
-        for j in range(-self.num_pairs+1, 1):
-            l, = plt.plot([self.pix[2*j-2][initial_i],self.pix[2*j-1][initial_i]],[self.piy[2*j-2][initial_i],self.piy[2*j-1][initial_i]], label=self.pair_labels[b],zorder=-20)
+        for j in range(self.num_pairs):
+            cmin, cmax = self.pair_columns(j)
+            l, = plt.plot([history[initial_i,cmin],history[initial_i,cmax]],[history[initial_i,cmin+1],history[initial_i,cmax+1]], label=self.pair_labels[j],zorder=-20)
             plots.append(l)
-            b+=1
         plt.legend()
         xlims = self.ax.get_xlim()
         ylims = self.ax.get_ylim()
@@ -244,17 +205,16 @@ class Plotter:
 
         axamp = plt.axes([0.25, .03, 0.50, 0.02])
         # Slider
-        samp = Slider(axamp, 'Amp', 0, len(self.pox)-1, valinit=0, valstep=1)
+        samp = Slider(axamp, 'Amp', 0, len(self.history)-1, valinit=0, valstep=1)
 
         def update(val):
             # amp is the current value of the slider
-            i = samp.val
+            i = int(samp.val)
             # update curve
-            b=0
-            for j in range(-self.num_pairs+1, 1):
-                plots[b].set_xdata([self.pix[2*j-2][i],self.pix[2*j-1][i]])
-                plots[b].set_ydata([self.piy[2*j-2][i],self.piy[2*j-1][i]])
-                b += 1
+            for j in range(self.num_pairs):
+                cmin, cmax = self.pair_columns(j)
+                plots[j].set_xdata([history[i,cmin],history[i,cmax]])
+                plots[j].set_ydata([history[i,cmin+1],history[i,cmax+1]])
             # redraw canvas while idle
             fig.canvas.draw_idle()
 
@@ -0,0 +1,76 @@
+"""
+    Batched least squares of the line of sight plus time to collision equations of K cameras
+    for M intruders at once (the systems of test_two_camera.py and test_spherical_camera.py).
+
+    The unknowns of each intruder are x = [a1, a2, c_1 .. c_K, vi]. a1 and a2 are the ranges
+    along the two lines of sight l1 and l2, taken ts apart. c_k is the offset along camera
+    k's image plane at the time to collision. vi is the intruder velocity. Each system is
+    (2+2K) x (4+K) and is solved with one batched SVD, which also gives its rank and
+    condition number.
+"""
+import numpy as np
+
+def _rows(x):
+    """
+        (...,2) array of row vectors, (2,1) column vectors are turned into one row
+    """
+    x = np.asarray(x, dtype=float)
+    if x.shape == (2,1):
+        x = x.T
+    return np.reshape(x, (-1, 2))
+
+def los_ttc_systems(l1, l2, ecs, horizons, vo, ts):
+    """
+        (M,2+2K,4+K) A and (M,2+2K) b for (M,2) lines of sight l1 and l2, the camera normals
+        ecs ((K,2) shared by every intruder or (M,K,2)) and the (M,K) times from l1 to the
+        collision with each camera's plane (tau, or tau+ts when it was measured with l2)
+    """
+    l1, l2 = _rows(l1), _rows(l2)
+    vo = _rows(vo)[0]
+    ecs = np.asarray(ecs, dtype=float)
+    horizons = np.atleast_2d(np.asarray(horizons, dtype=float))
+    num_cameras = ecs.shape[-2]
+    num_intruders = np.broadcast_shapes((l1.shape[0],), (l2.shape[0],), (horizons.shape[0],),
+                                        ecs.shape[:-2] if ecs.ndim == 3 else (1,))[0]
+    # unit vectors perpendicular to the camera normal vectors
+    ecps = ecs @ np.array([[0, -1],[1,0]]).T
+
+    A = np.zeros((num_intruders, 2+2*num_cameras, 4+num_cameras))
+    b = np.zeros((num_intruders, 2+2*num_cameras))
+    A[:, 0:2, 0] = l1
+    A[:, 0:2, 1] = -l2
+    A[:, 0:2, -2:] = np.eye(2)*ts
+    b[:, 0:2] = vo*ts
+    for k in range(num_cameras):
+        rows = slice(2+2*k, 4+2*k)
+        A[:, rows, 0] = l1
+        A[:, rows, 2+k] = -ecps[..., k, :]
+        A[:, rows, -2:] = np.eye(2)*horizons[:, k, np.newaxis, np.newaxis]
+        b[:, rows] = vo*horizons[:, k, np.newaxis]
+    return A, b
+
+def solve_systems(A, b, rcond=1e-15):
+    """
+        min-norm least squares solutions (M,n) of the (M,m,n) systems, their (M,) ranks and
+        (M,) condition numbers. Singular values below rcond times the largest are treated as
+        zero, as in np.linalg.pinv, and the rank uses the tolerance of np.linalg.matrix_rank.
+    """
+    u, s, vt = np.linalg.svd(A, full_matrices=False)
+    largest = s[:, 0:1]
+    rank = np.sum(s > largest*max(A.shape[1:])*np.finfo(float).eps, axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cond = largest[:, 0]/s[:, -1]
+        s_inv = np.where(s > rcond*largest, 1./s, 0.)
+    x = np.einsum('mji,mj->mi', vt, s_inv*np.einsum('mkj,mk->mj', u, b))
+    return x, rank, cond
+
+def multi_camera_estimates(l1, l2, ecs, horizons, po, vo, ts):
+    """
+        (M,2) intruder positions at the time of l1 and (M,2) velocities, plus the rank and the
+        condition number of every intruder's system (rank < 4+K means the estimate is only
+        the min-norm one of a family)
+    """
+    A, b = los_ttc_systems(l1, l2, ecs, horizons, vo, ts)
+    x, rank, cond = solve_systems(A, b)
+    positions = _rows(l1)*x[:, 0:1] + _rows(po)[0]
+    return positions, x[:, -2:], rank, cond
@@ -1,9 +1,16 @@
 import numpy as np
 import numpy.linalg as la
 from copy import deepcopy
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from tools.instrumentation import timed, count, record, is_enabled
+from tools.rng import as_generator
 
 class Particle_Filter:
-    def __init__(self, num_particles, l1, l2, tau, po0, po1, ec, r_min, r_max, v_max, ts) -> None:
+    def __init__(self, num_particles, l1, l2, tau, po0, po1, ec, r_min, r_max, v_max, ts, rng=None) -> None:
+        self.rng = as_generator(rng)
         self.t = ts
         self.num_particles = num_particles
         self.po0 = po0
@@ -12,6 +19,8 @@ class Particle_Filter:
         self.Rinv = np.diag([1/0.1**2, 1/0.1**2])
         tau += ts
         self.taus = [tau]
+        # times of the measurements since the first one, the trajectory fits use them instead of a fixed ts
+        self.times = [0., ts]
         self.ec = ec
         self.lms = deepcopy([l1,l2])
         lms_norm = [l1/l1.item(1), l2/l2.item(1)]
@@ -21,26 +30,37 @@ class Particle_Filter:
         self.vis = []
         self.r_min = r_min
         while len(self.pi0s) < num_particles:
-            # randomly noisify the measurements
-            lus = []
-            for lm_norm in lms_norm:
-                l_u = lm_norm
-                l_u[0,0] += np.random.normal(0,0.001)
-                l_u /= np.linalg.norm(l_u)
-                lus.append(l_u)
-
-            tau_u = tau + np.random.normal(0, 0.5)
-
-            a1_u = (r_max-r_min)*np.random.random()+ r_min
-            pos, vel = self.calculate_trajectory_first(a1_u, lus, ec, tau_u, self.pos)
-            if np.linalg.norm(vel)<=v_max:
-                self.pi0s.append(pos)
-                self.particle_p.append(pos+vel*ts)
-                self.vis.append(vel)
-                self.weights.append(1)
+            # draw the noise for all of the missing particles at once, the ones that are too fast get redrawn
+            block = num_particles - len(self.pi0s)
+            l_noise = self.rng.normal(0, 0.001, (block, len(lms_norm)))
+            tau_noise = self.rng.normal(0, 0.5, block)
+            a1s = (r_max-r_min)*self.rng.random(block) + r_min
+            for k in range(block):
+                # randomly noisify the measurements
+                lus = []
+                for j, lm_norm in enumerate(lms_norm):
+                    l_u = lm_norm
+                    l_u[0,0] += l_noise[k,j]
+                    l_u /= np.linalg.norm(l_u)
+                    lus.append(l_u)
+
+                tau_u = tau + tau_noise[k]
+
+                pos, vel = self.calculate_trajectory_first(a1s[k], lus, ec, tau_u, self.pos)
+                if np.linalg.norm(vel)<=v_max:
+                    self.pi0s.append(pos)
+                    self.particle_p.append(pos+vel*ts)
+                    self.vis.append(vel)
+                    self.weights.append(1)
     def get_particle_positions(self):
         return self.particle_p
 
+    def get_particle_arrays(self):
+        """
+            (N,2) particle positions and (N,2) velocities, e.g. for the collision cone controller
+        """
+        return np.hstack(self.particle_p).T, np.hstack(self.vis).T
+
     def get_future_positions(self, delta_t):
         future_pos = []
         for i in range(self.num_particles):
@@ -111,7 +131,7 @@ class Particle_Filter:
     def calculate_trajectory_first(self, a1, ls, ec, tau, pos):
         if len(ls)<2:
             raise
-        vo = (pos[-1] - pos[-2])/self.ts
+        vo = (pos[-1] - pos[-2])/(self.times[len(pos)-1] - self.times[len(pos)-2])
         l1 = ls[0]
         ls = ls[1:]
         po0 = pos[0]
@@ -129,7 +149,7 @@ class Particle_Filter:
             Ap.append(ls[i])
             for j in range(i+1,len(ls)+extra):
                 Ap.append(np.zeros((2,1)))
-            Ap.append(-np.eye(2)*self.ts*(i+1))
+            Ap.append(-np.eye(2)*self.times[i+1])
             A1 = np.concatenate(Ap,axis=1)
             A.append(A1)
         A2 = []
@@ -157,13 +177,39 @@ class Particle_Filter:
         vi = x[-2:]
         return pi0, vi
     
+    @timed()
     def update(self, lm, po, tau, accelerating=False):
+        self.predict(self.ts)
+        self.measurement_update(lm, po, tau)
+        # TODO: change up resampling if we start accelerating, we can't use the old algorithm
+        self.resample()
+
+    @timed()
+    def predict(self, dt):
+        """
+            moves the particles dt seconds ahead along their velocities
+        """
+        for i in range(self.num_particles):
+            self.particle_p[i] += self.vis[i]*dt
+        self.t += dt
+
+    def correct(self, lm, po, tau, t=None):
+        """
+            weights and resamples the particles with a measurement taken t seconds after the
+            first one, they are predicted up to t first so a camera that skips frames only
+            needs to call correct
+        """
+        if t is not None and t > self.t:
+            self.predict(t - self.t)
+        self.measurement_update(lm, po, tau)
+        self.resample()
+
+    @timed()
+    def measurement_update(self, lm, po, tau):
         # update the weights
         self.pos.append(deepcopy(po))
+        self.times.append(self.t)
         for i in range(self.num_particles):
-            # propogate the dynamics
-            self.particle_p[i] += self.vis[i]*self.ts
-
             # get the weights based on the measurement
             phat = self.particle_p[i]-po
             phat /= np.linalg.norm(phat)
@@ -171,16 +217,19 @@ class Particle_Filter:
         sum = np.sum(self.weights)
         self.weights = [x/sum for x in self.weights]
         self.lms.append(deepcopy(lm))
-        self.t += self.ts
         self.taus.append(tau + self.t)
+        if is_enabled():
+            record("Particle_Filter.ess", 1./np.sum(np.square(self.weights)))
 
-        # resample
+    @timed()
+    def resample(self):
+        count("Particle_Filter.resamples")
         old_pi0s = deepcopy(self.pi0s)
         # old_ps = deepcopy(self.particle_p)
 
-        # TODO: change up resampling if we start accelerating, we can't use the old algorithm
-
-        rr = np.random.rand()/self.num_particles
+        rr = self.rng.random()/self.num_particles
+        a0_noise = self.rng.normal(0, 5, self.num_particles)
+        l_noise = self.rng.normal(0, 0.001, self.num_particles)
         i = 0
         cc = self.weights[i]
         for mm in range(self.num_particles):
@@ -199,9 +248,9 @@ class Particle_Filter:
 
             # new way
             l = old_pi0s[i] - self.po0
-            a0 = max(np.linalg.norm(l) + np.random.normal(0, 5), self.r_min)
+            a0 = max(np.linalg.norm(l) + a0_noise[mm], self.r_min)
             l /= l.item(1)
-            l[0,0] += np.random.normal(0,0.001)
+            l[0,0] += l_noise[mm]
             l /= np.linalg.norm(l)
             vi = np.array([[1., 1.]]).T
             pi0, vi = self.calculate_trajectory_first(a0, [l]+self.lms[1:],self.ec, np.average(self.taus), self.pos) # use this to get an initial guess of the position and velocity
@@ -210,3 +259,5 @@ class Particle_Filter:
             self.particle_p[mm] = pk
             self.vis[mm] = vk
             self.pi0s[mm]=pi0n
+        # the resampled particles are equally likely, the old weights belonged to the particles they replaced
+        self.weights = [1.]*self.num_particles
@@ -3,10 +3,22 @@ import numpy.linalg as la
 import matplotlib.pyplot as plt
 from matplotlib.widgets import Slider
 from matplotlib.patches import Ellipse
+from matplotlib.colors import to_rgba
 from particle_filter import Particle_Filter
 import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
 from copy import deepcopy
 from path_planner import PathPlanner
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from viz.blit_manager import GrowingLimits
+from tools.instrumentation import timed, timer, count, enable, instruments
+from tools.rng import spawn_generators
+from controllers.collision_cone import CollisionConeController
+from tools.collision_probability import ParticleCollisionModel
+from tools.ellipses import covariance_ellipses
 
 # define constraints for the optimizer to use later on
 # minimum and maximum ranges of detection
@@ -19,6 +31,22 @@ v_max = 90
 # maximum own-ship velocity (23m/s~50mph)
 vo_max = 23
 
+# stop every timestep to inspect the predicted futures with a slider (blocks the sim loop)
+INSPECT_FUTURES = False
+# time each stage of the filters and the planner and print a summary at the end
+INSTRUMENT = False
+# planner time budget per step (s), when the planner overruns the ownship turns at the reactive collision cone yaw rate
+PLANNER_DEADLINE = 0.2
+# planner collision constraint, "particles" (collision probability from KD-tree ball counts of the
+# particles) or "kde" (density of a gaussian kde of the particles)
+PLANNING_MODEL = "particles"
+# radius around the ownship that counts as a collision and the band outside it where particles
+# count partially so the planner has a gradient (m)
+PROTECTION_RADIUS = 10.
+PROTECTION_SOFTENING = 5.
+# seed of the measurement noise and of the filters (None draws a different run every time)
+SEED = None
+
 po=np.array([[0.,0.]]).T
 vo=np.array([[0.,20.]]).T
 
@@ -61,67 +89,89 @@ class Trajectories:
         self.poss[0] = ownp
 
 class Plotter:
-    def __init__(self, num_intruders, num_particles, limits) -> None:
+    def __init__(self, num_intruders, num_particles, limits, capacity=512) -> None:
         plt.ion()
         self.fig = plt.figure()
         self.ax = self.fig.add_subplot()
         self.num_intruders = num_intruders
         self.num_particles = num_particles
         self.limits = limits
-        # list of the x and y coordinates of the ownship
-        self.pox = []
-        self.poy = []
-        # list of list of x and y coordinates of each of the intruders
-        self.pix = []
-        self.piy = []
-        self.particles_x = []
-        self.particles_y = []
+        self.head_width = 10
+        # the history is kept in arrays that double in size when they fill up
+        # own-ship positions (steps, 2), intruder positions (steps, intruders, 2)
+        # and particle positions (steps, intruders, particles, 2)
+        self.steps = 0
+        self.own = np.zeros((capacity, 2))
+        self.intruders = np.zeros((capacity, num_intruders, 2))
+        self.particles = np.zeros((capacity, num_intruders, num_particles, 2), dtype=np.float32)
+        self.limits_tracker = GrowingLimits(self.ax, margin=0.1)
+
+        # the paths and the particle clouds are one artist each, updated in place every timestep.
+        # A blitted timestep only puts the newest particles in the clouds, a full draw all of them
+        self.intruder_lines = []
         for i in range(num_intruders):
-            self.pix.append([])
-            self.piy.append([])
-            self.particles_x.append([])
-            self.particles_y.append([])
-
-    def update_plot(self, own_pos, intruder_poses, particle_poses):
-        plt.ion()
-        head_width = 10
-        self.ax.clear()
-        # add the points to the respective lists
-        self.pox.append(own_pos.item(0))
-        self.poy.append(own_pos.item(1))
-        for i in range(self.num_intruders):
-            # add each intruder position to the list
-            self.pix[i].append(intruder_poses[i].item(0))
-            self.piy[i].append(intruder_poses[i].item(1))
-
-            # add the particle positions to the lists
-            for j in range(self.num_particles):
-                self.particles_x[i].append(particle_poses[i][j].item(0))
-                self.particles_y[i].append(particle_poses[i][j].item(1))
-            # plot the particles of each intruder
-            self.ax.plot(self.particles_x[i], self.particles_y[i], marker='.', ls='', markersize=1, zorder=-30, label=f"In. {i+1} Particles")
-
-        # plot each of the actual intruders
-        for i in range(self.num_intruders):
-            lines=self.ax.plot(self.pix[i],self.piy[i], marker='.', markersize=10,label=f"Intruder {i+1}")
-            if len(self.pix[i]) >= 2:
-                self.ax.arrow(self.pix[i][0], self.piy[i][0], self.pix[i][1]-self.pix[i][0], self.piy[i][1]-self.piy[i][0], head_width=head_width, color=lines[0].get_color())
-            
-
-        # plot the own-ship path
-        self.ax.plot(self.pox,self.poy, marker='.', markersize=10,label='Own',c='r')
-        if len(self.pox)>=2:
-            self.ax.arrow(self.pox[0], self.poy[0], self.pox[1]-self.pox[0], self.poy[1]-self.poy[0], color='r', head_width=head_width)
+            self.intruder_lines.append(self.ax.plot([], [], marker='.', markersize=10, label=f"Intruder {i+1}")[0])
+        self.own_line, = self.ax.plot([], [], marker='.', markersize=10, label='Own', c='r')
+        # the particles of each intruder get a lighter shade of its color
+        self.particle_colors = [to_rgba(line.get_color(), 0.3) for line in self.intruder_lines]
+        self.particle_clouds = []
+        for i in range(num_intruders):
+            self.particle_clouds.append(self.ax.scatter(np.empty(0), np.empty(0), s=1, marker='.', color=self.particle_colors[i],
+                                                        zorder=-30, label=f"In. {i+1} Particles"))
 
         self.ax.set_title("Particles Produced By Intruders")
         self.ax.set_xlabel("x (m)")
         self.ax.set_ylabel("y (m)")
         self.ax.legend()
-        # self.ax.set_xlim(self.limits[0])
-        # self.ax.set_ylim(self.limits[1])
-
         self.fig.canvas.draw()
-        self.fig.canvas.flush_events()
+
+    def _grow(self):
+        """
+            doubles the capacity of the history arrays
+        """
+        for name in ('own', 'intruders', 'particles'):
+            old = getattr(self, name)
+            new = np.zeros((2*old.shape[0],)+old.shape[1:], dtype=old.dtype)
+            new[:self.steps] = old[:self.steps]
+            setattr(self, name, new)
+
+    def update_plot(self, own_pos, intruder_poses, particle_poses):
+        if self.steps == self.own.shape[0]:
+            self._grow()
+        k = self.steps
+        self.own[k] = own_pos[:,0]
+        for i in range(self.num_intruders):
+            self.intruders[k,i] = intruder_poses[i][:,0]
+            self.particles[k,i] = np.reshape(particle_poses[i], (self.num_particles, 2))
+        self.steps += 1
+
+        for i, line in enumerate(self.intruder_lines):
+            line.set_data(self.intruders[:k+1,i,0], self.intruders[:k+1,i,1])
+        self.own_line.set_data(self.own[:k+1,0], self.own[:k+1,1])
+
+        # the arrows show the initial direction of travel, so they only need to be drawn once
+        if self.steps == 2:
+            for i, line in enumerate(self.intruder_lines):
+                start, step = self.intruders[0,i], self.intruders[1,i]-self.intruders[0,i]
+                self.ax.arrow(start[0], start[1], step[0], step[1], head_width=self.head_width, color=line.get_color())
+            self.ax.arrow(self.own[0,0], self.own[0,1], self.own[1,0]-self.own[0,0], self.own[1,1]-self.own[0,1], color='r', head_width=self.head_width)
+
+        points = np.concatenate([self.particles[k].reshape(-1,2), self.intruders[k], self.own[k:k+1]])
+        redraw = self.limits_tracker.update(points[:,0], points[:,1]) or self.steps <= 2
+        canvas = self.fig.canvas
+        if redraw or not getattr(canvas, "supports_blit", False):
+            # a full draw needs the whole particle history in the clouds
+            for i, cloud in enumerate(self.particle_clouds):
+                cloud.set_offsets(self.particles[:k+1,i].reshape(-1,2))
+            canvas.draw()
+        else:
+            # the older layers are already on the canvas, so only the newest one is drawn over it
+            for i, cloud in enumerate(self.particle_clouds):
+                cloud.set_offsets(self.particles[k,i])
+            for artist in self.particle_clouds + self.intruder_lines + [self.own_line]:
+                self.ax.draw_artist(artist)
+            canvas.blit(self.ax.bbox)
+        canvas.flush_events()
 
     def plot_interactive(self):
         plt.ioff()
@@ -130,13 +180,19 @@ class Plotter:
         initial_i = 0
         particle_plots = []
         intruder_plots = []
+        # 95% ellipses of the particles of every intruder at every timestep, all at once
+        centroids, widths, heights, angles = covariance_ellipses(self.particles[:self.steps])
+        ellipses = []
         for i in range(self.num_intruders):
-            l,=plt.plot(self.particles_x[i][0:self.num_particles], self.particles_x[i][0:self.num_particles],marker='.', ls='', markersize=1, label=f'Particles Intruder {i+1}')
+            l,=plt.plot(self.particles[initial_i,i,:,0], self.particles[initial_i,i,:,1], marker='.', ls='', markersize=1, label=f'Particles Intruder {i+1}')
             particle_plots.append(l)
+            ellipses.append(Ellipse(centroids[initial_i,i], widths[initial_i,i], heights[initial_i,i], angle=angles[initial_i,i],
+                                    edgecolor=l.get_color(), fc='None', lw=1))
+            plt.gca().add_artist(ellipses[i])
         for i in range(self.num_intruders):
-            li, = plt.plot(self.pix[i][0], self.piy[i][0], marker='.', ls='', markersize=10, label=f'Intruder {i+1}')
+            li, = plt.plot(self.intruders[initial_i,i,0], self.intruders[initial_i,i,1], marker='.', ls='', markersize=10, label=f'Intruder {i+1}')
             intruder_plots.append(li)
-        l0, = plt.plot(self.pox[0], self.poy[0], c='r', marker='.', ls='', markersize=10, label='Ownship')
+        l0, = plt.plot(self.own[initial_i,0], self.own[initial_i,1], c='r', marker='.', ls='', markersize=10, label='Ownship')
         xlims = self.ax.get_xlim()
         ylims = self.ax.get_ylim()
         ax = plt.axis([xlims[0], xlims[1], ylims[0], ylims[1]])
@@ -144,19 +200,20 @@ class Plotter:
 
         axamp = plt.axes([0.25, .03, 0.50, 0.02])
         # Slider
-        samp = Slider(axamp, 'Timestep', 0, len(self.pox)-1, valinit=initial_i, valstep=1)
+        samp = Slider(axamp, 'Timestep', 0, self.steps-1, valinit=initial_i, valstep=1)
 
         def update(val):
             # amp is the current value of the slider
-            j = samp.val
+            j = int(samp.val)
             # update curve
             for i in range(self.num_intruders):
-                particle_plots[i].set_xdata(self.particles_x[i][self.num_particles*j:self.num_particles*(j+1)])
-                particle_plots[i].set_ydata(self.particles_y[i][self.num_particles*j:self.num_particles*(j+1)])
-                intruder_plots[i].set_xdata(self.pix[i][j])
-                intruder_plots[i].set_ydata(self.piy[i][j])
-            l0.set_xdata(self.pox[j])
-            l0.set_ydata(self.poy[j])
+                particle_plots[i].set_data(self.particles[j,i,:,0], self.particles[j,i,:,1])
+                intruder_plots[i].set_data([self.intruders[j,i,0]], [self.intruders[j,i,1]])
+                ellipses[i].set_center(centroids[j,i])
+                ellipses[i].set_width(widths[j,i])
+                ellipses[i].set_height(heights[j,i])
+                ellipses[i].set_angle(angles[j,i])
+            l0.set_data([self.own[j,0]], [self.own[j,1]])
             # redraw canvas while idle
             fig.canvas.draw_idle()
 
@@ -167,6 +224,7 @@ class Plotter:
 
 planner = PathPlanner((0,200))
 from scipy.stats import gaussian_kde
+@timed()
 def calculate_problematic_and_pdfs(t, ts, filters, po, vo, vo_max):
     max_dt = 5.
     kdes = []
@@ -200,10 +258,20 @@ def calculate_problematic_and_pdfs(t, ts, filters, po, vo, vo_max):
             else:
                 x = np.array(x)
                 y = np.array(y)
-                k = gaussian_kde(np.array([x,y]))
+                with timer("gaussian_kde"):
+                    k = gaussian_kde(np.array([x,y]))
                 kdes[j].append(k)
     return kdes, problematic, not_problematic
 
+@timed()
+def calculate_collision_model(ts, filters):
+    """
+        collision probability model of the particles at the same look-ahead times as the kdes
+    """
+    max_dt = 5.
+    dts = np.arange(0, max_dt+ts, ts)
+    return ParticleCollisionModel.from_filters(filters, dts, PROTECTION_RADIUS, PROTECTION_SOFTENING)
+
             
 
 
@@ -223,6 +291,11 @@ def plot_futures(t, ts, filters, actual_pis, actual_vis, po, vo, xlims, ylims):
     kdes, problematic, not_problematic = calculate_problematic_and_pdfs(t, ts, filters, po, vo, vo_max)
     if t > 1:
         path, cps = planner.update(po, kdes)
+    # 95% ellipses of the weighted particles of every intruder at every look-ahead time, all at once
+    dts = np.arange(0, max_dt+ts, ts)
+    particles = [f.get_particle_arrays() for f in filters]
+    futures = np.stack([p[np.newaxis] + v[np.newaxis]*dts[:,np.newaxis,np.newaxis] for p, v in particles])
+    centroids, widths, heights, angles = covariance_ellipses(futures, np.stack([f.weights for f in filters])[:,np.newaxis,:])
     tf = t
     j = int((tf - t)/ts)
 
@@ -237,7 +310,6 @@ def plot_futures(t, ts, filters, actual_pis, actual_vis, po, vo, xlims, ylims):
                 coll.remove()
             contours[i] = None
         # if len(problematic[i][j]) > 1 and kdes[i][j] is not None:
-            # centroid, a, b, alpha = get_ellipse_for_printing(problematic[i][j])
         # x = np.array(x)
         # y = np.array(y)
         # # k = kdes[i][j]
@@ -248,9 +320,7 @@ def plot_futures(t, ts, filters, actual_pis, actual_vis, po, vo, xlims, ylims):
 
         # contours[i] = ax.contour(xi, yi, zi.reshape(xi.shape))
         # else:
-        centroid, a, b, alpha = (0,-100),5.,5.,0.
-            
-        ellipse = Ellipse(centroid, a, b, alpha, edgecolor='k', fc='None',lw=2)
+        ellipse = Ellipse(centroids[i,j], widths[i,j], heights[i,j], angle=angles[i,j], edgecolor='k', fc='None',lw=2)
         ax_gca.add_artist(ellipse)
         p_ellipses.append(ellipse)
         problematic_particle_plots.append(l)
@@ -294,7 +364,6 @@ def plot_futures(t, ts, filters, actual_pis, actual_vis, po, vo, xlims, ylims):
                     coll.remove()
                 contours[i] = None
             # if len(problematic[i][j]) > 1 and kdes[i][j] is not None:
-                # centroid, a, b, alpha = get_ellipse_for_printing(problematic[i][j])
                 # x = np.array(x)
                 # y = np.array(y)
                 # k = kdes[i][j]
@@ -305,11 +374,10 @@ def plot_futures(t, ts, filters, actual_pis, actual_vis, po, vo, xlims, ylims):
 
                 # contours[i] = ax.contour(xi, yi, zi.reshape(xi.shape))
             # else:
-            centroid, a, b, alpha = (0,-100),5.,5.,0.
-            p_ellipses[i].set_center(centroid)
-            p_ellipses[i].set_width(a)
-            p_ellipses[i].set_height(b)
-            p_ellipses[i].set_angle(alpha)
+            p_ellipses[i].set_center(centroids[i,j])
+            p_ellipses[i].set_width(widths[i,j])
+            p_ellipses[i].set_height(heights[i,j])
+            p_ellipses[i].set_angle(angles[i,j])
             p = actual_pis[i]+actual_vis[i]*(tf)
             intruder_plots[i].set_xdata(p.item(0))
             intruder_plots[i].set_ydata(p.item(1))
@@ -332,80 +400,93 @@ def plot_futures(t, ts, filters, actual_pis, actual_vis, po, vo, xlims, ylims):
     # return np.array([[cps[1][0], cps[1][1]]]).T
 
 def get_ellipse_for_printing(points):
-    center = np.mean(np.asarray(points), axis=0)
-    reshaped = np.reshape(np.stack(points, axis=1),(2,-1))
-    A = np.cov(reshaped)#np.zeros((center.shape[0],center.shape[0]))
-    # n = len(points)
-    # for point in points:
-    #     A += (point - center) @ (point - center).T/(n-1)
-    
-    # print A
-
-    # V is the rotation matrix that gives the orientation of the ellipsoid.
-    # https://en.wikipedia.org/wiki/Rotation_matrix
-    # http://mathworld.wolfram.com/RotationMatrix.html
-    U, D, V = la.svd(A)
-    
-    # x, y radii.
-    l1, l2 = np.sqrt(D)
-    # Major and minor semi-axis of the ellipse.
-    s = np.sqrt(5.991) # cooresponds to 95% confidence interval
-    dx, dy = 2 * l1 * s, 2 * l2 * s
-    a, b = max(dx, dy), min(dx, dy)
-    # Eccentricity
-    e = np.sqrt(a ** 2 - b ** 2) / a
-
-    # print '\n', U
-    # print D
-    # print V, '\n'
-    # Orientation angle (with respect to the x axis counterclockwise).
-    alpha = np.rad2deg(np.arctan2(V[0][1],V[0][0]))
-    centroid = (center.item(0), center.item(1))
-    return centroid, a, b, alpha
-
-num_particles = 1000
-particle_p = deepcopy([po]+actual_pis)
-particle_v = [vo]+actual_vis
-
-t=0.
-ts = 0.2
-tstop = 5.
-steps = 0
-num_intruders = len(actual_pis)
-lm_col = []
-filters = []
-for i in range(num_intruders):
-    lm_col.append([])
-
-traj = Trajectories(num_intruders, num_particles, particle_p, particle_v, ts)
-plotter = Plotter(num_intruders, num_particles, [[-130,70],[-5,130]])
-following_path = False
-while t < tstop:
+    """
+        95% ellipse of a list of (2,1) points, covariance_ellipses does every intruder and
+        look-ahead time at once
+    """
+    centroid, a, b, alpha = covariance_ellipses(np.reshape(np.stack(points), (-1, 2)))
+    return (centroid.item(0), centroid.item(1)), a.item(), b.item(), alpha.item()
+
+# the simulation only runs when this file is executed, so the functions above can be imported (e.g. by the benchmarks)
+if __name__ == "__main__":
+    if INSTRUMENT:
+        enable()
+    num_particles = 1000
+    particle_p = deepcopy([po]+actual_pis)
+    particle_v = [vo]+actual_vis
+
+    t=0.
+    ts = 0.2
+    tstop = 5.
+    steps = 0
+    num_intruders = len(actual_pis)
+    lm_col = []
+    filters = []
     for i in range(num_intruders):
-        lm = traj.get_intruder_positions()[i] - traj.get_own_position()
-        # corrupt the bearing measurement with noise
-        lm /= lm.item(1)
-        lm[0,0] += np.random.normal(0,0.0005)
-        lm /= np.linalg.norm(lm)
-        lm_col[i].append(lm)
-        # calculate tau
-        tau = ((traj.get_own_position()-traj.get_intruder_positions()[i]).T @ ec)/((actual_vis[i]-vo).T @ ec)
-        if steps == 1:
-            # initialize the filters
-            filters.append(Particle_Filter(num_particles, lm_col[i][0], lm_col[i][1], tau, po, po+vo*ts, ec, r_min, r_max, v_max, ts))
-        if steps >= 2:
-            # weight the particles based on the new bearing measurement
-            filters[i].update(lm, traj.get_own_position(), tau, following_path)
-    if steps >= 1:
-        plotter.update_plot(traj.get_own_position(), traj.get_intruder_positions(), [filter.get_particle_positions() for filter in filters])
-        nextpoint = plot_futures(t, ts, filters, actual_pis, actual_vis, traj.get_own_position(), vo, [-200, 200], [0, 200])
-    traj.update()
-    # if steps >= 1:
-    #     traj.set_own_position(nextpoint)
-    t+=ts
-    steps += 1
-    # time.sleep(ts)
-
-plotter.update_plot(traj.get_own_position(), traj.get_intruder_positions(), [filter.get_particle_positions() for filter in filters])
-plotter.plot_interactive()
-plt.show()
\ No newline at end of file
+        lm_col.append([])
+    # independent streams for the measurement noise and for each filter
+    noise_rng, *filter_rngs = spawn_generators(SEED, num_intruders+1)
+
+    traj = Trajectories(num_intruders, num_particles, particle_p, particle_v, ts)
+    plotter = Plotter(num_intruders, num_particles, [[-130,70],[-5,130]])
+    following_path = False
+    reactive = CollisionConeController(-np.pi/4, np.pi/4)
+    # the planner runs on a worker so it can be abandoned at PLANNER_DEADLINE, the ownship then turns
+    # at the reactive yaw rate for the step. The planned paths aren't flown, the ownship otherwise holds its heading.
+    planning = ThreadPoolExecutor(max_workers=1)
+    plan = None
+    while t < tstop:
+        for i in range(num_intruders):
+            lm = traj.get_intruder_positions()[i] - traj.get_own_position()
+            # corrupt the bearing measurement with noise
+            lm /= lm.item(1)
+            lm[0,0] += noise_rng.normal(0,0.0005)
+            lm /= np.linalg.norm(lm)
+            lm_col[i].append(lm)
+            # calculate tau
+            tau = ((traj.get_own_position()-traj.get_intruder_positions()[i]).T @ ec)/((actual_vis[i]-traj.vels[0]).T @ ec)
+            if steps == 1:
+                # initialize the filters
+                filters.append(Particle_Filter(num_particles, lm_col[i][0], lm_col[i][1], tau, po, po+vo*ts, ec, r_min, r_max, v_max, ts, rng=filter_rngs[i]))
+            if steps >= 2:
+                # weight the particles based on the new bearing measurement
+                filters[i].update(lm, traj.get_own_position(), tau, following_path)
+        if steps >= 1:
+            plotter.update_plot(traj.get_own_position(), traj.get_intruder_positions(), [filter.get_particle_positions() for filter in filters])
+            if INSPECT_FUTURES:
+                nextpoint = plot_futures(t, ts, filters, actual_pis, actual_vis, traj.get_own_position(), vo, [-200, 200], [0, 200])
+            elif t > 1:
+                # a plan that overran an earlier deadline keeps the worker until it finishes, no new one is started meanwhile
+                if plan is None:
+                    if PLANNING_MODEL == "particles":
+                        model = calculate_collision_model(ts, filters)
+                    else:
+                        model, _, _ = calculate_problematic_and_pdfs(t, ts, filters, traj.get_own_position(), vo, vo_max)
+                    plan = planning.submit(planner.update, traj.get_own_position().copy(), model)
+                try:
+                    path, cps = plan.result(timeout=PLANNER_DEADLINE)
+                    plan = None
+                except TimeoutError:
+                    count("PathPlanner.missed_deadlines")
+                    particles = [filter.get_particle_arrays() for filter in filters]
+                    own_v = traj.vels[0]
+                    yaw = np.arctan2(own_v.item(0), own_v.item(1))
+                    speed = np.linalg.norm(own_v)
+                    yaw_rate = reactive.update(traj.get_own_position(), yaw, speed, [p for p, v in particles],
+                                               [v for p, v in particles], [filter.weights for filter in filters])
+                    # fly the reactive command for this step, the yaw is measured from y toward x
+                    yaw += yaw_rate*ts
+                    traj.vels[0] = speed*np.array([[np.sin(yaw), np.cos(yaw)]]).T
+        traj.update()
+        # if steps >= 1:
+        #     traj.set_own_position(nextpoint)
+        t+=ts
+        steps += 1
+        # time.sleep(ts)
+
+    planning.shutdown()
+    plotter.update_plot(traj.get_own_position(), traj.get_intruder_positions(), [filter.get_particle_positions() for filter in filters])
+    if INSTRUMENT:
+        print(instruments.format_summary())
+    plotter.plot_interactive()
+    plt.show()
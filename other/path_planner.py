@@ -4,6 +4,12 @@ import math
 from scipy.optimize import minimize, NonlinearConstraint
 from geomdl import BSpline
 from geomdl import utilities
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from tools.instrumentation import timed, count, record
+from tools.collision_probability import ParticleCollisionModel
 
 class PathPlanner:
 
@@ -13,24 +19,35 @@ class PathPlanner:
         self.ts = ts
         self.goal_pos = goal_pos
         self.old_path = np.zeros(self.num_control_points*2)
+        # threshold on the summed kde density at the control points
         self.probability_threshold = 0.00007
+        # threshold on the collision probability at the control points of a ParticleCollisionModel
+        self.collision_probability_threshold = 0.01
         pass
 
-    def update(self, own_pos, intruder_pdfs) -> BSpline.Curve: # expect a nested list of intruder pdfs for each timestep into the future
+    @timed()
+    def update(self, own_pos, intruder_pdfs) -> BSpline.Curve: # expect a nested list of intruder pdfs for each timestep into the future, or a ParticleCollisionModel
         start_point=(own_pos.item(0),own_pos.item(1)) 
 
         # setup the intruder avoidance constraint
-        def calc_probability_collision(x):
-            tmp = []
-
-            for i in range(0, len(x), 2):
-                out = 0
-                for j in range(len(intruder_pdfs)):
-                    if intruder_pdfs[j][i//2] is not None:
-                        out += intruder_pdfs[j][i//2]([x[i],x[i+1]]).item(0)
-                tmp.append(out)
-            return tmp
-        avoidance_constraint = NonlinearConstraint(calc_probability_collision, 0.0, self.probability_threshold)
+        if isinstance(intruder_pdfs, ParticleCollisionModel):
+            # control point i is checked against the particles i timesteps ahead, all of them in one query
+            def calc_probability_collision(x):
+                return intruder_pdfs.probabilities(np.reshape(x, (-1, 2)))
+            threshold = self.collision_probability_threshold
+        else:
+            def calc_probability_collision(x):
+                tmp = []
+
+                for i in range(0, len(x), 2):
+                    out = 0
+                    for j in range(len(intruder_pdfs)):
+                        if intruder_pdfs[j][i//2] is not None:
+                            out += intruder_pdfs[j][i//2]([x[i],x[i+1]]).item(0)
+                    tmp.append(out)
+                return tmp
+            threshold = self.probability_threshold
+        avoidance_constraint = NonlinearConstraint(calc_probability_collision, 0.0, threshold)
 
         # setup the maximum velocity constraint
         def calc_dx(x): # calculate the distance between the control points
@@ -50,6 +67,13 @@ class PathPlanner:
         initial_x[-2:] = self.old_path[-2:]
         bounds = [(-10000,100) for i in range(len(initial_x))]
         res = minimize(objective_function, initial_x, method='SLSQP', constraints=[max_velocity_constraint, avoidance_constraint])
+        record("PathPlanner.solver_iterations", res.nit)
+        record("PathPlanner.function_evaluations", res.nfev)
+        if not res.success:
+            count("PathPlanner.solver_failures")
+        if isinstance(intruder_pdfs, ParticleCollisionModel):
+            # post-hoc risk of the path that is flown, whether or not the solver converged
+            record("PathPlanner.collision_probability", np.max(calc_probability_collision(res.x)))
         cp = [[start_point[0], start_point[1]]]
         for i in range(0, len(res.x), 2):
             cp.append([res.x[i], res.x[i+1]])
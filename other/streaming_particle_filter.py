@@ -0,0 +1,124 @@
+"""
+Runs the Particle_Filter/PathPlanner stack of particle_filter_improved.py through the asyncio
+streaming pipeline, fed by a simulated camera whose frames arrive with random latency. Each
+intruder is its own track worker, the planner replans on the newest particles of every track
+whenever it is free.
+"""
+import asyncio
+import socket
+import time
+import numpy as np
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from tools.streaming import Pipeline, Channel, queue_source, open_datagram_source, END, DROP_OLDEST
+from tools.collision_probability import ParticleCollisionModel
+from tools.instrumentation import enable, instruments
+from tools.rng import spawn_generators
+from msg.los_msg import LosMsg
+from particle_filter import Particle_Filter
+from path_planner import PathPlanner
+import particle_filter_improved as pfi
+
+# send the camera frames over a local UDP socket instead of an in-process queue
+USE_UDP = False
+UDP_ADDRESS = ("127.0.0.1", 50007)
+# nominal camera period (s), the frames arrive up to MAX_LATENCY late
+ts = 0.2
+MAX_LATENCY = 0.15
+tstop = 5.
+num_particles = 500
+# print a summary of the stage timers and dropped items at the end
+INSTRUMENT = True
+# seed of the measurement noise, the latencies and the filters (None draws a different run every time)
+SEED = None
+
+class ParticleFilterTrack:
+    def __init__(self, rng) -> None:
+        """
+            estimator adapter of one intruder, the filter is created from the first two measurements
+        """
+        self.rng = rng
+        self.first = []
+        self.filter = None
+
+    def update(self, msg:LosMsg):
+        if self.filter is None:
+            self.first.append(msg)
+            if len(self.first) < 2:
+                return None
+            m0, m1 = self.first
+            self.filter = Particle_Filter(num_particles, m0.los, m1.los, m1.tau, m0.own_position, m1.own_position, pfi.ec,
+                                          pfi.r_min, pfi.r_max, pfi.v_max, m1.t - m0.t, rng=self.rng)
+        else:
+            # frames dropped on the way only make the gap to the next correction longer
+            self.filter.correct(msg.los, msg.own_position, msg.tau, msg.t - self.first[0].t)
+        positions, velocities = self.filter.get_particle_arrays()
+        return msg.t, msg.own_position.copy(), positions, velocities, np.array(self.filter.weights)
+
+planner = PathPlanner((0,200))
+def plan(snapshots):
+    """
+        plans against the particles of every track, propagated to the newest measurement time
+    """
+    t = max(snapshot[0] for snapshot in snapshots.values())
+    own_position = next(snapshot[1] for snapshot in snapshots.values() if snapshot[0] == t)
+    dts = np.arange(0, 5.+ts, ts)
+    positions, weights = [], []
+    for t_k, _, p, v, w in snapshots.values():
+        positions.append(p[np.newaxis] + v[np.newaxis]*(t - t_k + dts[:,np.newaxis,np.newaxis]))
+        weights.append(w)
+    model = ParticleCollisionModel(np.stack(positions), pfi.PROTECTION_RADIUS, np.stack(weights), pfi.PROTECTION_SOFTENING)
+    start = time.perf_counter()
+    path, cps = planner.update(own_position, model)
+    return t, time.perf_counter() - start, np.max(model.probabilities(np.array(cps[1:])))
+
+def on_plan(result):
+    t, elapsed, risk = result
+    print(f"planned on the measurements of t={t:.1f}s in {elapsed:.2f}s, collision probability {risk:.3f}")
+
+async def camera(send, rng):
+    """
+        sends the bearing and time to collision of every intruder once per frame, each frame
+        after its own random latency (frames stay in order, like a camera pipeline)
+    """
+    start = time.perf_counter()
+    for k in range(int(tstop/ts)):
+        t = k*ts
+        own = pfi.po + pfi.vo*t
+        latency = rng.uniform(0., MAX_LATENCY)
+        await asyncio.sleep(max(0., start + t + latency - time.perf_counter()))
+        for i in range(len(pfi.actual_pis)):
+            intruder = pfi.actual_pis[i] + pfi.actual_vis[i]*t
+            lm = intruder - own
+            lm /= lm.item(1)
+            lm[0,0] += rng.normal(0,0.0005)
+            lm /= np.linalg.norm(lm)
+            tau = (((own-intruder).T @ pfi.ec)/((pfi.actual_vis[i]-pfi.vo).T @ pfi.ec)).item(0)
+            await send(LosMsg(t, i, lm, own, tau))
+    await send(END)
+
+async def main():
+    noise_rng, *filter_rngs = spawn_generators(SEED, len(pfi.actual_pis)+1)
+    pipeline = Pipeline(lambda track: ParticleFilterTrack(filter_rngs[track]), plan, on_plan)
+    if USE_UDP:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        async def send(msg):
+            sock.sendto(b"" if msg is END else msg.toBytes(), UDP_ADDRESS)
+        source = await open_datagram_source(UDP_ADDRESS)
+    else:
+        frames = Channel(64, DROP_OLDEST, "camera")
+        send = frames.put
+        source = queue_source(frames)
+    feed = asyncio.create_task(camera(send, noise_rng))
+    await pipeline.run(source)
+    await feed
+    print(f"{pipeline.num_plans} plans for {int(tstop/ts)} frames")
+
+if __name__ == "__main__":
+    if INSTRUMENT:
+        enable()
+    asyncio.run(main())
+    if INSTRUMENT:
+        print(instruments.format_summary())
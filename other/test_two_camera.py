@@ -1,4 +1,5 @@
 import numpy as np
+from los_ttc_solver import los_ttc_systems, solve_systems
 
 
 po=np.array([[0.,0.]]).T
@@ -26,18 +27,9 @@ ec2 /= np.linalg.norm(ec2)
 tau2 = ((po-pi).T @ ec2)/((vi-vo).T @ ec2)
 # print(tau2)
 
-# get the unit vector perpendicular to the camera normal vector
-ecp1 = np.array([[0, -1],[1,0]]) @ ec1
-ecp2 = np.array([[0, -1],[1,0]]) @ ec2
-
-# solve the min-norm problem
-zero = np.zeros((2,1))
-A1 = np.concatenate([l1,-l2,zero, zero,np.eye(2)*ts],axis=1)
-A2 = np.concatenate([l1,zero,-ecp1, zero,np.eye(2)*tau1], axis=1)
-A3 = np.concatenate([l1,zero, zero,-ecp2, np.eye(2)*tau2], axis=1)
-A = np.concatenate([A1,A2, A3],axis=0)
-
-b = np.concatenate([vo*ts,vo*tau1, vo*tau2],axis=0)
+# assemble the min-norm problem of both cameras
+A, b = los_ttc_systems(l1, l2, np.concatenate([ec1, ec2], axis=1).T, [[tau1.item(0), tau2.item(0)]], vo, ts)
+A, b = A[0], b[0][:,np.newaxis]
 
 x = np.linalg.inv(A)@b
 print("Inverse:")
@@ -45,11 +37,14 @@ print(x)
 
 print()
 print("Pseudo-Inverse:")
-print(np.linalg.pinv(A)@b)
+x, rank, cond = solve_systems(A[np.newaxis], b.T)
+print(x.T)
 
 
 print()
 print(A)
 print()
 print("Rank of A:")
-print(np.linalg.matrix_rank(A))
\ No newline at end of file
+print(rank.item(0))
+print("Condition number of A:")
+print(cond.item(0))
\ No newline at end of file
@@ -0,0 +1,98 @@
+"""
+    Closed form bounds of the family of intruder trajectories that fit a set of line of sight
+    (and time to collision) measurements, for whole batches of perturbed measurements at once.
+
+    The min-norm solution of the measurement equations gives one trajectory (pi2, vi2), and
+    every alpha*(pi2-po)+po moving at alpha*(vi2-vo)+vo fits the measurements just as well.
+    The range constraints are linear in alpha and the speed constraint is quadratic, so the
+    feasible alphas are an interval that is solved for directly instead of with two calls
+    to scipy.optimize.minimize per case.
+"""
+import numpy as np
+from los_ttc_solver import los_ttc_systems, _rows
+
+def two_los_ttc_systems(l1, l2, ec, tau, vo, ts):
+    """
+        (B,4,5) A and (B,4) b of the two line of sight plus time to collision formulation
+        (generate_possible_trajectories.py), the single camera case of los_ttc_systems.
+        l1, l2 are (B,2) unit vectors, ec the camera normal and tau the (B,) times to collision.
+    """
+    tau = np.atleast_1d(np.asarray(tau, dtype=float)).ravel()
+    return los_ttc_systems(l1, l2, _rows(ec), tau[:, np.newaxis], vo, ts)
+
+def three_los_systems(l1, l2, l3, vo, ts, horizon):
+    """
+        (B,4,5) A and (B,4) b of the three line of sight formulation
+        (generate_possible_trajectories_no_ttc.py), l3 is measured horizon seconds after l1
+    """
+    l1, l2, l3 = _rows(l1), _rows(l2), _rows(l3)
+    vo = _rows(vo)[0]
+    batch = np.broadcast_shapes((l1.shape[0],), (l2.shape[0],), (l3.shape[0],))[0]
+
+    A = np.zeros((batch, 4, 5))
+    A[:, 0:2, 0] = l1
+    A[:, 0:2, 1] = -l2
+    A[:, 0:2, 3:5] = np.eye(2)*ts
+    A[:, 2:4, 0] = l1
+    A[:, 2:4, 2] = -l3
+    A[:, 2:4, 3:5] = np.eye(2)*horizon
+    b = np.zeros((batch, 4))
+    b[:, 0:2] = vo*ts
+    b[:, 2:4] = vo*horizon
+    return A, b
+
+def alpha_intervals(r0, vi, vo, r_min, r_max, v_max):
+    """
+        [lo, hi] of the alphas that keep alpha*r0 in [r_min, r_max] and the speed
+        |alpha*(vi-vo)+vo| <= v_max, for (B,) initial ranges r0 and (B,2) velocities vi.
+        Returns lo, hi and a mask of the families that have any feasible alpha.
+    """
+    vo = _rows(vo)[0]
+    d = vi - vo
+    # |d|^2 alpha^2 + 2 d.vo alpha + |vo|^2 - v_max^2 <= 0
+    qa = np.sum(d*d, axis=1)
+    qb = d @ vo
+    qc = vo @ vo - v_max**2
+    disc = qb**2 - qa*qc
+    moving = qa > 0
+    safe_qa = np.where(moving, qa, 1.)
+    root = np.sqrt(np.maximum(disc, 0.))
+    speed_lo = np.where(moving, (-qb - root)/safe_qa, -np.inf)
+    speed_hi = np.where(moving, (-qb + root)/safe_qa, np.inf)
+    speed_ok = np.where(moving, disc >= 0, qc <= 0)
+
+    with np.errstate(divide="ignore"):
+        lo = np.maximum(r_min/r0, speed_lo)
+        hi = np.minimum(r_max/r0, speed_hi)
+    feasible = speed_ok & (r0 > 0) & (lo <= hi)
+    return lo, hi, feasible
+
+def family_bounds(A, b, po, vo, r_min, r_max, v_max):
+    """
+        closest and furthest members of the trajectory family of every system, (B,2) p_min,
+        v_min, p_max, v_max and the (B,) feasible mask (the bounds are nan where it is False)
+    """
+    po, vo = _rows(po)[0], _rows(vo)[0]
+    x = np.einsum('bij,bj->bi', np.linalg.pinv(A), b)
+    # the first unknown is the range along l1, which is the first column of A
+    l1 = A[:, 0:2, 0]
+    offset = l1*x[:, 0:1]
+    vi = x[:, 3:5]
+    lo, hi, feasible = alpha_intervals(np.linalg.norm(offset, axis=1), vi, vo, r_min, r_max, v_max)
+    lo = np.where(feasible, lo, np.nan)[:, np.newaxis]
+    hi = np.where(feasible, hi, np.nan)[:, np.newaxis]
+    return lo*offset + po, lo*(vi - vo) + vo, hi*offset + po, hi*(vi - vo) + vo, feasible
+
+def two_los_ttc_bounds(l1, l2, ec, tau, po, vo, ts, r_min, r_max, v_max):
+    """
+        family bounds of a batch of two line of sight plus time to collision measurements
+    """
+    A, b = two_los_ttc_systems(l1, l2, ec, tau, vo, ts)
+    return family_bounds(A, b, po, vo, r_min, r_max, v_max)
+
+def three_los_bounds(l1, l2, l3, po, vo, ts, horizon, r_min, r_max, v_max):
+    """
+        family bounds of a batch of three line of sight measurements
+    """
+    A, b = three_los_systems(l1, l2, l3, vo, ts, horizon)
+    return family_bounds(A, b, po, vo, r_min, r_max, v_max)
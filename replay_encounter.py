@@ -0,0 +1,58 @@
+"""
+    Replays an encounter recorded by twodcollisionsimekf.py through an estimator,
+    as fast as the estimator can run, without re-simulating it
+"""
+
+import sys
+import time
+import heapq
+import numpy as np
+from estimators.target_ekf import TargetEKF
+from estimators.inverse_depth_ekf import InverseDepthEKF
+from msg.twoDYawState import TwoDYawState
+from msg.bearing_msg import BearingMsg
+from tools.encounter_log import EncounterLog, replay
+from tools.out_of_sequence import OutOfSequenceFilter
+
+USE_INVERSE = False
+# every measurement is delivered up to MAX_DELAY seconds late, in the order they arrive, and the
+# estimator fuses the late ones through its state history (0 delivers them in order)
+MAX_DELAY = 0.
+# number of corrections the history keeps, measurements older than that are dropped
+OOSM_WINDOW = 50
+
+log = EncounterLog(sys.argv[1] if len(sys.argv) > 1 else "encounter_log")
+estimates = np.zeros((len(log), 5))
+target_estimator = None
+steps = 0
+# measurements on their way, ordered by arrival time
+pending = []
+delay_rng = np.random.default_rng(0)
+
+def step(t, ownship, measurement, truth, input):
+    global target_estimator, steps, t0
+    # both messages are views of the memory-mapped log
+    uav_state = TwoDYawState.fromBuffer(ownship)
+    bearing_msg = BearingMsg(measurement.item(0), measurement.item(1))
+    if target_estimator is not None:
+        heapq.heappush(pending, (t + delay_rng.uniform(0., MAX_DELAY), steps, t - t0, bearing_msg, uav_state, input.item(0)))
+        while len(pending) > 0 and pending[0][0] <= t:
+            _, _, t_k, msg, state, u = heapq.heappop(pending)
+            target_estimator.correct(t_k, msg, state, input=u)
+    else:
+        t0 = t
+        if USE_INVERSE:
+            estimator = InverseDepthEKF(bearing_msg.bearing, uav_state.yaw, log.ts)
+        else:
+            estimator = TargetEKF(bearing_msg.bearing, uav_state.yaw, log.ts)
+        target_estimator = OutOfSequenceFilter(estimator, OOSM_WINDOW)
+    estimates[steps] = target_estimator.estimator.xhat[:,0]
+    steps += 1
+
+start = time.perf_counter()
+replay(log, step)
+elapsed = time.perf_counter() - start
+
+print(f"Replayed {len(log)} steps ({len(log)*log.ts:.1f}s of data) in {elapsed:.2f}s")
+print("Final estimate:")
+print(estimates[-1])
@@ -3,12 +3,22 @@
 """
 
 import numpy as np
-from typing import List
+from tools.rng import as_generator
+from typing import List, Tuple
 from msg.bearing_msg import BearingMsg
 
 class BearingSensor:
-    def __init__(self) -> None:
-        pass
+    def __init__(self, noise_std=0., dropout_prob=0., fov=None, rng=None) -> None:
+        """
+            noise_std is the standard deviation of the bearing noise (rad), dropout_prob
+            is the probability that a target is missed on a given frame and fov is the
+            full field of view of the camera about the UAV's heading (rad, None for 360 deg).
+            rng is the numpy Generator (or seed) the noise and dropouts are drawn from
+        """
+        self.noise_std = noise_std
+        self.dropout_prob = dropout_prob
+        self.fov = fov
+        self.rng = as_generator(rng)
 
     def update(self, uav_position:np.ndarray, uav_yaw:float, target_positions:List[np.ndarray])->List[BearingMsg]:
         bearings = []
@@ -16,4 +26,25 @@ class BearingSensor:
             dif = target_pos - uav_position
             bearing = np.arctan2(dif[0], dif[1])-uav_yaw
             bearings.append(BearingMsg(bearing.item(0), uav_yaw))
-        return bearings
\ No newline at end of file
+        return bearings
+
+    def update_batch(self, uav_position:np.ndarray, uav_yaw:float, target_positions:np.ndarray)->Tuple[np.ndarray, np.ndarray]:
+        """
+            Vectorized version of update. target_positions is an (M,2) array of target positions.
+            Returns the (M,) array of bearings and an (M,) boolean array that is False for the
+            targets that were dropped or are outside of the field of view (their bearing is nan).
+        """
+        dif = np.asarray(target_positions, dtype=float) - np.reshape(uav_position, (1, 2))
+        bearings = np.arctan2(dif[:,0], dif[:,1]) - uav_yaw
+        num_targets = bearings.shape[0]
+
+        valid = np.ones(num_targets, dtype=bool)
+        if self.fov is not None:
+            wrapped = np.mod(bearings + np.pi, 2*np.pi) - np.pi
+            valid &= np.abs(wrapped) <= self.fov/2.
+        if self.dropout_prob > 0.:
+            valid &= self.rng.random(num_targets) >= self.dropout_prob
+        if self.noise_std > 0.:
+            bearings += self.rng.normal(0., self.noise_std, num_targets)
+        bearings[~valid] = np.nan
+        return bearings, valid
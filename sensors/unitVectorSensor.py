@@ -3,16 +3,55 @@
 """
 
 import numpy as np
-from typing import List
+from tools.rng import as_generator
+from typing import List, Tuple
 
 class UnitVectorSensor:
-    def __init__(self) -> None:
-        pass
+    def __init__(self, noise_std=0., dropout_prob=0., fov=None, boresight=None, rng=None) -> None:
+        """
+            noise_std is the standard deviation of the noise added to each component of the
+            unit vector, dropout_prob is the probability that a target is missed on a given
+            frame and fov is the full field of view (rad, None for a spherical camera) centered
+            on the boresight direction (defaults to the first axis). rng is the numpy
+            Generator (or seed) the noise and dropouts are drawn from
+        """
+        self.noise_std = noise_std
+        self.dropout_prob = dropout_prob
+        self.fov = fov
+        self.rng = as_generator(rng)
+        self.boresight = boresight
 
     def update(self, uav_position:np.ndarray, target_positions:List[np.ndarray])->List[np.ndarray]:
         unit_vectors = []
         for target_pos in target_positions:
             dif = target_pos - uav_position
-            dif /= np.linalg.norm(dif)
-            unit_vectors.append(dif)
-        return unit_vectors
\ No newline at end of file
+            unit_vectors.append(dif/np.linalg.norm(dif))
+        return unit_vectors
+
+    def update_batch(self, uav_position:np.ndarray, target_positions:np.ndarray)->Tuple[np.ndarray, np.ndarray]:
+        """
+            Vectorized version of update. target_positions is an (M,d) array of target positions.
+            Returns the (M,d) array of unit vectors and an (M,) boolean array that is False for the
+            targets that were dropped or are outside of the field of view (their rows are nan).
+            The caller's arrays are never modified.
+        """
+        target_positions = np.asarray(target_positions, dtype=float)
+        num_targets, d = target_positions.shape
+        dif = target_positions - np.reshape(uav_position, (1, d))
+        if self.noise_std > 0.:
+            dif /= np.linalg.norm(dif, axis=1, keepdims=True)
+            dif += self.rng.normal(0., self.noise_std, dif.shape)
+        unit_vectors = dif/np.linalg.norm(dif, axis=1, keepdims=True)
+
+        valid = np.ones(num_targets, dtype=bool)
+        if self.fov is not None:
+            if self.boresight is None:
+                boresight = np.zeros(d)
+                boresight[0] = 1.
+            else:
+                boresight = np.reshape(self.boresight, (d))/np.linalg.norm(self.boresight)
+            valid &= unit_vectors @ boresight >= np.cos(self.fov/2.)
+        if self.dropout_prob > 0.:
+            valid &= self.rng.random(num_targets) >= self.dropout_prob
+        unit_vectors[~valid] = np.nan
+        return unit_vectors, valid
@@ -0,0 +1,88 @@
+"""
+collision probability
+    - Probability that an intruder is within a protection radius of a point, straight from the
+      weighted particles instead of through a kernel density estimate. The particles of every
+      intruder and look-ahead time go into one cKDTree, each (intruder, time) pair is a layer
+      offset far enough along a third axis that balls can't reach across layers, so one ball
+      query answers every control point of every intruder at once.
+    - Ball counts are piecewise constant, which gives finite difference gradients (e.g. SLSQP in
+      the PathPlanner) nothing to follow. A softening band outside the radius where particles
+      count partially, tapering to 0, makes the probability continuous with a usable slope.
+"""
+import numpy as np
+from scipy.spatial import cKDTree
+
+class ParticleCollisionModel:
+    def __init__(self, positions, radius, weights=None, softening=0.) -> None:
+        """
+            positions is an (M,T,N,2) array of the particles of M intruders propagated to T
+            look-ahead times, weights the (M,N) particle weights (uniform by default), radius
+            the protection radius around the ownship and softening the width of the band
+            outside of it where particles count partially (0 for exact ball counts)
+        """
+        positions = np.asarray(positions, dtype=float)
+        self.num_intruders, self.num_times, self.num_particles, _ = positions.shape
+        self.radius = radius
+        self.softening = softening
+        if weights is None:
+            weights = np.ones((self.num_intruders, self.num_particles))
+        weights = np.asarray(weights, dtype=float)
+        totals = np.sum(weights, axis=1, keepdims=True)
+        # a family whose weights all underflowed counts its particles equally
+        weights = np.where(totals > 0., weights/np.where(totals > 0., totals, 1.), 1./self.num_particles)
+        # weight of every point in the tree, the weights don't change with the look-ahead time
+        self.weights = np.broadcast_to(weights[:,np.newaxis,:], positions.shape[:3]).ravel()
+        # far enough apart that no ball reaches into the next layer
+        self.spacing = 4.*(radius + softening)
+        layers = np.repeat(self._layers(np.arange(self.num_times)).ravel(), self.num_particles)
+        self.tree = cKDTree(np.column_stack([np.reshape(positions, (-1, 2)), layers]))
+
+    @classmethod
+    def from_filters(cls, filters, times, radius, softening=0.):
+        """
+            model of the Particle_Filter families propagated at constant velocity to each of the times
+        """
+        positions = []
+        for f in filters:
+            p, v = f.get_particle_arrays()
+            positions.append(p[np.newaxis] + v[np.newaxis]*np.reshape(times, (-1,1,1)))
+        return cls(np.stack(positions), radius, np.stack([f.weights for f in filters]), softening)
+
+    def _layers(self, time_indices):
+        """
+            (M,len(time_indices)) third coordinate of the layer of each intruder at each time
+        """
+        return self.spacing*(np.arange(self.num_intruders)[:,np.newaxis]*self.num_times + time_indices)
+
+    def intruder_probabilities(self, points, time_indices=None):
+        """
+            (M,K) probability that each intruder is within the radius of each of the (K,2)
+            points, point k is checked at look-ahead time time_indices[k] (k by default)
+        """
+        points = np.reshape(np.asarray(points, dtype=float), (-1, 2))
+        time_indices = np.arange(len(points)) if time_indices is None else np.asarray(time_indices)
+        # an index past the last time would land in the layers of the next intruder
+        if np.any(time_indices < 0) or np.any(time_indices >= self.num_times):
+            raise ValueError(f"time indices must be in [0, {self.num_times}), the model has {self.num_times} look-ahead times")
+        queries = np.column_stack([np.tile(points, (self.num_intruders, 1)),
+                                   self._layers(time_indices).ravel()])
+        # weight aware ball counts, the neighbor lists are flattened and summed per query
+        neighbors = self.tree.query_ball_point(queries, self.radius + self.softening, return_sorted=False)
+        lengths = np.fromiter((len(n) for n in neighbors), dtype=int, count=len(neighbors))
+        flat = np.fromiter((i for n in neighbors for i in n), dtype=int, count=np.sum(lengths))
+        owners = np.repeat(np.arange(len(queries)), lengths)
+        weights = self.weights[flat]
+        if self.softening > 0.:
+            distances = np.linalg.norm(self.tree.data[flat,:2] - queries[owners,:2], axis=1)
+            # 1 inside the radius, a cosine taper to 0 across the softening band
+            band = np.clip((distances - self.radius)/self.softening, 0., 1.)
+            weights = weights*0.5*(1. + np.cos(np.pi*band))
+        probabilities = np.bincount(owners, weights=weights, minlength=len(queries))
+        return np.reshape(np.minimum(probabilities, 1.), (self.num_intruders, -1))
+
+    def probabilities(self, points, time_indices=None):
+        """
+            (K,) probability that any intruder is within the radius of each point, the intruders
+            are independent
+        """
+        return 1. - np.prod(1. - self.intruder_probabilities(points, time_indices), axis=0)
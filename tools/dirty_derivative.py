@@ -1,6 +1,9 @@
 """
 dirty derivative
+    - z can be a scalar or an array of any shape, every element is a channel that is
+      filtered independently in the same update
 """
+import numpy as np
 
 class DirtyDerivative:
     def __init__(self, Ts, tau):
@@ -8,9 +11,12 @@ class DirtyDerivative:
         self.tau = tau
         self.a1 = (2.0 * tau - Ts) / (2.0 * tau + Ts)
         self.a2 = 2.0 / (2.0 * tau+ Ts)
+        # a bool for scalars, a per channel mask for arrays
         self.initialized = False
 
     def update(self, z):
+        if np.ndim(z) > 0:
+            return self._update_channels(np.asarray(z, dtype=float))
         if self.initialized is False:
             self.z_dot = 0 * z
             self.z_delay_1 = z
@@ -19,4 +25,32 @@ class DirtyDerivative:
             self.z_dot = self.a1 * self.z_dot \
                          + self.a2 * (z - self.z_delay_1)
             self.z_delay_1 = z
-        return self.z_dot
\ No newline at end of file
+        return self.z_dot
+
+    def _update_channels(self, z):
+        """
+            Channels start when they first see a finite value (e.g. a target that appears mid-run)
+            with a derivative of 0, like the scalar case. A nan input (e.g. a dropped target)
+            makes the channel output nan and restarts it when it comes back, so the gap isn't
+            differentiated.
+        """
+        if self.initialized is False or np.shape(self.initialized) != z.shape:
+            self.z_dot = np.full(z.shape, np.nan)
+            self.z_delay_1 = np.full(z.shape, np.nan)
+            self.initialized = np.zeros(z.shape, dtype=bool)
+        present = np.isfinite(z)
+        running = present & self.initialized
+        self.z_dot = np.where(running, self.a1 * self.z_dot + self.a2 * (z - self.z_delay_1),
+                              np.where(present, 0., np.nan))
+        self.z_delay_1 = z
+        self.initialized = present
+        return self.z_dot
+
+    def reset(self, mask=None):
+        """
+            restarts the channels in mask (all of them by default) on their next input
+        """
+        if mask is None or self.initialized is False or self.initialized is True:
+            self.initialized = False
+        else:
+            self.initialized = self.initialized & ~np.asarray(mask, dtype=bool)
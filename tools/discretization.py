@@ -0,0 +1,44 @@
+"""
+discretization
+    - Lets an estimator step by any dt instead of the fixed ts it was built with. The
+      discretization of a step (substeps, transition matrices, process noise) is built for the
+      dt it is asked for and memoized, a camera only ever produces a few distinct frame
+      intervals so they are each built once.
+"""
+from collections import OrderedDict
+import numpy as np
+
+class DiscretizationCache:
+    def __init__(self, build, maxsize=16, resolution=1e-9) -> None:
+        """
+            build(dt) returns the discretization of a step of dt. dts are rounded to resolution
+            so timestamp differences that only differ by round off share an entry, the maxsize
+            most recently used ones are kept. clear() after changing the parameters build uses.
+        """
+        self.build = build
+        self.maxsize = maxsize
+        self.resolution = resolution
+        self._cache = OrderedDict()
+
+    def __call__(self, dt):
+        if dt < 0.:
+            raise ValueError(f"can't step backward in time (dt={dt})")
+        key = round(dt/self.resolution)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        value = self.build(dt)
+        self._cache[key] = value
+        if len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+        return value
+
+    def clear(self):
+        self._cache.clear()
+
+def substeps(dt, max_step):
+    """
+        number of equal substeps no longer than max_step a step of dt is split into and their length
+    """
+    steps = max(1, int(np.ceil(dt/max_step - 1e-9)))
+    return steps, dt/steps
@@ -0,0 +1,49 @@
+"""
+ellipses
+    - Confidence ellipses of 2D point clouds (e.g. the particles of every intruder at every
+      look-ahead time) in one pass. The leading axes are cells, the 2x2 covariances are
+      decomposed in closed form instead of with one SVD per cell.
+"""
+import numpy as np
+
+def weighted_covariances(points, weights=None):
+    """
+        (...,2) means and (...,2,2) covariances of the (...,N,2) points with (...,N) weights
+        (uniform by default). The covariance is unbiased for reliability weights, with uniform
+        weights it is np.cov.
+    """
+    points = np.asarray(points, dtype=float)
+    if weights is None:
+        weights = np.ones(points.shape[:-1])
+    weights = np.broadcast_to(np.asarray(weights, dtype=float), points.shape[:-1])
+    weights = weights/np.sum(weights, axis=-1, keepdims=True)
+    means = np.einsum('...n,...ni->...i', weights, points)
+    centered = points - means[...,np.newaxis,:]
+    covariances = np.einsum('...n,...ni,...nj->...ij', weights, centered, centered)
+    covariances /= (1. - np.sum(weights*weights, axis=-1))[...,np.newaxis,np.newaxis]
+    return means, covariances
+
+def eig_2x2(covariances):
+    """
+        (...,) larger and smaller eigenvalues of the (...,2,2) symmetric matrices and the angle
+        (rad, from the first axis toward the second) of the eigenvector of the larger one
+    """
+    a = covariances[...,0,0]
+    b = covariances[...,0,1]
+    c = covariances[...,1,1]
+    mean = 0.5*(a + c)
+    spread = np.hypot(0.5*(a - c), b)
+    return mean + spread, mean - spread, 0.5*np.arctan2(2.*b, a - c)
+
+def covariance_ellipses(points, weights=None, chi2=5.991):
+    """
+        confidence ellipses of the (...,N,2) points, the default chi2 is the 95% confidence
+        region. Returns the (...,2) centroids, the (...,) major and minor axis lengths (full
+        widths, as matplotlib's Ellipse takes them) and the (...,) angles (deg), the same
+        conventions as get_ellipse_for_printing.
+    """
+    centroids, covariances = weighted_covariances(points, weights)
+    major, minor, angles = eig_2x2(covariances)
+    # round off can leave a degenerate cloud with a tiny negative eigenvalue
+    scale = 2.*np.sqrt(chi2)
+    return centroids, scale*np.sqrt(np.maximum(major, 0.)), scale*np.sqrt(np.maximum(minor, 0.)), np.rad2deg(angles)
@@ -0,0 +1,155 @@
+"""
+recording and replay of encounter logs
+    - Each channel (ownship state, measurements, truth, ...) is streamed row by row into
+      memory-mapped .npy chunk files so logs can be longer than RAM. A small header.json
+      describes the channels and the number of recorded rows.
+"""
+import os
+import json
+import numpy as np
+from numpy.lib.format import open_memmap
+
+HEADER_FILE = "header.json"
+FORMAT_VERSION = 1
+
+class EncounterRecorder:
+    def __init__(self, path, channels:dict, chunk_size=10000, ts=None, metadata=None) -> None:
+        """
+            path is the directory the log is written to, channels maps each channel name
+            to the number of values recorded per row, e.g. {"ownship": 4, "measurement": 2, "truth": 4}
+        """
+        if "t" in channels:
+            raise ValueError("'t' is reserved for the timestamps")
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.channels = {"t": 1}
+        self.channels.update({name: int(width) for name, width in channels.items()})
+        self.chunk_size = chunk_size
+        self.ts = ts
+        self.metadata = {} if metadata is None else metadata
+        self.num_records = 0
+        self._num_chunks = 0
+        self._chunk = None
+        self._row = chunk_size
+
+    def _open_chunk(self):
+        if self._chunk is not None:
+            for buffer in self._chunk.values():
+                buffer.flush()
+        self._chunk = {}
+        for name, width in self.channels.items():
+            self._chunk[name] = open_memmap(os.path.join(self.path, chunk_file(name, self._num_chunks)),
+                                            mode="w+", dtype=np.float64, shape=(self.chunk_size, width))
+        self._num_chunks += 1
+        self._row = 0
+
+    def record(self, t, **values):
+        """
+            Records one row. Every channel must be given, as anything that can be reshaped to
+            its width (e.g. state.toArray() or a bearing array). Missing data should be nan.
+        """
+        if self._row == self.chunk_size:
+            self._open_chunk()
+        self._chunk["t"][self._row, 0] = t
+        for name, width in self.channels.items():
+            if name == "t":
+                continue
+            self._chunk[name][self._row] = np.reshape(values[name], (width))
+        self._row += 1
+        self.num_records += 1
+        if self._row == self.chunk_size:
+            self._write_header()
+
+    def _write_header(self):
+        header = {"version": FORMAT_VERSION,
+                  "channels": self.channels,
+                  "chunk_size": self.chunk_size,
+                  "num_chunks": self._num_chunks,
+                  "num_records": self.num_records,
+                  "ts": self.ts,
+                  "metadata": self.metadata}
+        with open(os.path.join(self.path, HEADER_FILE), "w") as f:
+            json.dump(header, f, indent=2)
+
+    def close(self):
+        if self._chunk is not None:
+            for buffer in self._chunk.values():
+                buffer.flush()
+            self._chunk = None
+        self._write_header()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+class EncounterLog:
+    """
+        Read-only view of a recorded log. Chunks are memory-mapped, so nothing is read
+        from disk until it is accessed and every returned array is a view, not a copy.
+    """
+    def __init__(self, path) -> None:
+        with open(os.path.join(path, HEADER_FILE)) as f:
+            header = json.load(f)
+        if header["version"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported encounter log version {header['version']}")
+        self.path = path
+        self.channels = header["channels"]
+        self.chunk_size = header["chunk_size"]
+        self.num_chunks = header["num_chunks"]
+        self.num_records = header["num_records"]
+        self.ts = header["ts"]
+        self.metadata = header["metadata"]
+        self._chunks = [None]*self.num_chunks
+
+    def __len__(self):
+        return self.num_records
+
+    def chunk(self, k) -> dict:
+        """
+            Dictionary of (rows, width) memory-mapped arrays for chunk k, trimmed to the recorded rows
+        """
+        if self._chunks[k] is None:
+            rows = min(self.chunk_size, self.num_records - k*self.chunk_size)
+            self._chunks[k] = {name: np.load(os.path.join(self.path, chunk_file(name, k)), mmap_mode="r")[0:rows]
+                               for name in self.channels}
+        return self._chunks[k]
+
+    def chunks(self):
+        for k in range(self.num_chunks):
+            yield self.chunk(k)
+
+    def channel(self, name, start=0, stop=None) -> np.ndarray:
+        """
+            Rows start:stop of a channel. This is a view when the rows lie in one chunk and
+            a copy when they span several.
+        """
+        stop = self.num_records if stop is None else min(stop, self.num_records)
+        first = start // self.chunk_size
+        last = max(stop - 1, start) // self.chunk_size
+        if first == last:
+            offset = first*self.chunk_size
+            return self.chunk(first)[name][start-offset:stop-offset]
+        return np.concatenate([self.channel(name, max(start, k*self.chunk_size), min(stop, (k+1)*self.chunk_size))
+                               for k in range(first, last+1)], axis=0)
+
+def replay(log:EncounterLog, step, start=0, stop=None):
+    """
+        Faster-than-real-time replay driver. step is called once per recorded row as
+        step(t, **rows) where each row is a 1D view of its channel, e.g.
+            step(t, ownship=..., measurement=..., truth=...)
+        so any estimator can be driven from a small adapter function.
+    """
+    stop = log.num_records if stop is None else min(stop, log.num_records)
+    if stop <= start:
+        return
+    names = [name for name in log.channels if name != "t"]
+    for k in range(start // log.chunk_size, (stop - 1) // log.chunk_size + 1):
+        chunk = log.chunk(k)
+        offset = k*log.chunk_size
+        for i in range(max(start - offset, 0), min(stop - offset, log.chunk_size)):
+            step(chunk["t"][i, 0], **{name: chunk[name][i] for name in names})
+
+def chunk_file(name, k):
+    return f"{name}_{k:05d}.npy"
@@ -0,0 +1,131 @@
+"""
+fisher information
+    - Scores candidate ownship trajectories by the bearing-only Fisher information they would
+      collect about the intruders, so a controller can pick the maneuver that makes the
+      intruder states the most observable. Candidates, intruders, particles and timesteps are
+      all array axes, the scores of every candidate come out of one pass.
+"""
+import numpy as np
+
+def constant_turn_trajectories(position, yaw, speed, yaw_rates, times):
+    """
+        (C,T,2) positions of a 2D vehicle holding each of the (C,) yaw rates from position at
+        the (T,) times (yaw is measured from the second axis, as in ConstantVelocity)
+    """
+    omega = np.asarray(yaw_rates, dtype=float)[:,np.newaxis]
+    times = np.asarray(times, dtype=float)
+    angles = omega*times
+    # v/omega*(cos(yaw) - cos(yaw+omega*t)) -> v*t*sin(yaw) as omega goes to 0
+    straight = np.abs(omega) < 1e-9
+    safe_omega = np.where(straight, 1., omega)
+    dx = np.where(straight, speed*times*np.sin(yaw), speed/safe_omega*(np.cos(yaw) - np.cos(yaw + angles)))
+    dy = np.where(straight, speed*times*np.cos(yaw), speed/safe_omega*(np.sin(yaw + angles) - np.sin(yaw)))
+    return np.reshape(position, (1,1,2)) + np.stack([dx, dy], axis=-1)
+
+def bearing_information(own_positions, times, target_positions, target_velocities=None, sigma=0.01, prior=1e-6):
+    """
+        Fisher information of the bearing measurements taken from the (C,T,d) candidate
+        trajectories at the (T,) times about constant velocity targets. target_positions are
+        the (...,d) positions at time 0 (e.g. (M,d) estimates or (M,N,d) particles) and
+        target_velocities their velocities (None for static targets). sigma is the bearing
+        noise (rad) and prior is added to the diagonal (or is a full prior information matrix).
+        Returns (C,...,2d,2d) information about [position, velocity] ((C,...,d,d) when static).
+
+        A bearing along the unit vector lam at range r only carries information across the
+        line of sight, (I - lam lam^T)/(sigma*r)^2 per measurement.
+    """
+    own = np.asarray(own_positions, dtype=float)
+    times = np.asarray(times, dtype=float)
+    targets = np.asarray(target_positions, dtype=float)
+    if target_velocities is not None:
+        velocities = np.asarray(target_velocities, dtype=float)
+    d = own.shape[-1]
+    # (C,...,T) line of sight components, kept as separate contiguous arrays because
+    # reductions and strided access over a length d axis are slow
+    expand = (slice(None),) + (np.newaxis,)*(targets.ndim-1)
+    los = []
+    for i in range(d):
+        future = targets[...,i,np.newaxis]
+        if target_velocities is not None:
+            future = future + velocities[...,i,np.newaxis]*times
+        los.append(future - own[expand + (slice(None), i)])
+    range2 = sum(component*component for component in los)
+    # w*(I - lam lam^T) with w = 1/(sigma*r)^2 and lam = los/r is (r^2 I - los los^T)/(sigma^2 r^4)
+    q = range2*range2
+    q *= sigma**2
+    np.reciprocal(q, out=q)
+    # the sums over the timesteps of the entries times 1, t and t^2 are one matrix product
+    powers = np.stack([np.ones_like(times), times, times**2], axis=1)
+    if target_velocities is None:
+        powers = powers[:,0:1]
+    moments = np.empty(range2.shape[:-1] + (powers.shape[1], d, d))
+    for i in range(d):
+        for j in range(i, d):
+            entry = range2 - los[i]*los[j] if i == j else -los[i]*los[j]
+            entry *= q
+            moments[...,i,j] = moments[...,j,i] = entry @ powers
+
+    if target_velocities is None:
+        info = moments[...,0,:,:]
+    else:
+        # the bearing at time t depends on p + v*t, so the jacobian is P/r [I, t*I]
+        info = np.empty(range2.shape[:-1] + (2*d, 2*d))
+        info[...,:d,:d] = moments[...,0,:,:]
+        info[...,:d,d:] = moments[...,1,:,:]
+        info[...,d:,:d] = moments[...,1,:,:]
+        info[...,d:,d:] = moments[...,2,:,:]
+    if np.ndim(prior) == 0:
+        info += prior*np.eye(info.shape[-1])
+    else:
+        info += prior
+    return info
+
+def information_scores(info, criterion="logdet"):
+    """
+        scalar score of each information matrix, "logdet" (D-optimal) or "min_eig" (E-optimal,
+        the information about the least observable direction)
+    """
+    if criterion == "logdet":
+        return np.linalg.slogdet(info)[1]
+    if criterion == "min_eig":
+        return np.linalg.eigvalsh(info)[...,0]
+    raise ValueError(f"unknown criterion {criterion}")
+
+def representative_particles(weights, num_samples):
+    """
+        (M,num_samples) indices of particles drawn by systematic resampling of each row of the
+        (M,N) weights with evenly spaced offsets, so the subset is repeatable and equally weighted
+    """
+    cdf = np.cumsum(weights, axis=1)
+    cdf /= cdf[:, -1:]
+    u = (np.arange(num_samples) + 0.5)/num_samples
+    return np.stack([np.minimum(np.searchsorted(row, u), len(row)-1) for row in cdf])
+
+def score_trajectories(own_positions, times, target_positions, target_velocities=None, weights=None,
+                       sigma=0.01, prior=1e-6, criterion="logdet", num_samples=None):
+    """
+        (C,) scores of the candidate trajectories against M intruders. target_positions and
+        target_velocities are (M,d) estimates or (M,N,d) particle families with (M,N) weights.
+        The particle scores are averaged with the weights. num_samples limits the particles of
+        each family to that many representative ones, the cost grows with C*M*N*T.
+        The intruders are independent, so the joint information is block diagonal: its log det
+        is the sum over the intruders and its smallest eigenvalue the smallest of theirs.
+    """
+    targets = np.asarray(target_positions, dtype=float)
+    if targets.ndim == 3:
+        if weights is None:
+            weights = np.ones(targets.shape[:2])
+        weights = np.asarray(weights, dtype=float)
+        if num_samples is not None and num_samples < targets.shape[1]:
+            rows = np.arange(targets.shape[0])[:, np.newaxis]
+            index = representative_particles(weights, num_samples)
+            targets = targets[rows, index]
+            if target_velocities is not None:
+                target_velocities = np.asarray(target_velocities, dtype=float)[rows, index]
+            weights = np.ones(index.shape)
+        weights = weights/np.sum(weights, axis=1, keepdims=True)
+    info = bearing_information(own_positions, times, targets, target_velocities, sigma, prior)
+    scores = information_scores(info, criterion)
+    if targets.ndim == 3:
+        scores = np.einsum('cmn,mn->cm', scores, weights)
+    return np.sum(scores, axis=1) if criterion == "logdet" else np.min(scores, axis=1)
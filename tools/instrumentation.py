@@ -0,0 +1,185 @@
+"""
+instrumentation
+    - Per stage timers, counters and recorded values (e.g. effective sample size) for finding
+      out which stage of a tick overran. Everything is off by default and a disabled timer or
+      counter is only a flag check, so the hooks can stay in the estimators.
+"""
+import time
+import json
+import functools
+import numpy as np
+from tools.ring_buffer import RingBuffer
+
+class Series:
+    def __init__(self, window) -> None:
+        """
+            Running count, total and max of a value plus its last window samples for the percentiles
+        """
+        self.count = 0
+        self.total = 0.
+        self.max = -np.inf
+        self.samples = RingBuffer(window)
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.samples.append(value)
+
+    def resize(self, window):
+        """
+            keeps the newest window samples in a buffer of the new size
+        """
+        recent = self.samples.view()[-window:]
+        self.samples = RingBuffer(window)
+        for value in recent:
+            self.samples.append(value)
+
+    def summary(self, percentiles=(50, 95, 99)) -> dict:
+        recent = self.samples.view()[:,0]
+        summary = {"count": self.count, "total": self.total, "mean": self.total/self.count, "max": self.max}
+        for p, value in zip(percentiles, np.percentile(recent, percentiles)):
+            summary[f"p{p}"] = float(value)
+        return summary
+
+class Instrumentation:
+    def __init__(self, window=1000) -> None:
+        """
+            window is the number of recent samples the rolling percentiles are computed over
+        """
+        self.enabled = False
+        self.window = window
+        self.timers = {}
+        self.values = {}
+        self.counters = {}
+
+    def set_window(self, window):
+        """
+            changes the percentile window of the existing series too, not just of the new ones
+        """
+        self.window = window
+        for series in list(self.timers.values()) + list(self.values.values()):
+            series.resize(window)
+
+    def reset(self):
+        self.timers = {}
+        self.values = {}
+        self.counters = {}
+
+    def add_time(self, name, seconds):
+        if name not in self.timers:
+            self.timers[name] = Series(self.window)
+        self.timers[name].add(seconds)
+
+    def record(self, name, value):
+        """
+            records a sampled value, e.g. the effective sample size or solver iterations
+        """
+        if not self.enabled:
+            return
+        if name not in self.values:
+            self.values[name] = Series(self.window)
+        self.values[name].add(float(value))
+
+    def count(self, name, increment=1):
+        if not self.enabled:
+            return
+        self.counters[name] = self.counters.get(name, 0) + increment
+
+    def timer(self, name):
+        """
+            with instruments.timer("stage"): ... times the block when enabled
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def summary(self) -> dict:
+        """
+            per run summary, times are in seconds
+        """
+        return {"timers": {name: series.summary() for name, series in self.timers.items()},
+                "values": {name: series.summary() for name, series in self.values.items()},
+                "counters": dict(self.counters)}
+
+    def format_summary(self) -> str:
+        lines = [f"{'stage':50s} {'calls':>8s} {'mean ms':>9s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} {'max ms':>9s}"]
+        for name, series in sorted(self.timers.items(), key=lambda item: -item[1].total):
+            s = series.summary()
+            lines.append(f"{name:50s} {s['count']:8d} {1e3*s['mean']:9.3f} {1e3*s['p50']:9.3f} {1e3*s['p95']:9.3f} {1e3*s['p99']:9.3f} {1e3*s['max']:9.3f}")
+        for name, series in sorted(self.values.items()):
+            s = series.summary()
+            lines.append(f"{name:50s} {s['count']:8d} {s['mean']:9.3g} {s['p50']:9.3g} {s['p95']:9.3g} {s['p99']:9.3g} {s['max']:9.3g}")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"{name:50s} {value:8d}")
+        return "\n".join(lines)
+
+    def save_summary(self, path):
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+
+class _Timer:
+    __slots__ = ('instruments', 'name', 'start')
+
+    def __init__(self, instruments, name) -> None:
+        self.instruments = instruments
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.instruments.add_time(self.name, time.perf_counter() - self.start)
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+_NULL_TIMER = _NullTimer()
+
+# the instance the estimators, planner and simulations report to
+instruments = Instrumentation()
+
+def enable(window=None):
+    if window is not None:
+        instruments.set_window(window)
+    instruments.enabled = True
+
+def disable():
+    instruments.enabled = False
+
+def is_enabled():
+    return instruments.enabled
+
+def timed(name=None):
+    """
+        Decorator that times every call of a function (named after its qualified name by default)
+    """
+    def decorator(func):
+        stage = func.__qualname__ if name is None else name
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not instruments.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                instruments.add_time(stage, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+def timer(name):
+    return instruments.timer(name)
+
+def count(name, increment=1):
+    instruments.count(name, increment)
+
+def record(name, value):
+    instruments.record(name, value)
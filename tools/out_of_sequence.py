@@ -0,0 +1,77 @@
+"""
+out of sequence measurements
+    - Lets a filter with the predict/correct API take measurements that arrive late and out of
+      order. The posterior after every correction is kept in a bounded history along with the
+      measurement it used. A late measurement rolls the filter back to the newest posterior
+      from before it was taken, is fused there, and the corrections after it are reprocessed in
+      time order. Only the part of the history after the late measurement is redone, and the
+      steps between the stored corrections hit the filter's discretization cache.
+"""
+from collections import deque
+import numpy as np
+from tools.ring_buffer import RingBuffer
+from tools.instrumentation import count
+
+# the attributes that make up the state of the estimators, besides their time t
+EKF_STATE = ("xhat", "P")
+PLKF_STATE = ("xhat", "P", "xi_prev")
+
+class OutOfSequenceFilter:
+    def __init__(self, estimator, window=50, state=EKF_STATE) -> None:
+        """
+            estimator is a filter with predict/correct (e.g. TargetEKF or PseudoLinearKF) and a
+            time t, state the names of its array attributes that hold its posterior and window
+            the number of corrections kept. Measurements older than the oldest kept one are dropped.
+        """
+        self.estimator = estimator
+        self.state = state
+        self.shapes = [np.shape(getattr(estimator, name)) for name in state]
+        self.sizes = [int(np.prod(shape)) for shape in self.shapes]
+        # each row is [t, the flattened state attributes], the measurements are kept in step
+        self.history = RingBuffer(window, 1 + sum(self.sizes))
+        self.measurements = deque(maxlen=window)
+        # the prior, so measurements that arrive late before the first correction aren't lost
+        self._save(None)
+
+    def _save(self, measurement):
+        row = np.empty(self.history.width)
+        row[0] = self.estimator.t
+        offset = 1
+        for name, size in zip(self.state, self.sizes):
+            row[offset:offset+size] = np.ravel(getattr(self.estimator, name))
+            offset += size
+        self.history.append(row)
+        self.measurements.append(measurement)
+
+    def _restore(self, row):
+        self.estimator.t = row.item(0)
+        offset = 1
+        for name, shape, size in zip(self.state, self.shapes, self.sizes):
+            setattr(self.estimator, name, np.reshape(row[offset:offset+size], shape).copy())
+            offset += size
+
+    def correct(self, t, *args, **kwargs):
+        """
+            corrects the estimator with a measurement taken at time t, args and kwargs are the
+            rest of what estimator.correct takes. They are kept by reference for reprocessing,
+            so pass copies of anything the caller changes afterwards (e.g. a live ownship state).
+            Returns False if the measurement is older than the history and was dropped.
+        """
+        if t >= self.history.last().item(0):
+            self.estimator.correct(*args, t=t, **kwargs)
+            self._save((t, args, kwargs))
+            return True
+        times = self.history.view()[:,0]
+        # the corrections after the late measurement are undone and redone after it
+        k = int(np.searchsorted(times, t, side='right'))
+        if k == 0:
+            count("OutOfSequenceFilter.dropped")
+            return False
+        count("OutOfSequenceFilter.reprocessed")
+        redo = [self.measurements.pop() for i in range(len(times) - k)][::-1]
+        self.history.pop(len(redo))
+        self._restore(self.history.last())
+        for t_k, args_k, kwargs_k in [(t, args, kwargs)] + redo:
+            self.estimator.correct(*args_k, t=t_k, **kwargs_k)
+            self._save((t_k, args_k, kwargs_k))
+        return True
@@ -0,0 +1,85 @@
+"""
+ring buffer
+    - bounded, preallocated history of fixed-width rows, plus decimation for plotting it
+"""
+import numpy as np
+
+class RingBuffer:
+    def __init__(self, window, width=1) -> None:
+        """
+            Keeps the last window rows of width floats. Every row is stored twice, window
+            rows apart, so the history is always one contiguous slice and view() never copies.
+        """
+        self.window = window
+        self.width = width
+        self._data = np.full((2*window, width), np.nan)
+        self._next = 0
+        self._count = 0
+
+    def append(self, row):
+        self._data[self._next] = row
+        self._data[self._next + self.window] = row
+        self._next = (self._next + 1) % self.window
+        self._count = min(self._count + 1, self.window)
+
+    def __len__(self):
+        return self._count
+
+    def view(self) -> np.ndarray:
+        """
+            (len, width) view of the history, oldest row first
+        """
+        # the oldest row, pop() can leave a wrapped history shorter than the window
+        start = (self._next - self._count) % self.window
+        return self._data[start:start + self._count]
+
+    def last(self):
+        """
+            view of the newest row
+        """
+        return self._data[(self._next - 1) % self.window]
+
+    def pop(self, n=1):
+        """
+            removes the newest n rows
+        """
+        n = min(n, self._count)
+        self._next = (self._next - n) % self.window
+        self._count -= n
+
+    def clear(self):
+        self._next = 0
+        self._count = 0
+
+def minmax_decimate(x:np.ndarray, y:np.ndarray, max_points=2000):
+    """
+        Reduces a line to at most max_points points by splitting it into at most max_points/2
+        equal buckets (the last one shorter) and keeping the minimum and maximum of each bucket
+        in their original order. Spikes survive, so the plot looks the same as the full line
+        at screen resolution.
+    """
+    n = x.shape[0]
+    if n <= max_points:
+        return x, y
+    bucket_size = -(-n // (max_points // 2))
+    num_buckets = -(-n // bucket_size)
+    # the last bucket is padded with nans, which are never picked, so every point is covered
+    buckets = np.full(num_buckets*bucket_size, np.nan)
+    buckets[:n] = y
+    buckets = buckets.reshape(num_buckets, bucket_size)
+    base = np.arange(num_buckets)*bucket_size
+    imin = np.minimum(base + np.argmin(np.where(np.isnan(buckets), np.inf, buckets), axis=1), n-1)
+    imax = np.minimum(base + np.argmax(np.where(np.isnan(buckets), -np.inf, buckets), axis=1), n-1)
+    idx = np.stack([np.minimum(imin, imax), np.maximum(imin, imax)], axis=1).reshape(-1)
+    return x[idx], y[idx]
+
+def stride_decimate(data:np.ndarray, max_points=2000):
+    """
+        Every k-th row of data (a view) so at most max_points rows are left. The newest row is
+        always kept. Use this instead of minmax_decimate for paths, where x isn't monotonic.
+    """
+    n = data.shape[0]
+    if n <= max_points:
+        return data
+    step = -(-n // max_points)
+    return data[(n - 1) % step::step]
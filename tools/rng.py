@@ -0,0 +1,31 @@
+"""
+random number streams
+    - Every stochastic component takes a numpy Generator instead of drawing from the global
+      np.random state. These helpers turn seeds into generators and split one seed into
+      independent streams, e.g. one per filter or per parallel worker.
+"""
+import numpy as np
+
+def as_generator(rng=None) -> np.random.Generator:
+    """
+        rng can be a Generator (returned as is), a seed or SeedSequence, or None for a
+        generator seeded from the OS (not repeatable)
+    """
+    if isinstance(rng, np.random.Generator):
+        return rng
+    return np.random.default_rng(rng)
+
+def spawn_seeds(seed, n):
+    """
+        n independent SeedSequences derived from seed (an int, a SeedSequence or None)
+    """
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return seed.spawn(n)
+
+def spawn_generators(seed, n):
+    """
+        n independent Generators derived from seed. Streams spawned from the same seed are
+        repeatable and never overlap, so they can be handed to parallel workers.
+    """
+    return [np.random.default_rng(s) for s in spawn_seeds(seed, n)]
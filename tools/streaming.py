@@ -0,0 +1,212 @@
+"""
+streaming
+    - asyncio pipeline that runs per track estimators and a planner against a live measurement
+      feed at its own, irregular rate: source -> one worker per track -> planner.
+    - Stages are connected by bounded Channels. BLOCK applies backpressure to the producer,
+      DROP_OLDEST never waits and throws the stalest item away, so a slow stage only ever
+      works on fresh data and doesn't hold up the stages in front of it. The planner only
+      needs the newest snapshot of every track, so it reads LatestSnapshots, one slot per
+      track, instead of a Channel where a burst of one track could push another one out.
+    - The estimator updates and the planning run in worker threads so the event loop keeps
+      taking measurements in while they run. Workers hand the planner snapshots (copies), so
+      nothing is shared between the threads.
+"""
+import asyncio
+import socket
+from msg.los_msg import LosMsg, LOS_MSG_SIZE
+from tools.instrumentation import count
+
+BLOCK = "block"
+DROP_OLDEST = "drop_oldest"
+
+# marks the end of a stream, it is never dropped
+END = object()
+
+class Channel:
+    def __init__(self, maxsize, policy=BLOCK, name="channel") -> None:
+        """
+            bounded queue between two stages, policy is what a put does when it is full
+        """
+        if policy not in (BLOCK, DROP_OLDEST):
+            raise ValueError(f"unknown policy {policy}")
+        self._queue = asyncio.Queue(maxsize)
+        self.policy = policy
+        self.name = name
+        self.dropped = 0
+
+    def _drop(self):
+        self.dropped += 1
+        count(f"{self.name}.dropped")
+
+    async def put(self, item):
+        if self.policy == BLOCK:
+            await self._queue.put(item)
+        else:
+            self.put_nowait(item)
+
+    def put_nowait(self, item):
+        """
+            put for callbacks that can't wait (e.g. a datagram protocol). A full BLOCK channel
+            drops the new item, a full DROP_OLDEST channel the oldest one.
+        """
+        if self._queue.full():
+            if self.policy == BLOCK and item is not END:
+                self._drop()
+                return
+            if self._queue.get_nowait() is not END:
+                self._drop()
+        self._queue.put_nowait(item)
+
+    async def get(self):
+        return await self._queue.get()
+
+    def get_nowait(self):
+        return self._queue.get_nowait()
+
+    def empty(self):
+        return self._queue.empty()
+
+    def qsize(self):
+        return self._queue.qsize()
+
+async def queue_source(channel:Channel):
+    """
+        in-process stand-in for a camera, yields the LosMsgs put on channel until END
+    """
+    while True:
+        msg = await channel.get()
+        if msg is END:
+            return
+        yield msg
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+    def __init__(self, channel:Channel) -> None:
+        self.channel = channel
+
+    def datagram_received(self, data, addr):
+        # an empty datagram ends the stream
+        if len(data) == 0:
+            self.channel.put_nowait(END)
+        elif len(data) == LOS_MSG_SIZE:
+            self.channel.put_nowait(LosMsg.fromBytes(data))
+        else:
+            count("datagram_source.malformed")
+
+async def open_datagram_source(address, family=socket.AF_INET, maxsize=256):
+    """
+        binds a UDP (host, port) address or, with family=socket.AF_UNIX, a unix datagram socket
+        path and returns an async iterator of the LosMsgs (LosMsg.toBytes) sent to it, until an
+        empty datagram arrives. The socket is drained into a DROP_OLDEST channel so a burst
+        never stalls the sender.
+    """
+    channel = Channel(maxsize, DROP_OLDEST, "datagram_source")
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(lambda: _DatagramProtocol(channel), local_addr=address, family=family)
+    async def source():
+        try:
+            async for msg in queue_source(channel):
+                yield msg
+        finally:
+            transport.close()
+    return source()
+
+class LatestSnapshots:
+    def __init__(self) -> None:
+        """
+            newest snapshot of every track, a new snapshot only replaces the pending one of its own track
+        """
+        self.latest = {}
+        self.pending = set()
+        self.closed = False
+        self.dropped = 0
+        self._event = asyncio.Event()
+
+    def put(self, track, snapshot):
+        if track in self.pending:
+            self.dropped += 1
+            count("snapshots.dropped")
+        self.latest[track] = snapshot
+        self.pending.add(track)
+        self._event.set()
+
+    def close(self):
+        """
+            marks the end of the snapshots, wait() returns right away from now on
+        """
+        self.closed = True
+        self._event.set()
+
+    async def wait(self):
+        """
+            waits for a new snapshot (or close) and returns the tracks that got one since the last wait
+        """
+        if not self.closed:
+            await self._event.wait()
+        self._event.clear()
+        fresh, self.pending = self.pending, set()
+        return fresh
+
+class TrackWorker:
+    def __init__(self, track, tracker, snapshots:LatestSnapshots, maxsize=16, policy=DROP_OLDEST) -> None:
+        """
+            runs tracker.update(msg) for every measurement of one track in a worker thread and
+            puts the snapshots it returns (None while it has nothing to report) in snapshots
+        """
+        self.track = track
+        self.tracker = tracker
+        self.snapshots = snapshots
+        self.measurements = Channel(maxsize, policy, f"track{track}")
+
+    async def run(self):
+        while True:
+            msg = await self.measurements.get()
+            if msg is END:
+                return
+            snapshot = await asyncio.to_thread(self.tracker.update, msg)
+            if snapshot is not None:
+                self.snapshots.put(self.track, snapshot)
+
+class Pipeline:
+    def __init__(self, make_tracker, plan=None, on_plan=None, track_maxsize=16, track_policy=DROP_OLDEST) -> None:
+        """
+            make_tracker(track) creates the estimator adapter of a new track, plan(snapshots)
+            is called with a dict of the newest snapshot of every track and its result is passed
+            to on_plan. Snapshots that arrive while a plan runs are coalesced into the next one.
+        """
+        self.make_tracker = make_tracker
+        self.plan = plan
+        self.on_plan = on_plan
+        self.track_maxsize = track_maxsize
+        self.track_policy = track_policy
+        self.workers = {}
+        self.snapshots = LatestSnapshots()
+        self.num_plans = 0
+
+    async def _plan(self):
+        while True:
+            fresh = await self.snapshots.wait()
+            if self.plan is not None and len(fresh) > 0:
+                result = await asyncio.to_thread(self.plan, dict(self.snapshots.latest))
+                self.num_plans += 1
+                if self.on_plan is not None:
+                    self.on_plan(result)
+            elif self.snapshots.closed:
+                return
+
+    async def run(self, source):
+        """
+            runs until the source is exhausted and every stage has finished its last item
+        """
+        planner = asyncio.create_task(self._plan())
+        tasks = []
+        async for msg in source:
+            if msg.track not in self.workers:
+                worker = TrackWorker(msg.track, self.make_tracker(msg.track), self.snapshots, self.track_maxsize, self.track_policy)
+                self.workers[msg.track] = worker
+                tasks.append(asyncio.create_task(worker.run()))
+            await self.workers[msg.track].measurements.put(msg)
+        for worker in self.workers.values():
+            await worker.measurements.put(END)
+        await asyncio.gather(*tasks)
+        self.snapshots.close()
+        await planner
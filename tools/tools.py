@@ -215,3 +215,148 @@ def sat(x, up, low):
     return y
 
 
+
+
+# batched versions of the functions above, they work on a stack of N rotations at once
+# (vectors are (N,3), rotations (N,3,3) and quaternions (N,4)) with the same formulas
+
+def euler_to_rotation_batch(phi=0., theta=0., psi=0.):
+    """
+    Converts arrays of euler angles to an (N,3,3) stack of rotation matrices (R_b^i)
+    """
+    phi, theta, psi = np.broadcast_arrays(np.atleast_1d(phi), np.atleast_1d(theta), np.atleast_1d(psi))
+    c_phi, s_phi = cos(phi), sin(phi)
+    c_theta, s_theta = cos(theta), sin(theta)
+    c_psi, s_psi = cos(psi), sin(psi)
+    R = np.empty(phi.shape + (3, 3))
+    # R_yaw @ R_pitch @ R_roll multiplied out
+    R[..., 0, 0] = c_psi*c_theta
+    R[..., 0, 1] = c_psi*s_theta*s_phi - s_psi*c_phi
+    R[..., 0, 2] = c_psi*s_theta*c_phi + s_psi*s_phi
+    R[..., 1, 0] = s_psi*c_theta
+    R[..., 1, 1] = s_psi*s_theta*s_phi + c_psi*c_phi
+    R[..., 1, 2] = s_psi*s_theta*c_phi - c_psi*s_phi
+    R[..., 2, 0] = -s_theta
+    R[..., 2, 1] = c_theta*s_phi
+    R[..., 2, 2] = c_theta*c_phi
+    return R
+
+
+def quaternion_to_rotation_batch(quaternions):
+    """
+    converts an (N,4) array of quaternion attitudes to an (N,3,3) stack of rotation matrices
+    """
+    q = np.reshape(quaternions, (-1, 4))
+    e0, e1, e2, e3 = q[:, 0], q[:, 1], q[:, 2], q[:, 3]
+    R = np.empty((q.shape[0], 3, 3))
+    R[:, 0, 0] = e1**2 + e0**2 - e2**2 - e3**2
+    R[:, 0, 1] = 2.0*(e1*e2 - e3*e0)
+    R[:, 0, 2] = 2.0*(e1*e3 + e2*e0)
+    R[:, 1, 0] = 2.0*(e1*e2 + e3*e0)
+    R[:, 1, 1] = e2**2 + e0**2 - e1**2 - e3**2
+    R[:, 1, 2] = 2.0*(e2*e3 - e1*e0)
+    R[:, 2, 0] = 2.0*(e1*e3 - e2*e0)
+    R[:, 2, 1] = 2.0*(e2*e3 + e1*e0)
+    R[:, 2, 2] = e3**2 + e0**2 - e1**2 - e2**2
+    return R/det(R)[:, np.newaxis, np.newaxis]
+
+
+def rotation_to_quaternion_batch(R):
+    """
+    converts an (N,3,3) stack of rotation matrices to an (N,4) array of unit quaternions,
+    each rotation takes the same branch as in rotation_to_quaternion
+    """
+    R = np.reshape(R, (-1, 3, 3))
+    m00, m01, m02 = R[:, 0, 0], R[:, 0, 1], R[:, 0, 2]
+    m10, m11, m12 = R[:, 1, 0], R[:, 1, 1], R[:, 1, 2]
+    m20, m21, m22 = R[:, 2, 0], R[:, 2, 1], R[:, 2, 2]
+    tr = m00 + m11 + m22
+
+    # masks of the four branches, in the same order as the if/elif chain
+    b0 = tr > 0
+    b1 = ~b0 & (m00 > m11) & (m00 > m22)
+    b2 = ~b0 & ~b1 & (m11 > m22)
+    b3 = ~(b0 | b1 | b2)
+    # the diagonal term under the square root of each branch, clipped so no branch takes the root of a negative
+    S = 2*sqrt(np.maximum(np.select([b0, b1, b2], [tr + 1.0, 1.0 + m00 - m11 - m22, 1.0 + m11 - m00 - m22],
+                                    1.0 + m22 - m00 - m11), 0.))
+    S = np.where(S == 0, 1., S)
+
+    q = np.empty((R.shape[0], 4))
+    q[:, 0] = np.select([b0, b1, b2, b3], [0.25*S, (m21 - m12)/S, (m02 - m20)/S, (m10 - m01)/S])
+    q[:, 1] = np.select([b0, b1, b2, b3], [(m21 - m12)/S, 0.25*S, (m01 + m10)/S, (m02 + m20)/S])
+    q[:, 2] = np.select([b0, b1, b2, b3], [(m02 - m20)/S, (m01 + m10)/S, 0.25*S, (m12 + m21)/S])
+    q[:, 3] = np.select([b0, b1, b2, b3], [(m10 - m01)/S, (m02 + m20)/S, (m12 + m21)/S, 0.25*S])
+    return q
+
+
+def hat_batch(omega):
+    """
+    (N,3) vectors to the (N,3,3) skew symmetric matrices associated with the cross product
+    """
+    omega = np.reshape(omega, (-1, 3))
+    omega_hat = np.zeros((omega.shape[0], 3, 3))
+    omega_hat[:, 0, 1] = -omega[:, 2]
+    omega_hat[:, 0, 2] = omega[:, 1]
+    omega_hat[:, 1, 0] = omega[:, 2]
+    omega_hat[:, 1, 2] = -omega[:, 0]
+    omega_hat[:, 2, 0] = -omega[:, 1]
+    omega_hat[:, 2, 1] = omega[:, 0]
+    return omega_hat
+
+
+def vee_batch(M):
+    """
+    Maps an (N,3,3) stack of skew-symmetric matrices to (N,3) vectors, the rows of the
+    matrices that are not skew-symmetric are nan
+    """
+    M = np.reshape(M, (-1, 3, 3))
+    m = np.stack([M[:, 2, 1], -M[:, 2, 0], M[:, 1, 0]], axis=1)
+    skew = norm(M + np.swapaxes(M, 1, 2), axis=(1, 2)) == 0
+    if not np.all(skew):
+        print("M is not skew-symmetric")
+        m[~skew] = float("nan")
+    return m
+
+
+def logR_batch(R):
+    """
+    Log of an (N,3,3) stack of rotation matrices
+    """
+    R = np.reshape(R, (-1, 3, 3))
+    theta = arccos(np.clip((np.trace(R, axis1=1, axis2=2) - 1) / 2, -1, +1))
+    return 0.5 * (R - np.swapaxes(R, 1, 2)) / sinc(theta)[:, np.newaxis, np.newaxis]
+
+
+def leftJacobian_batch(r):
+    """
+    the left Jacobians of the (N,3) rotation vectors r, the Jacobian of a zero rotation
+    vector is the identity
+    """
+    r = np.reshape(r, (-1, 3))
+    phi = norm(r, axis=1)
+    u = r / np.where(phi == 0, 1., phi)[:, np.newaxis]
+    u_hat = hat_batch(u)
+    return eye(3) \
+        + (sin(phi/2) * sinc(phi/2))[:, np.newaxis, np.newaxis] * u_hat \
+        + (1 - sinc(phi))[:, np.newaxis, np.newaxis] * np.einsum('nij,njk->nik', u_hat, u_hat)
+
+
+def leftJacobianInv_batch(r):
+    """
+    the inverses of the left Jacobians of the (N,3) rotation vectors r
+    """
+    r = np.reshape(r, (-1, 3))
+    phi = norm(r, axis=1)
+    u = r / np.where(phi == 0, 1., phi)[:, np.newaxis]
+    u_hat = hat_batch(u)
+    return eye(3) \
+           - (phi/2)[:, np.newaxis, np.newaxis] * u_hat \
+           + (1 - cos(phi/2) / sinc(phi/2))[:, np.newaxis, np.newaxis] * np.einsum('nij,njk->nik', u_hat, u_hat)
+
+
+def rotate_batch(R, v):
+    """
+    applies an (N,3,3) stack of rotations to (N,3) vectors (or one rotation to all of them)
+    """
+    return np.einsum('...ij,...j->...i', R, v)
@@ -12,8 +12,15 @@ from viz.twoDViz import twoDViz
 from viz.twoDEstimatorViz import TwoDEstimatorViz
 from viz.inverseDEstimatorViz import InverseDEstimatorViz
 from estimators.test_inverse_depth_model import TestInverseDepthModel
+from tools.encounter_log import EncounterRecorder
+from tools.instrumentation import enable, instruments
 
 USE_INVERSE = False
+LOG_PATH = None # set to a directory to record the encounter for replay_encounter.py
+INSTRUMENT = False # time each stage of the estimator, the summary is printed and saved with the log
+
+if INSTRUMENT:
+    enable()
 
 limits=[[-500,500],[-100,1200]]
 viz = twoDViz(limits)
@@ -63,8 +70,15 @@ target_estimator = None
 #setup the controller
 # controller = TwoDBearingNonzeroer(ts, 1, -max_yaw_d, max_yaw_d)
 
+recorder = None
+if LOG_PATH is not None:
+    recorder = EncounterRecorder(LOG_PATH, {"ownship": 4, "measurement": 2, "truth": 4, "input": 1}, ts=ts)
+
 while t < tend:
     measurements = sensor.update(uav.true_state.getPos(), uav.true_state.yaw, [target.true_state.getPos()])
+    if recorder is not None:
+        recorder.record(t, ownship=uav.true_state.toArray(), measurement=[measurements[0].bearing, measurements[0].yaw],
+                        truth=target.true_state.toArray(), input=commanded_yaw_rate)
     if target_estimator is not None:
         target_estimator.update(measurements[0],uav.true_state,commanded_yaw_rate)
     else:
@@ -85,3 +99,10 @@ while t < tend:
     if steps % plotsteps == 0:
         viz.update(uav.true_state, [target.true_state, testmodel.state])
         estimator_viz.update_plots()
+
+if INSTRUMENT:
+    print(instruments.format_summary())
+if recorder is not None:
+    if INSTRUMENT:
+        recorder.metadata["instrumentation"] = instruments.summary()
+    recorder.close()
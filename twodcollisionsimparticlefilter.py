@@ -9,11 +9,18 @@ from estimators.inverse_depth_particle_filter import InverseDepthParticleFilter
 from sensors.bearingSensor import BearingSensor
 from controllers.twodbearingunzeroer import TwoDBearingNonzeroer
 from viz.twoDVizWithParticles import twoDVizWithParticles
+from viz.render_process import RenderProcess, draw_two_d_viz_with_particles
+from functools import partial
+from tools.instrumentation import enable, instruments
 
 USE_INVERSE = False
+RENDER_OUT_OF_PROCESS = True # draw in a separate process so plotting doesn't slow down the filter
+INSTRUMENT = False # time each stage of the filter and print a summary at the end
 
 limits=[[-1000,500],[-100,1500]]
-viz = twoDVizWithParticles(limits)
+
+if INSTRUMENT:
+    enable()
 
 t = 0.
 ts = 0.01
@@ -54,6 +61,12 @@ if USE_INVERSE:
 else:
     target_estimator = TTCParticleFilter(measurements[0].bearing, measurements[0].yaw, ts)
 
+if RENDER_OUT_OF_PROCESS:
+    viz = RenderProcess(partial(twoDVizWithParticles, limits), draw_two_d_viz_with_particles, (target_estimator.num_particles+3, 5))
+    frame = np.zeros((target_estimator.num_particles+3, 5))
+else:
+    viz = twoDVizWithParticles(limits)
+
 while t < tend:
     measurements = sensor.update(uav.true_state.getPos(), uav.true_state.yaw, [target.true_state.getPos()])
 
@@ -68,4 +81,21 @@ while t < tend:
     t += ts
     steps += 1
     if steps % plotsteps == 0:
-        viz.update(uav.true_state, target.true_state, target_estimator.get_particle_states(uav.true_state), t)
+        positions, headings, speeds, weights = target_estimator.particle_positions(uav.true_state)
+        if RENDER_OUT_OF_PROCESS:
+            frame[0,0:4] = uav.true_state.toArray()[:,0]
+            frame[1,0:4] = target.true_state.toArray()[:,0]
+            frame[2:-1,0:2] = positions
+            frame[2:-1,2] = headings
+            frame[2:-1,3] = speeds
+            frame[2:-1,4] = weights
+            frame[-1,0] = t
+            viz.submit(frame)
+        else:
+            viz.update(uav.true_state, target.true_state, positions, weights, t)
+
+if RENDER_OUT_OF_PROCESS:
+    viz.close()
+
+if INSTRUMENT:
+    print(instruments.format_summary())
@@ -0,0 +1,99 @@
+"""
+    Helpers to redraw live plots with blitting instead of clearing and rebuilding the axes
+"""
+
+import numpy as np
+
+class BlitManager:
+    def __init__(self, canvas, animated_artists=()) -> None:
+        """
+            canvas is the figure canvas, animated_artists are the artists that change every frame.
+            Everything else (axes, labels, legends, ...) is rendered once into a cached background.
+        """
+        self.canvas = canvas
+        self._bg = None
+        self._artists = []
+        self._blit = getattr(canvas, "supports_blit", False)
+        for artist in animated_artists:
+            self.add_artist(artist)
+        self.cid = canvas.mpl_connect("draw_event", self.on_draw)
+
+    def on_draw(self, event):
+        """
+            Callback for draw events, caches the new background
+        """
+        if event is not None and event.canvas != self.canvas:
+            raise RuntimeError("draw event from a different canvas")
+        if self._blit:
+            self._bg = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+            self._draw_animated()
+
+    def add_artist(self, artist):
+        if artist.figure != self.canvas.figure:
+            raise RuntimeError("artist is not in the managed figure")
+        if self._blit:
+            artist.set_animated(True)
+        self._artists.append(artist)
+
+    def _draw_animated(self):
+        figure = self.canvas.figure
+        for artist in self._artists:
+            figure.draw_artist(artist)
+
+    def update(self, redraw=False):
+        """
+            Draws the animated artists over the cached background. redraw forces a full
+            draw, which is needed when anything in the background (e.g. axis limits) changed.
+        """
+        if redraw or not self._blit or self._bg is None:
+            self.canvas.draw()
+        else:
+            self.canvas.restore_region(self._bg)
+            self._draw_animated()
+            self.canvas.blit(self.canvas.figure.bbox)
+        self.canvas.flush_events()
+
+class GrowingLimits:
+    """
+        Keeps the limits of an axes around its data. The limits are grown with headroom
+        (margin times the span of the data) so they only change once in a while, because
+        every change means the background has to be redrawn.
+    """
+    def __init__(self, ax, margin=0.5) -> None:
+        self.ax = ax
+        self.margin = margin
+        self._initialized = False
+
+    def update(self, x, y, xmin=None) -> bool:
+        """
+            Grows the limits so they contain the new x and y values (they don't need to be paired).
+            xmin is the oldest x value still plotted, for plots of a sliding window: when the x
+            limits change the lower one moves up to it. Returns True if the limits changed and the
+            figure needs a full redraw.
+        """
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        x = x[~np.isnan(x)]
+        y = y[~np.isnan(y)]
+        if x.size == 0 or y.size == 0:
+            return False
+        changed = False
+        for data, get_lim, set_lim, oldest in ((x, self.ax.get_xlim, self.ax.set_xlim, xmin), (y, self.ax.get_ylim, self.ax.set_ylim, None)):
+            dmin = data.min()
+            dmax = data.max()
+            low, high = get_lim()
+            if self._initialized and low <= dmin and dmax <= high:
+                continue
+            if not self._initialized:
+                low, high = dmin, dmax
+            span = max(max(high, dmax) - min(low, dmin), 1e-3)
+            if not self._initialized or dmin < low:
+                low = dmin - self.margin*span
+            if not self._initialized or dmax > high:
+                high = dmax + self.margin*span
+            if oldest is not None:
+                low = max(low, oldest)
+            set_lim(low, high)
+            changed = True
+        self._initialized = True
+        return changed
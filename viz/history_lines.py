@@ -0,0 +1,59 @@
+"""
+    Time histories for the estimator plots, kept in a bounded ring buffer and decimated
+    before drawing so the per-frame cost doesn't grow with the length of the run
+"""
+
+import numpy as np
+from tools.ring_buffer import RingBuffer, minmax_decimate
+from viz.blit_manager import GrowingLimits
+
+class HistoryLines:
+    def __init__(self, width, window=100000, max_points=2000) -> None:
+        """
+            width is the number of values in a row of the history, the first one being the time.
+            The last window rows are kept and at most max_points points are drawn per line.
+        """
+        self.history = RingBuffer(window, width)
+        self.max_points = max_points
+        self._lines = []
+        self._limits = []
+        self._unplotted = 0
+
+    def add_line(self, line, column):
+        """
+            line plots column of the history against time
+        """
+        self._lines.append((line, column))
+        return line
+
+    def add_axes(self, ax, columns, constants=()):
+        """
+            the limits of ax are kept around the given columns and constant values (e.g. truth lines)
+        """
+        self._limits.append((GrowingLimits(ax), list(columns), np.asarray(constants, dtype=float)))
+
+    def lines(self):
+        return [line for line, column in self._lines]
+
+    def append(self, row):
+        self.history.append(row)
+        self._unplotted += 1
+
+    def update(self) -> bool:
+        """
+            Updates the line data. Returns True if any axis limits changed and the figure needs a full redraw.
+        """
+        history = self.history.view()
+        if history.shape[0] == 0:
+            return False
+        t = history[:,0]
+        for line, column in self._lines:
+            line.set_data(*minmax_decimate(t, history[:,column], self.max_points))
+
+        # only the rows added since the last frame can push the limits out
+        new = history[history.shape[0]-min(self._unplotted, history.shape[0]):]
+        self._unplotted = 0
+        redraw = False
+        for limits, columns, constants in self._limits:
+            redraw |= limits.update(new[:,0], np.append(new[:,columns], constants), xmin=t[0])
+        return redraw
@@ -2,11 +2,13 @@ import numpy as np
 import matplotlib.pyplot as plt
 from msg.threeDState import ThreeDState
 from msg.bearing_msg import BearingMsg
+from viz.blit_manager import BlitManager
+from viz.history_lines import HistoryLines
 from typing import List
 
 class PLKFViz:
 
-    def __init__(self, ac_vel) -> None:
+    def __init__(self, ac_vel, window=100000, max_points=2000) -> None:
         
         plt.ion()
         self.fig = plt.figure()
@@ -16,66 +18,55 @@ class PLKFViz:
         self.vx_ax = self.fig.add_subplot(322)
         self.vy_ax = self.fig.add_subplot(324)
         self.vz_ax = self.fig.add_subplot(326)
-        self._t = []
-        self.es_x = []
-        self.es_y = []
-        self.es_z = []
-        self.es_vx = []
-        self.es_vy = []
-        self.es_vz = []
-        self.ac_x = []
-        self.ac_y = []
-        self.ac_z = []
+        # rows of [t, es_x, ac_x, es_y, ac_y, es_z, ac_z, es_vx, es_vy, es_vz] for the last window updates
+        self._history = HistoryLines(10, window, max_points)
         self.ac_vx = ac_vel.item(0)
         self.ac_vy = ac_vel.item(1)
         self.ac_vz = ac_vel.item(2)
 
-    def update(self, uav_state:ThreeDState, target_state:ThreeDState, xhat, t):
-        target_xhat = xhat + uav_state.toArray()
-        self._t.append(t)
-        self.es_x.append(target_xhat[0,0])
-        self.ac_x.append(target_state.xpos)
-        self.es_y.append(target_xhat[1,0])
-        self.ac_y.append(target_state.ypos)
-        self.es_z.append(target_xhat[2,0])
-        self.ac_z.append(target_state.zpos)
-        self.es_vx.append(target_xhat[3,0])
-        self.es_vy.append(target_xhat[4,0])
-        self.es_vz.append(target_xhat[5,0])
-
-    def update_plots(self):
-        self.x_ax.clear()
+        # the artists are created once and only their data changes each frame
         self.x_ax.set_title("Position Estimator")
-        self.x_ax.plot(self._t, self.es_x, c='b')
-        self.x_ax.plot(self._t, self.ac_x, c='r')
+        self._history.add_line(self.x_ax.plot([], [], c='b')[0], 1)
+        self._history.add_line(self.x_ax.plot([], [], c='r')[0], 2)
+        self._history.add_axes(self.x_ax, [1, 2])
         self.x_ax.set_ylabel("X Position")
 
-        self.y_ax.clear()
-        self.y_ax.plot(self._t, self.es_y, c='b')
-        self.y_ax.plot(self._t, self.ac_y, c='r')
+        self._history.add_line(self.y_ax.plot([], [], c='b')[0], 3)
+        self._history.add_line(self.y_ax.plot([], [], c='r')[0], 4)
+        self._history.add_axes(self.y_ax, [3, 4])
         self.y_ax.set_ylabel("Y Position")
 
-        self.z_ax.clear()
-        self.z_ax.plot(self._t, self.es_z, c='b')
-        self.z_ax.plot(self._t, self.ac_z, c='r')
+        self._history.add_line(self.z_ax.plot([], [], c='b')[0], 5)
+        self._history.add_line(self.z_ax.plot([], [], c='r')[0], 6)
+        self._history.add_axes(self.z_ax, [5, 6])
         self.z_ax.set_ylabel("Z Position")
         self.z_ax.set_xlabel("t")
 
-        self.vx_ax.clear()
-        self.vx_ax.plot(self._t, self.es_vx,c='b', label="Estimated")
-        self.vx_ax.plot(self._t, [self.ac_vx]*len(self._t),c='r', label="Actual")
+        self._history.add_line(self.vx_ax.plot([], [], c='b', label="Estimated")[0], 7)
+        self._history.add_axes(self.vx_ax, [7], [self.ac_vx])
+        self.vx_ax.axhline(self.ac_vx, c='r', label="Actual")
         self.vx_ax.set_ylabel("X Velocity")
         self.vx_ax.legend()
 
-        self.vy_ax.clear()
-        self.vy_ax.plot(self._t, self.es_vy,c='b')
-        self.vy_ax.plot(self._t, [self.ac_vy]*len(self._t),c='r')
+        self._history.add_line(self.vy_ax.plot([], [], c='b')[0], 8)
+        self._history.add_axes(self.vy_ax, [8], [self.ac_vy])
+        self.vy_ax.axhline(self.ac_vy, c='r')
         self.vy_ax.set_ylabel("Y Velocity")
 
-        self.vz_ax.clear()
-        self.vz_ax.plot(self._t, self.es_vz,c='b')
-        self.vz_ax.plot(self._t, [self.ac_vz]*len(self._t),c='r')
+        self._history.add_line(self.vz_ax.plot([], [], c='b')[0], 9)
+        self._history.add_axes(self.vz_ax, [9], [self.ac_vz])
+        self.vz_ax.axhline(self.ac_vz, c='r')
         self.vz_ax.set_ylabel("Z Velocity")
         self.vz_ax.set_xlabel("t")
 
-        
+        self._blit = BlitManager(self.fig.canvas, self._history.lines())
+        plt.show(block=False)
+        self.fig.canvas.draw()
+
+    def update(self, uav_state:ThreeDState, target_state:ThreeDState, xhat, t):
+        target_xhat = xhat + uav_state.toArray()
+        self._history.append((t, target_xhat[0,0], target_state.xpos, target_xhat[1,0], target_state.ypos, target_xhat[2,0], target_state.zpos,
+                              target_xhat[3,0], target_xhat[4,0], target_xhat[5,0]))
+
+    def update_plots(self):
+        self._blit.update(self._history.update())
@@ -0,0 +1,109 @@
+"""
+    Renders a visualization in its own process so plotting never blocks the sim loop.
+    Frames are passed through shared memory as fixed-shape float arrays. The renderer only
+    ever draws the newest frame and silently drops the ones it didn't get to.
+"""
+
+import time
+import multiprocessing as mp
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+from msg.twoDYawState import TwoDYawState
+from msg.threeDState import ThreeDState
+
+NUM_SLOTS = 3 # one being written, one being read and the newest complete frame
+
+class RenderProcess:
+    def __init__(self, viz_factory, draw, frame_shape, rate=30.) -> None:
+        """
+            viz_factory is called in the render process to create the visualization, draw(viz, frame)
+            draws a frame with it and frame_shape is the shape of the float arrays passed to submit.
+            Both functions must be picklable (e.g. module level functions or functools.partial).
+        """
+        # fork where we can so scripts without a __main__ guard aren't re-run by the child
+        ctx = mp.get_context("fork" if "fork" in mp.get_all_start_methods() else "spawn")
+        self.frame_shape = tuple(frame_shape)
+        self._shm = SharedMemory(create=True, size=NUM_SLOTS*int(np.prod(self.frame_shape))*8)
+        self._frames = np.ndarray((NUM_SLOTS,)+self.frame_shape, dtype=np.float64, buffer=self._shm.buf)
+        self._lock = ctx.Lock()
+        self._latest = ctx.RawValue('i', -1) # slot of the newest complete frame
+        self._reading = ctx.RawValue('i', -1) # slot the renderer is copying from
+        self._seq = ctx.RawValue('q', 0) # number of submitted frames
+        self._stop = ctx.Event()
+        self._process = ctx.Process(target=_render_loop, daemon=True,
+                                    args=(self._shm.name, self.frame_shape, self._lock, self._latest, self._reading,
+                                          self._seq, self._stop, viz_factory, draw, rate))
+        self._process.start()
+
+    def submit(self, frame:np.ndarray):
+        """
+            Copies a frame into shared memory. Never waits on the renderer.
+        """
+        with self._lock:
+            slot = next(i for i in range(NUM_SLOTS) if i != self._latest.value and i != self._reading.value)
+        self._frames[slot] = frame
+        with self._lock:
+            self._latest.value = slot
+            self._seq.value += 1
+
+    def close(self):
+        self._stop.set()
+        self._process.join(timeout=5.)
+        if self._process.is_alive():
+            self._process.terminate()
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+def _render_loop(shm_name, frame_shape, lock, latest, reading, seq, stop, viz_factory, draw, rate):
+    import matplotlib.pyplot as plt
+    shm = SharedMemory(name=shm_name)
+    frames = np.ndarray((NUM_SLOTS,)+frame_shape, dtype=np.float64, buffer=shm.buf)
+    frame = np.zeros(frame_shape)
+    viz = viz_factory()
+    period = 1./rate
+    drawn = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        with lock:
+            slot = latest.value
+            newest = seq.value
+            reading.value = slot
+        if newest != drawn and slot >= 0:
+            frame[:] = frames[slot]
+        with lock:
+            reading.value = -1
+        if newest != drawn and slot >= 0:
+            draw(viz, frame)
+            drawn = newest
+        # keep the GUI responsive while waiting for the next frame
+        plt.pause(max(period - (time.perf_counter() - start), 1e-3))
+    shm.close()
+
+def draw_two_d_viz(viz, frame):
+    """
+        draw function for twoDViz, frame rows are [xpos, ypos, yaw, vel] of the UAV and then of each target
+    """
+    states = [TwoDYawState.fromBuffer(row) for row in frame]
+    viz.update(states[0], states[1:])
+
+def draw_two_d_viz_with_particles(viz, frame):
+    """
+        draw function for twoDVizWithParticles, frame rows are [xpos, ypos, yaw, vel, weight]
+        of the UAV, of the target, of each particle and a last row holding the time in its first column
+    """
+    uav_state = TwoDYawState.fromBuffer(frame[0])
+    target_state = TwoDYawState.fromBuffer(frame[1])
+    viz.update(uav_state, target_state, frame[2:-1,0:2], frame[2:-1,4], frame[-1,0])
+
+def draw_three_d_viz(viz, frame):
+    """
+        draw function for ThreeDViz, frame rows are [xpos, ypos, zpos, xvel, yvel, zvel] of the UAV and then of each target
+    """
+    states = [ThreeDState.fromBuffer(row) for row in frame]
+    viz.update(states[0], states[1:])
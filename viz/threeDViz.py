@@ -5,6 +5,7 @@
 import numpy as np
 import matplotlib.pyplot as plt
 from msg.threeDState import ThreeDState
+from viz.blit_manager import BlitManager
 from typing import List
 
 class ThreeDViz:
@@ -18,28 +19,6 @@ class ThreeDViz:
         self._fig = plt.figure()
         self._ax = self._fig.add_subplot(projection="3d")
         self._ax.view_init(elev=0, azim=180)
-
-
-    def update(self, uav_state:ThreeDState, target_states:List[ThreeDState]):
-        """
-            Updates the visualization with the new UAV and target positions.
-        """
-        self._ax.clear()
-        uav_pos = np.reshape(uav_state.getPos(),(3))
-        uav_vel = np.reshape(uav_state.toArray()[3:],(3))
-        self._ax.scatter(uav_pos[0],uav_pos[1], zs=uav_pos[2], zdir='z',c='r')
-        # self._ax.quiver([uav_pos[0]], [uav_pos[1]], [uav_pos[2]], [uav_pos[0]+uav_vel[0]], [uav_pos[1]+uav_vel[1]], [uav_pos[2]+uav_vel[2]], colors='r')
-        x = []
-        y = []
-        z = []
-        for state in target_states:
-            pos = np.reshape(state.getPos(),(3))
-            vel = np.reshape(state.toArray()[3:], (3))
-            x.append(pos[0])
-            y.append(pos[1])
-            z.append(pos[2])
-            # self._ax.quiver([pos[0]], [pos[1]], [pos[2]], [pos[0]+vel[0]], [pos[1]+vel[1]], [pos[2]+vel[2]],colors='b')
-        self._ax.scatter(x,y, zs=z, zdir='z',c='b')
         self._ax.set_title("UAV and Targets")
         self._ax.set_xlabel("x")
         self._ax.set_ylabel("y")
@@ -47,6 +26,21 @@ class ThreeDViz:
         self._ax.set_xlim(self.limits[0])
         self._ax.set_ylim(self.limits[1])
         self._ax.set_zlim(self.limits[2])
-        
+
+        # the artists are created once and only their data changes each frame
+        self._uav_point, = self._ax.plot([], [], [], c='r', marker='o', ls='')
+        self._target_points, = self._ax.plot([], [], [], c='b', marker='o', ls='')
+        self._blit = BlitManager(self._fig.canvas, [self._uav_point, self._target_points])
+        plt.show(block=False)
         self._fig.canvas.draw()
-        self._fig.canvas.flush_events()
\ No newline at end of file
+
+
+    def update(self, uav_state:ThreeDState, target_states:List[ThreeDState]):
+        """
+            Updates the visualization with the new UAV and target positions.
+        """
+        uav_pos = np.reshape(uav_state.getPos(),(3))
+        self._uav_point.set_data_3d([uav_pos[0]], [uav_pos[1]], [uav_pos[2]])
+        pos = np.array([[state.xpos, state.ypos, state.zpos] for state in target_states]).reshape(-1, 3)
+        self._target_points.set_data_3d(pos[:,0], pos[:,1], pos[:,2])
+        self._blit.update()
@@ -2,11 +2,13 @@ import numpy as np
 import matplotlib.pyplot as plt
 from msg.twoDYawState import TwoDYawState
 from msg.bearing_msg import BearingMsg
+from viz.blit_manager import BlitManager
+from viz.history_lines import HistoryLines
 from typing import List
 
 class TwoDEstimatorViz:
 
-    def __init__(self, ac_vel, ac_psii) -> None:
+    def __init__(self, ac_vel, ac_psii, window=100000, max_points=2000) -> None:
         
         plt.ion()
         self.fig = plt.figure()
@@ -14,51 +16,45 @@ class TwoDEstimatorViz:
         self._vel_ax = self.fig.add_subplot(412)
         self._psii_ax = self.fig.add_subplot(413)
         self._eta_ax = self.fig.add_subplot(414)
-        self._t = []
-        self.es_tau = []
-        self.es_vel = []
-        self.es_psii = []
-        self.es_eta = []
-        self.ac_tau = []
-        self.ac_eta = []
+        # rows of [t, es_tau, ac_tau, es_vel, es_psii, es_eta, ac_eta] for the last window updates
+        self._history = HistoryLines(7, window, max_points)
         self.ac_vel = ac_vel
         self.ac_psii = ac_psii
 
-    def update(self, uav_state:TwoDYawState, target_state:TwoDYawState, target_xhat, t, bearing_msg:BearingMsg):
-        
-        dif = np.reshape(target_state.getPos() - uav_state.getPos(),(2))
-        tau = np.linalg.norm(dif)/uav_state.vel
-
-        self.es_tau.append(target_xhat[1,0])
-        self.ac_tau.append(tau)
-        self._t.append(t)
-        self.es_vel.append(target_xhat[2,0])
-        self.es_psii.append(target_xhat[3,0])
-        self.es_eta.append(target_xhat[0,0])
-        self.ac_eta.append(bearing_msg.bearing)
-
-    def update_plots(self):
-        self._tau_ax.clear()
-        self._tau_ax.plot(self._t, self.es_tau, label="Estimated", c='b')
-        self._tau_ax.plot(self._t, self.ac_tau, label="Actual", c='r')
+        # the artists are created once and only their data changes each frame
+        self._history.add_line(self._tau_ax.plot([], [], label="Estimated", c='b')[0], 1)
+        self._history.add_line(self._tau_ax.plot([], [], label="Actual", c='r')[0], 2)
+        self._history.add_axes(self._tau_ax, [1, 2])
         self._tau_ax.legend()
         self._tau_ax.set_ylabel("Tau")
         self._tau_ax.set_title("TTC EKF")
 
-        self._vel_ax.clear()
-        self._vel_ax.plot(self._t, self.es_vel, c='b')
-        self._vel_ax.plot(self._t, [self.ac_vel]*len(self._t), c='r')
+        self._history.add_line(self._vel_ax.plot([], [], c='b')[0], 3)
+        self._history.add_axes(self._vel_ax, [3], [self.ac_vel])
+        self._vel_ax.axhline(self.ac_vel, c='r')
         self._vel_ax.set_ylabel("Velocity")
 
-        self._psii_ax.clear()
-        self._psii_ax.plot(self._t, self.es_psii,c='b')
-        self._psii_ax.plot(self._t, [self.ac_psii]*len(self._t),c='r')
+        self._history.add_line(self._psii_ax.plot([], [], c='b')[0], 4)
+        self._history.add_axes(self._psii_ax, [4], [self.ac_psii])
+        self._psii_ax.axhline(self.ac_psii, c='r')
         self._psii_ax.set_ylabel("Target Yaw")
 
-        self._eta_ax.clear()
-        self._eta_ax.plot(self._t, self.es_eta, c='b')
-        self._eta_ax.plot(self._t, self.ac_eta, c='r')
+        self._history.add_line(self._eta_ax.plot([], [], c='b')[0], 5)
+        self._history.add_line(self._eta_ax.plot([], [], c='r')[0], 6)
+        self._history.add_axes(self._eta_ax, [5, 6])
         self._eta_ax.set_ylabel("Bearing")
         self._eta_ax.set_xlabel("t")
 
+        self._blit = BlitManager(self.fig.canvas, self._history.lines())
+        plt.show(block=False)
+        self.fig.canvas.draw()
+
+    def update(self, uav_state:TwoDYawState, target_state:TwoDYawState, target_xhat, t, bearing_msg:BearingMsg):
         
+        dif = np.reshape(target_state.getPos() - uav_state.getPos(),(2))
+        tau = np.linalg.norm(dif)/uav_state.vel
+
+        self._history.append((t, target_xhat[1,0], tau, target_xhat[2,0], target_xhat[3,0], target_xhat[0,0], bearing_msg.bearing))
+
+    def update_plots(self):
+        self._blit.update(self._history.update())
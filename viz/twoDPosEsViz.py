@@ -2,11 +2,13 @@ import numpy as np
 import matplotlib.pyplot as plt
 from msg.twoDYawState import TwoDYawState
 from msg.bearing_msg import BearingMsg
+from viz.blit_manager import BlitManager
+from viz.history_lines import HistoryLines
 from typing import List
 
 class TwoDPosEsViz:
 
-    def __init__(self, ac_vel, ac_psii) -> None:
+    def __init__(self, ac_vel, ac_psii, window=100000, max_points=2000) -> None:
         
         plt.ion()
         self.fig = plt.figure()
@@ -14,47 +16,41 @@ class TwoDPosEsViz:
         self.y_ax = self.fig.add_subplot(412)
         self.vel_ax = self.fig.add_subplot(413)
         self.psii_ax = self.fig.add_subplot(414)
-        self._t = []
-        self.es_x = []
-        self.es_y = []
-        self.es_vel = []
-        self.es_psii = []
-        self.ac_x = []
-        self.ac_y = []
+        # rows of [t, es_x, ac_x, es_y, ac_y, es_vel, es_psii] for the last window updates
+        self._history = HistoryLines(7, window, max_points)
         self.ac_vel = ac_vel
         self.ac_psii = ac_psii
 
-    def update(self, uav_state:TwoDYawState, target_state:TwoDYawState, target_xhat, t, bearing_msg:BearingMsg):
-
-        self._t.append(t)
-        self.es_x.append(target_xhat[0,0])
-        self.ac_x.append(target_state.xpos)
-        self.es_y.append(target_xhat[1,0])
-        self.ac_y.append(target_state.ypos)
-        self.es_vel.append(target_xhat[2,0])
-        self.es_psii.append(target_xhat[3,0])
-
-    def update_plots(self):
-        self.x_ax.clear()
+        # the artists are created once and only their data changes each frame
         self.x_ax.set_title("Position Estimator")
-        self.x_ax.plot(self._t, self.es_x, c='b')
-        self.x_ax.plot(self._t, self.ac_x, c='r')
+        self._history.add_line(self.x_ax.plot([], [], c='b')[0], 1)
+        self._history.add_line(self.x_ax.plot([], [], c='r')[0], 2)
+        self._history.add_axes(self.x_ax, [1, 2])
         self.x_ax.set_ylabel("X Position")
 
-        self.y_ax.clear()
-        self.y_ax.plot(self._t, self.es_y, c='b')
-        self.y_ax.plot(self._t, self.ac_y, c='r')
+        self._history.add_line(self.y_ax.plot([], [], c='b')[0], 3)
+        self._history.add_line(self.y_ax.plot([], [], c='r')[0], 4)
+        self._history.add_axes(self.y_ax, [3, 4])
         self.y_ax.set_ylabel("Y Position")
 
-        self.vel_ax.clear()
-        self.vel_ax.plot(self._t, self.es_vel, c='b')
-        self.vel_ax.plot(self._t, [self.ac_vel]*len(self._t), c='r')
+        self._history.add_line(self.vel_ax.plot([], [], c='b')[0], 5)
+        self._history.add_axes(self.vel_ax, [5], [self.ac_vel])
+        self.vel_ax.axhline(self.ac_vel, c='r')
         self.vel_ax.set_ylabel("Velocity")
 
-        self.psii_ax.clear()
-        self.psii_ax.plot(self._t, self.es_psii,c='b')
-        self.psii_ax.plot(self._t, [self.ac_psii]*len(self._t),c='r')
+        self._history.add_line(self.psii_ax.plot([], [], c='b')[0], 6)
+        self._history.add_axes(self.psii_ax, [6], [self.ac_psii])
+        self.psii_ax.axhline(self.ac_psii, c='r')
         self.psii_ax.set_ylabel("Target Yaw")
         self.psii_ax.set_xlabel("t")
 
-        
+        self._blit = BlitManager(self.fig.canvas, self._history.lines())
+        plt.show(block=False)
+        self.fig.canvas.draw()
+
+    def update(self, uav_state:TwoDYawState, target_state:TwoDYawState, target_xhat, t, bearing_msg:BearingMsg):
+
+        self._history.append((t, target_xhat[0,0], target_state.xpos, target_xhat[1,0], target_state.ypos, target_xhat[2,0], target_xhat[3,0]))
+
+    def update_plots(self):
+        self._blit.update(self._history.update())
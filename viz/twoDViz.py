@@ -4,7 +4,9 @@
 
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
 from msg.twoDYawState import TwoDYawState
+from viz.blit_manager import BlitManager
 from typing import List
 
 class twoDViz:
@@ -17,29 +19,42 @@ class twoDViz:
         self.limits=limits
         self._fig = plt.figure()
         self._ax = self._fig.add_subplot(111)
+        self._ax.set_title("UAV and Targets")
+        self._ax.set_xlabel("x")
+        self._ax.set_ylabel("y")
+        self._ax.set_xlim(self.limits[0])
+        self._ax.set_ylim(self.limits[1])
+
+        # the artists are created once and only their data changes each frame
+        self._uav_point, = self._ax.plot([], [], c='r', marker='o', ls='')
+        self._uav_arrow = self._ax.add_collection(LineCollection([], colors='r'))
+        self._target_points, = self._ax.plot([], [], c='b', marker='o', ls='')
+        self._target_arrows = self._ax.add_collection(LineCollection([], colors='b'))
+        self._blit = BlitManager(self._fig.canvas, [self._uav_point, self._uav_arrow, self._target_points, self._target_arrows])
+        plt.show(block=False)
+        self._fig.canvas.draw()
 
 
     def update(self, uav_state:TwoDYawState, target_states:List[TwoDYawState]):
         """
             Updates the visualization with the new UAV and target positions.
         """
-        self._ax.clear()
         uav_pos = np.reshape(uav_state.getPos(),(2))
-        self._ax.scatter(uav_pos[0],uav_pos[1],c='r')
-        self._ax.arrow(uav_pos[0], uav_pos[1], uav_state.vel*np.sin(uav_state.yaw), uav_state.vel*np.cos(uav_state.yaw), color='r')
-        x = []
-        y = []
-        for state in target_states:
-            pos = np.reshape(state.getPos(),(2))
-            x.append(pos[0])
-            y.append(pos[1])
-            self._ax.arrow(pos[0], pos[1], state.vel*np.sin(state.yaw),state.vel*np.cos(state.yaw),color='b')
-        self._ax.scatter(x,y,c='b')
-        self._ax.set_title("UAV and Targets")
-        self._ax.set_xlabel("x")
-        self._ax.set_ylabel("y")
-        self._ax.set_xlim(self.limits[0])
-        self._ax.set_ylim(self.limits[1])
-        
-        self._fig.canvas.draw()
-        self._fig.canvas.flush_events()
\ No newline at end of file
+        self._uav_point.set_data([uav_pos[0]], [uav_pos[1]])
+        self._uav_arrow.set_segments([velocity_segment(uav_pos, uav_state.vel, uav_state.yaw)])
+
+        pos = np.array([[state.xpos, state.ypos] for state in target_states]).reshape(-1, 2)
+        vel = np.array([state.vel for state in target_states])
+        yaw = np.array([state.yaw for state in target_states])
+        self._target_points.set_data(pos[:,0], pos[:,1])
+        self._target_arrows.set_segments(velocity_segment(pos, vel, yaw))
+
+        self._blit.update()
+
+def velocity_segment(pos, vel, yaw):
+    """
+        Line segments from each position along its velocity vector. pos is (2,) or (N,2).
+    """
+    pos = np.asarray(pos, dtype=float)
+    end = pos + np.stack([vel*np.sin(yaw), vel*np.cos(yaw)], axis=-1)
+    return np.stack([pos, end], axis=-2)
@@ -4,8 +4,10 @@
 
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
 from msg.twoDYawState import TwoDYawState
-from typing import List
+from viz.blit_manager import BlitManager
+from viz.twoDViz import velocity_segment
 
 class twoDVizWithParticles:
 
@@ -17,43 +19,46 @@ class twoDVizWithParticles:
         self.limits=limits
         self._fig = plt.figure()
         self._ax = self._fig.add_subplot(111)
+        self._ax.set_xlim(self.limits[0])
+        self._ax.set_ylim(self.limits[1])
+        self._ax.set_xlabel("x")
+        self._ax.set_ylabel("y")
+        self._title = self._ax.set_title("UAV and Targets")
+
+        # the artists are created once and only their data changes each frame
+        self._target_arrow = self._ax.add_collection(LineCollection([], colors='r'))
+        self._target_point, = self._ax.plot([], [], c='r', marker='o', ls='')
+        self._particles = self._ax.scatter(np.zeros(0), np.zeros(0), c='b')
+        self._uav_point, = self._ax.plot([], [], c='g', marker='o', ls='')
+        self._uav_arrow = self._ax.add_collection(LineCollection([], colors='g'))
+        self._blit = BlitManager(self._fig.canvas, [self._target_arrow, self._target_point, self._particles,
+                                                     self._uav_point, self._uav_arrow, self._title])
+        plt.show(block=False)
+        self._fig.canvas.draw()
 
 
-    def update(self, uav_state:TwoDYawState, target_state:TwoDYawState, particle_states:List[TwoDYawState], t):
+    def update(self, uav_state:TwoDYawState, target_state:TwoDYawState, particle_positions, particle_weights, t):
         """
             Updates the visualization with the new UAV and target positions.
+            particle_positions is an (N,2) array and particle_weights an (N,) array
         """
-        self._ax.clear()
-        self._ax.set_xlim(self.limits[0])
-        self._ax.set_ylim(self.limits[1])
-
-        uav_pos = np.reshape(uav_state.getPos(),(2))
-        x = []
-        y = []
-        sizes = []
         alpha = 2
-        for particle in particle_states:
-            pos = np.reshape(particle.getPos(),(2))
-            x.append(pos[0])
-            y.append(pos[1])
-            sizes.append(particle.weight*alpha)
+        positions = np.reshape(particle_positions, (-1, 2))
+        sizes = alpha*np.asarray(particle_weights)
 
         # plot the target's actual position and velocity arrow
         pos = np.reshape(target_state.getPos(),(2))
-        self._ax.arrow(pos[0], pos[1], target_state.vel*np.sin(target_state.yaw),target_state.vel*np.cos(target_state.yaw),color='r')
-        self._ax.scatter(pos[0],pos[1],c='r')
+        self._target_arrow.set_segments([velocity_segment(pos, target_state.vel, target_state.yaw)])
+        self._target_point.set_data([pos[0]], [pos[1]])
 
         # plot the particle positions
-        self._ax.scatter(x,y,c='b',s=sizes)
+        self._particles.set_offsets(positions)
+        self._particles.set_sizes(sizes)
 
         #plot the UAV's position and velocity arrow
-        self._ax.scatter(uav_pos[0],uav_pos[1],c='g')
-        self._ax.arrow(uav_pos[0], uav_pos[1], uav_state.vel*np.sin(uav_state.yaw), uav_state.vel*np.cos(uav_state.yaw), color='g')
+        uav_pos = np.reshape(uav_state.getPos(),(2))
+        self._uav_point.set_data([uav_pos[0]], [uav_pos[1]])
+        self._uav_arrow.set_segments([velocity_segment(uav_pos, uav_state.vel, uav_state.yaw)])
 
-        # make the plot look pretty
-        self._ax.set_title(f"UAV and Targets ({t:.2f}s)")
-        self._ax.set_xlabel("x")
-        self._ax.set_ylabel("y")
-        
-        self._fig.canvas.draw()
-        self._fig.canvas.flush_events()
\ No newline at end of file
+        self._title.set_text(f"UAV and Targets ({t:.2f}s)")
+        self._blit.update()